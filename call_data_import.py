@@ -12,7 +12,6 @@ Features:
 """
 
 import pandas as pd
-import mysql.connector
 from mysql.connector import Error
 import os
 import sys
@@ -21,6 +20,11 @@ import logging
 import time
 from typing import Dict, List, Tuple, Optional
 import json
+import argparse
+
+from import_common import BatchWriterMixin, convert_datetimes, parse_transaction_strategies, server_now
+from import_passwords import (BCRYPT_ROUNDS, generate_password, hash_passwords, is_password_hash,
+                              write_credential_report)
 
 # Import configuration
 try:
@@ -39,7 +43,36 @@ except ImportError:
     IMPORT_SETTINGS = {
         'batch_size': 1000,
         'max_retries': 3,
-        'log_level': 'INFO'
+        'log_level': 'INFO',
+        'async_writers': 0,
+        'shard_writers': 0,
+        'shard_mode': 'range',
+        'reject_folder': 'rejects',
+        'reject_format': 'csv',
+        'analyze_after_import': True,
+        'update_histograms': False,
+        'histogram_columns': ['status', 'company_id', 'created_at'],
+        'histogram_buckets': 100,
+        'server_timezone': 'Africa/Cairo',
+        'source_timezone': None,
+        'progress_events': None,
+        'progress_log_seconds': 5,
+        'writer': 'mysql',
+        'sort_by_key': False,
+        'spill_folder': None,
+        'memory_limit_mb': None,
+        'transaction_strategy': 'batch',
+        'transaction_strategies': {},
+        'savepoint_rows': 50000,
+        'partition_exchange': False,
+        'exchange_min_rows': 100000,
+        'key_index': None,
+        'key_conflicts': 'report',
+        'hash_passwords': False,
+        'reset_passwords': False,
+        'bcrypt_rounds': 10,
+        'password_workers': None,
+        'credential_folder': 'credentials'
     }
     DEFAULT_VALUES = {
         'company_id': 0,
@@ -52,16 +85,53 @@ except ImportError:
         'call_reason_id': 0
     }
 
-class EnhancedCallDataImporter:
-    def __init__(self, config: Dict = None):
+class EnhancedCallDataImporter(BatchWriterMixin):
+    # Import order (respecting foreign key constraints): (table name, Excel file, import method)
+    # Note: company.xlsx is no longer present, so we skip companies import
+    IMPORT_TASKS = [
+        ('call_categories', 'callReason.xlsx', 'import_call_reasons'),
+        ('call_types', 'calltype.xlsx', 'import_call_types'),
+        ('users', 'user.xlsx', 'import_users'),
+        ('calls', 'calls.xlsx', 'import_calls')
+    ]
+    
+    # Excel header -> database column renames applied by each prepare_* method;
+    # data_export.py applies them in reverse
+    COLUMN_MAPPINGS = {
+        'call_reasons': {'callReason': 'name'},
+        'call_types': {'calltype': 'name'},
+        'users': {'callRecipient': 'name'},
+        'calls': {
+            'Customer_ID': 'customer_id',
+            'calltype_ID': 'call_type',
+            'callReason_ID': 'category_id',
+            'notes': 'call_notes'
+        }
+    }
+    
+    def __init__(self, config: Dict = None, async_writers: Optional[int] = None, dry_run: bool = False,
+                 shard_writers: Optional[int] = None):
         """Initialize the enhanced call data importer."""
         self.config = config or DATABASE_CONFIG
         self.connection = None
         self.cursor = None
+        self.import_settings = IMPORT_SETTINGS
+        self.dry_run = dry_run
+        self.async_writers = async_writers if async_writers is not None else IMPORT_SETTINGS.get('async_writers', 0)
+        self.shard_writers = shard_writers if shard_writers is not None else IMPORT_SETTINGS.get('shard_writers', 0)
+        self.changed_tables = set()
+        self.task_results = {}
+        self.write_progress = {}
         self.stats = {
             'total_records': 0,
             'successful_imports': 0,
             'failed_imports': 0,
+            'rejected_rows': 0,
+            'lock_retries': 0,
+            'reconnects': 0,
+            'analyze_seconds': {},
+            'tables': {},
+            'passwords': {},
             'start_time': None,
             'end_time': None
         }
@@ -73,13 +143,16 @@ class EnhancedCallDataImporter:
         """Setup logging configuration."""
         log_level = getattr(logging, IMPORT_SETTINGS['log_level'])
         
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if not self.dry_run and not logging.getLogger().handlers:
+            # Dry runs touch no database, so they leave no log file behind either;
+            # under import_cli.py the log file is already open
+            handlers.insert(0, logging.FileHandler(f'call_data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'))
+        
         logging.basicConfig(
             level=log_level,
             format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'call_data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'),
-                logging.StreamHandler(sys.stdout)
-            ]
+            handlers=handlers
         )
         self.logger = logging.getLogger(__name__)
         
@@ -87,7 +160,7 @@ class EnhancedCallDataImporter:
         """Establish database connection with retry logic."""
         for attempt in range(IMPORT_SETTINGS['max_retries']):
             try:
-                self.connection = mysql.connector.connect(**self.config)
+                self.connection = self._new_connection()
                 self.cursor = self.connection.cursor()
                 self.logger.info("Successfully connected to database")
                 return True
@@ -106,11 +179,14 @@ class EnhancedCallDataImporter:
             self.cursor.close()
         if self.connection:
             self.connection.close()
+        self._close_writer()
         self.logger.info("Database connection closed")
     
     def check_table_exists(self, table_name: str) -> bool:
         """Check if a table exists in the database."""
         try:
+            if self.schema_cache is not None:
+                return self.schema_cache.table_exists(self.cursor, table_name)
             query = "SHOW TABLES LIKE %s"
             self.cursor.execute(query, (table_name,))
             result = self.cursor.fetchone()
@@ -236,11 +312,31 @@ class EnhancedCallDataImporter:
         
         return len(errors) == 0, errors
     
+    def prepare_call_reasons(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce call reasons data into call_categories columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['callReason', 'id']
+        # Database expects: ['id', 'name'] + additional columns
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['call_reasons'])
+
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in call reason names. Please check the Excel file.")
+
+        # Add missing columns with default values for call_categories table
+        df_mapped['created_by'] = DEFAULT_VALUES['created_by']
+        df_mapped['company_id'] = DEFAULT_VALUES['company_id']
+        now = server_now(self.import_settings)
+        df_mapped['created_at'] = now
+        df_mapped['updated_at'] = now
+        
+        return df_mapped
+    
     def import_call_reasons(self, excel_file: str) -> bool:
         """Import call reasons data from Excel file into call_categories table."""
         try:
             self.logger.info(f"Importing call reasons from {excel_file} into call_categories table")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
 
             # Validate data
             is_valid, errors = self.validate_data(df, 'call_reasons')
@@ -249,46 +345,28 @@ class EnhancedCallDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
 
-            # Map Excel columns to database columns
-            # Excel has: ['callReason', 'id']
-            # Database expects: ['id', 'name'] + additional columns
-            df_mapped = df.rename(columns={'callReason': 'name'})
-
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in call reason names. Please check the Excel file.")
-                return False
-
-            # Add missing columns with default values for call_categories table
-            df_mapped['created_by'] = DEFAULT_VALUES['created_by']
-            df_mapped['company_id'] = DEFAULT_VALUES['company_id']
-            df_mapped['created_at'] = datetime.now()
-            df_mapped['updated_at'] = datetime.now()
-
+            df_mapped = self.prepare_call_reasons(df)
+            
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
 
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO call_categories (id, name, created_by, company_id, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        name = VALUES(name),
-                        created_by = VALUES(created_by),
-                        company_id = VALUES(company_id),
-                        updated_at = VALUES(updated_at)
-                    """
-                    self.cursor.execute(query, (
-                        row['id'], row['name'], row['created_by'],
-                        row['company_id'], row['created_at'], row['updated_at']
-                    ))
-
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO call_categories (id, name, created_by, company_id, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                name = VALUES(name),
+                created_by = VALUES(created_by),
+                company_id = VALUES(company_id),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._in_key_order('call_categories', df_mapped)
+            rows = [
+                (row['id'], row['name'], row['created_by'],
+                 row['company_id'], row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            self._write_rows('call_categories', query, rows)
 
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} call reasons into call_categories")
@@ -301,11 +379,26 @@ class EnhancedCallDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_call_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce call types data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['calltype', 'id']
+        # Database expects: ['id', 'name']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['call_types'])
+        
+        # Remove rows with null values in name column
+        df_mapped = df_mapped.dropna(subset=['name'])
+        
+        if df_mapped.empty:
+            raise ValueError("No valid call type names found after removing null values")
+        
+        return df_mapped
+    
     def import_call_types(self, excel_file: str) -> bool:
         """Import call types data from Excel file."""
         try:
             self.logger.info(f"Importing call types from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'call_types')
@@ -314,35 +407,20 @@ class EnhancedCallDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['calltype', 'id']
-            # Database expects: ['id', 'name']
-            df_mapped = df.rename(columns={'calltype': 'name'})
-            
-            # Remove rows with null values in name column
-            df_mapped = df_mapped.dropna(subset=['name'])
-            
-            if df_mapped.empty:
-                self.logger.error("No valid call type names found after removing null values")
-                return False
+            df_mapped = self.prepare_call_types(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO call_types (id, name) 
-                    VALUES (%s, %s) 
-                    ON DUPLICATE KEY UPDATE name = VALUES(name)
-                    """
-                    self.cursor.execute(query, (row['id'], row['name']))
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO call_types (id, name) 
+            VALUES (%s, %s) 
+            ON DUPLICATE KEY UPDATE name = VALUES(name)
+            """
+            df_mapped = self._in_key_order('call_types', df_mapped)
+            rows = [(row['id'], row['name']) for _, row in df_mapped.iterrows()]
+            self._write_rows('call_types', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} call types")
@@ -355,11 +433,87 @@ class EnhancedCallDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_users(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce users data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['callRecipient', 'id']
+        # Database expects: ['id', 'name']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['users'])
+        
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in user names. Please check the Excel file.")
+        
+        # Add missing columns with default values
+        df_mapped['company_id'] = DEFAULT_VALUES['company_id']
+        df_mapped['username'] = df_mapped['name']  # Use name as username
+        # With hash_passwords on, import_users replaces it: hashing belongs to the write, not to dry runs
+        df_mapped['password'] = 'default_password_123'  # Add default password
+        now = server_now(self.import_settings)
+        df_mapped['created_at'] = now
+        df_mapped['updated_at'] = now
+        
+        return df_mapped
+
+    def _assign_passwords(self, df_mapped: pd.DataFrame) -> Optional[str]:
+        """Fill the password column with bcrypt hashes and report the new initial passwords.
+
+        Only with ``hash_passwords`` on, which needs a backend whose login
+        verifies bcrypt hashes. Users already stored with a bcrypt hash keep
+        it unless ``reset_passwords`` is set; new users and users still
+        holding a plaintext password get a random one. The snapshot writers
+        cannot read the stored passwords, so they keep the default password
+        and rely on the upsert leaving stored hashes alone. Returns the
+        credential report, or None when no password was generated.
+        """
+        if not self.import_settings.get('hash_passwords', False):
+            return None
+        if self.writer is not None and self.writer.uses_snapshot:
+            self.logger.warning(f"The {self.import_settings.get('writer')} writer cannot read the stored passwords, "
+                                f"not generating any; stored hashes are kept")
+            return None
+
+        stored = {}
+        try:
+            self.cursor.execute("SELECT id, password FROM users")
+            stored = {int(user_id): password for user_id, password in self.cursor.fetchall()}
+        except Error as e:
+            self.logger.warning(f"Could not read the stored passwords, generating one for every user: {e}")
+
+        if self.import_settings.get('reset_passwords', False):
+            keep = pd.Series(False, index=df_mapped.index)
+        else:
+            keep = df_mapped['id'].map(lambda user_id: is_password_hash(stored.get(int(user_id))))
+        df_mapped['password'] = df_mapped['id'].map(lambda user_id: stored.get(int(user_id))).where(keep)
+
+        new_users = df_mapped[~keep]
+        summary = {'generated': len(new_users), 'kept': int(keep.sum()), 'hash_seconds': 0.0, 'report': None}
+        self.stats['passwords'] = summary
+        if new_users.empty:
+            self.logger.info(f"All {summary['kept']} users keep their stored passwords")
+            return None
+
+        passwords = [generate_password() for _ in range(len(new_users))]
+        rounds = self.import_settings.get('bcrypt_rounds', BCRYPT_ROUNDS)
+        started = time.perf_counter()
+        df_mapped.loc[~keep, 'password'] = hash_passwords(passwords, rounds,
+                                                          self.import_settings.get('password_workers'))
+        summary['hash_seconds'] = round(time.perf_counter() - started, 3)
+        # Report before writing: a failed write leaves a stale report, a lost report locks the users out
+        summary['report'] = write_credential_report(
+            self.import_settings.get('credential_folder', 'credentials'),
+            zip(new_users['id'], new_users['name'], new_users['username'], passwords)
+        )
+        self.logger.info(f"Hashed {len(passwords)} initial passwords (bcrypt cost {rounds}) in "
+                         f"{summary['hash_seconds']}s, {summary['kept']} users keep theirs; "
+                         f"credentials in {summary['report']}")
+        return summary['report']
+
     def import_users(self, excel_file: str) -> bool:
         """Import users data from Excel file."""
         try:
             self.logger.info(f"Importing users from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'users')
@@ -368,46 +522,37 @@ class EnhancedCallDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['callRecipient', 'id']
-            # Database expects: ['id', 'name']
-            df_mapped = df.rename(columns={'callRecipient': 'name'})
-            
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in user names. Please check the Excel file.")
-                return False
-            
-            # Add missing columns with default values
-            df_mapped['company_id'] = DEFAULT_VALUES['company_id']
-            df_mapped['username'] = df_mapped['name']  # Use name as username
-            df_mapped['password'] = 'default_password_123'  # Add default password
-            df_mapped['created_at'] = datetime.now()
-            df_mapped['updated_at'] = datetime.now()
+            df_mapped = self.prepare_users(df)
+            credentials = self._assign_passwords(df_mapped)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO users (id, name, username, password, company_id, created_at, updated_at) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s) 
-                    ON DUPLICATE KEY UPDATE 
-                        name = VALUES(name),
-                        username = VALUES(username),
-                        password = VALUES(password),
-                        company_id = VALUES(company_id),
-                        updated_at = VALUES(updated_at)
-                    """
-                    self.cursor.execute(query, (row['id'], row['name'], row['username'], row['password'],
-                                               row['company_id'], row['created_at'], row['updated_at']))
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            # Stored bcrypt hashes survive the upsert unless this run generated new passwords on purpose
+            password_update = ("VALUES(password)" if credentials and self.import_settings.get('reset_passwords')
+                               else "IF(LEFT(password, 2) = '$2', password, VALUES(password))")
+            query = f"""
+            INSERT INTO users (id, name, username, password, company_id, created_at, updated_at) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s) 
+            ON DUPLICATE KEY UPDATE 
+                name = VALUES(name),
+                username = VALUES(username),
+                password = {password_update},
+                company_id = VALUES(company_id),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._in_key_order('users', df_mapped)
+            rows = [
+                (row['id'], row['name'], row['username'], row['password'],
+                 row['company_id'], row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            rejected = self._write_rows('users', query, rows)
+            if rejected and credentials:
+                rejected_ids = {row[0] for row, _ in rejected}
+                self.logger.warning(f"{len(rejected_ids)} rejected users are listed in {credentials} "
+                                    f"but were not written, e.g. {sorted(rejected_ids)[:5]}")
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} users")
@@ -420,11 +565,43 @@ class EnhancedCallDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_calls(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce calls data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'Customer_ID', 'calltype_ID', 'callReason_ID', 'description', 'notes', 'call_duration', 'created_by', 'created_at', 'updated_at']
+        # Database expects: ['id', 'company_id', 'customer_id', 'call_type', 'category_id', 'description', 'call_notes', 'call_duration', 'created_by', 'created_at', 'updated_at']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['calls'])
+        
+        # Check for null values in required columns
+        if df_mapped['customer_id'].isnull().any():
+            raise ValueError("Found null values in customer_id. Please check the Excel file.")
+        
+        if df_mapped['created_at'].isnull().any():
+            raise ValueError("Found null values in created_at. Please check the Excel file.")
+        
+        # Handle missing values and data types
+        df_mapped['company_id'] = df_mapped['company_id'].fillna(DEFAULT_VALUES['company_id']).astype(int)
+        df_mapped['call_type'] = df_mapped['call_type'].fillna(DEFAULT_VALUES['call_type_id']).astype(int)
+        df_mapped['category_id'] = df_mapped['category_id'].fillna(DEFAULT_VALUES['call_reason_id']).astype(int)
+        df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype(int)
+        
+        # Parse datetime columns once, in server time, with NULL for empty cells
+        convert_datetimes(df_mapped, ['created_at', 'updated_at'], self.import_settings)
+        
+        # Fill missing notes and description with empty string
+        df_mapped['call_notes'] = df_mapped['call_notes'].fillna('')
+        df_mapped['description'] = df_mapped['description'].fillna('')
+        
+        # Fill missing call_duration with 0
+        df_mapped['call_duration'] = df_mapped['call_duration'].fillna(0)
+        
+        return df_mapped
+    
     def import_calls(self, excel_file: str) -> bool:
         """Import calls data from Excel file."""
         try:
             self.logger.info(f"Importing calls from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'calls')
@@ -433,78 +610,40 @@ class EnhancedCallDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'Customer_ID', 'calltype_ID', 'callReason_ID', 'description', 'notes', 'call_duration', 'created_by', 'created_at', 'updated_at']
-            # Database expects: ['id', 'company_id', 'customer_id', 'call_type', 'category_id', 'description', 'call_notes', 'call_duration', 'created_by', 'created_at', 'updated_at']
-            df_mapped = df.rename(columns={
-                'Customer_ID': 'customer_id',
-                'calltype_ID': 'call_type',
-                'callReason_ID': 'category_id',
-                'notes': 'call_notes'
-            })
-            
-            # Check for null values in required columns
-            if df_mapped['customer_id'].isnull().any():
-                self.logger.error("Found null values in customer_id. Please check the Excel file.")
-                return False
-            
-            if df_mapped['created_at'].isnull().any():
-                self.logger.error("Found null values in created_at. Please check the Excel file.")
-                return False
-            
-            # Handle missing values and data types
-            df_mapped['company_id'] = df_mapped['company_id'].fillna(DEFAULT_VALUES['company_id']).astype(int)
-            df_mapped['call_type'] = df_mapped['call_type'].fillna(DEFAULT_VALUES['call_type_id']).astype(int)
-            df_mapped['category_id'] = df_mapped['category_id'].fillna(DEFAULT_VALUES['call_reason_id']).astype(int)
-            df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype(int)
+            df_mapped = self.prepare_calls(df)
             
-            # Convert datetime columns
-            df_mapped['created_at'] = pd.to_datetime(df_mapped['created_at'])
-            df_mapped['updated_at'] = pd.to_datetime(df_mapped['updated_at'])
-            
-            # Fill missing notes and description with empty string
-            df_mapped['call_notes'] = df_mapped['call_notes'].fillna('')
-            df_mapped['description'] = df_mapped['description'].fillna('')
-            
-            # Fill missing call_duration with 0
-            df_mapped['call_duration'] = df_mapped['call_duration'].fillna(0)
+            query = """
+            INSERT INTO customercall (
+                id, company_id, customer_id, call_type, category_id, 
+                description, call_notes, call_duration, created_by, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+                company_id = VALUES(company_id),
+                customer_id = VALUES(customer_id),
+                call_type = VALUES(call_type),
+                category_id = VALUES(category_id),
+                description = VALUES(description),
+                call_notes = VALUES(call_notes),
+                call_duration = VALUES(call_duration),
+                created_by = VALUES(created_by),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._check_key_index('customercall', query, df_mapped)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO customercall (
-                        id, company_id, customer_id, call_type, category_id, 
-                        description, call_notes, call_duration, created_by, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        company_id = VALUES(company_id),
-                        customer_id = VALUES(customer_id),
-                        call_type = VALUES(call_type),
-                        category_id = VALUES(category_id),
-                        description = VALUES(description),
-                        call_notes = VALUES(call_notes),
-                        call_duration = VALUES(call_duration),
-                        created_by = VALUES(created_by),
-                        updated_at = VALUES(updated_at)
-                    """
-                    
-                    values = (
-                        row['id'], row['company_id'], row['customer_id'],
-                        row['call_type'], row['category_id'], row['description'],
-                        row['call_notes'], row['call_duration'], row['created_by'],
-                        row['created_at'], row['updated_at']
-                    )
-                    
-                    self.cursor.execute(query, values)
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            df_mapped = self._in_key_order('customercall', df_mapped)
+            rows = [
+                (row['id'], row['company_id'], row['customer_id'],
+                 row['call_type'], row['category_id'], row['description'],
+                 row['call_notes'], row['call_duration'], row['created_by'],
+                 row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            rejected = self._write_rows('customercall', query, rows, shard_column='customer_id')
+            self._update_key_index('customercall', query, df_mapped, rejected)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} calls")
@@ -517,8 +656,12 @@ class EnhancedCallDataImporter:
                 self.connection.rollback()
             return False
     
-    def run_import(self, data_folder: str) -> bool:
-        """Run the complete call data import process."""
+    def run_import(self, data_folder: str, task_names: Optional[List[str]] = None) -> bool:
+        """Run the complete call data import process.
+
+        ``task_names`` limits the run to those tables of IMPORT_TASKS; the
+        outcome of each task is recorded in ``task_results``.
+        """
         self.stats['start_time'] = datetime.now()
         
         try:
@@ -540,32 +683,34 @@ class EnhancedCallDataImporter:
                     self.logger.error("Failed to create customercall table")
                     return False
             
-            # Define import order (respecting foreign key constraints)
-            # Note: company.xlsx is no longer present, so we skip companies import
-            import_tasks = [
-                ('call_categories', 'callReason.xlsx', self.import_call_reasons),
-                ('call_types', 'calltype.xlsx', self.import_call_types),
-                ('users', 'user.xlsx', self.import_users),
-                ('calls', 'calls.xlsx', self.import_calls)
-            ]
-            
             success_count = 0
-            total_tasks = len(import_tasks)
+            tasks = [task for task in self.IMPORT_TASKS if not task_names or task[0] in task_names]
+            total_tasks = len(tasks)
             
-            for table_name, excel_file, import_func in import_tasks:
+            for table_name, excel_file, method_name in tasks:
                 file_path = os.path.join(data_folder, excel_file)
+                import_func = getattr(self, method_name)
                 
                 if not os.path.exists(file_path):
                     self.logger.warning(f"Excel file not found: {file_path}")
+                    self.task_results[table_name] = None
                     continue
                 
                 self.logger.info(f"Starting import for {table_name}...")
-                if import_func(file_path):
+                self._table_started(table_name, file_path)
+                success = self._run_import_task(file_path, import_func)
+                self._table_finished(table_name, success)
+                if success:
                     success_count += 1
+                    self.task_results[table_name] = True
                     self.logger.info(f"SUCCESS: Successfully imported {table_name}")
                 else:
+                    self.task_results[table_name] = False
                     self.logger.error(f"FAILED: Failed to import {table_name}")
             
+            if IMPORT_SETTINGS.get('analyze_after_import', True) and self.changed_tables:
+                self.analyze_changed_tables()
+            
             self.stats['end_time'] = datetime.now()
             self._print_summary(success_count, total_tasks)
             
@@ -588,6 +733,10 @@ class EnhancedCallDataImporter:
         self.logger.info(f"Successful imports: {success_count}")
         self.logger.info(f"Failed imports: {total_tasks - success_count}")
         self.logger.info(f"Total records processed: {self.stats['total_records']}")
+        self.logger.info(f"Rejected rows: {self.stats['rejected_rows']}")
+        self.logger.info(f"Lock conflict retries: {self.stats['lock_retries']}")
+        self.logger.info(f"Reconnects: {self.stats['reconnects']}")
+        self.logger.info(f"Statistics refresh: {len(self.stats['analyze_seconds'])} tables in {sum(self.stats['analyze_seconds'].values()):.2f}s")
         self.logger.info(f"Total time: {duration}")
         self.logger.info(f"Average time per record: {duration / max(self.stats['total_records'], 1)}")
         self.logger.info("=" * 60)
@@ -596,9 +745,17 @@ class EnhancedCallDataImporter:
         stats_file = f'call_import_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
         with open(stats_file, 'w', encoding='utf-8') as f:
             json.dump({
+                'importer': type(self).__module__,
+                'writer': self.import_settings.get('writer', 'mysql'),
                 'success_count': success_count,
                 'total_tasks': total_tasks,
                 'total_records': self.stats['total_records'],
+                'rejected_rows': self.stats['rejected_rows'],
+                'lock_retries': self.stats['lock_retries'],
+                'reconnects': self.stats['reconnects'],
+                'analyze_seconds': self.stats['analyze_seconds'],
+                'tables': self.stats['tables'],
+                'passwords': self.stats['passwords'],
                 'start_time': self.stats['start_time'].isoformat(),
                 'end_time': self.stats['end_time'].isoformat(),
                 'duration_seconds': duration.total_seconds()
@@ -608,6 +765,78 @@ class EnhancedCallDataImporter:
 
 def main():
     """Main function to run the enhanced call data import."""
+    parser = argparse.ArgumentParser(description="Import call data from Excel into JanssenCRM")
+    parser.add_argument('--async-writers', type=int, default=None,
+                        help="Number of concurrent batch writers (0 or 1 writes sequentially)")
+    parser.add_argument('--shard-writers', type=int, default=None,
+                        help="Number of parallel shard writers for customercall (0 or 1 disables sharding)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Parse, map and validate the Excel files without connecting to the database")
+    parser.add_argument('--update-histograms', action='store_true',
+                        help="Also refresh histograms on status, company_id and created_at after the import")
+    parser.add_argument('--progress-events', default=None,
+                        help="Write JSON progress events to a file, tcp://host:port or unix:///path")
+    parser.add_argument('--writer', default=None,
+                        help="Writer backend: mysql, mysql-statement, null, recording[:file], sqlite[:file] or sqldump[:file.sql.gz]")
+    parser.add_argument('--sort-by-key', action='store_true',
+                        help="Write every table in primary-key order")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="Memory budget in MB; larger workbooks are spilled to disk and imported in partitions")
+    parser.add_argument('--transactions', type=parse_transaction_strategies, default=None,
+                        help="Commit strategy: batch, table or savepoint, for all tables or per table "
+                             "(e.g. 'batch,governorates=table')")
+    parser.add_argument('--savepoint-rows', type=int, default=None,
+                        help="Rows between savepoints with the savepoint strategy")
+    parser.add_argument('--partition-exchange', action='store_true',
+                        help="Load past months of the partitioned call table through EXCHANGE PARTITION")
+    parser.add_argument('--key-index', default=None,
+                        help="Folder of the persistent call id index; reports ids loaded by earlier files or runs")
+    parser.add_argument('--key-conflicts', default=None, choices=['report', 'skip', 'fail'],
+                        help="Ids loaded before with different content: write anyway (default), leave out, or fail")
+    parser.add_argument('--hash-passwords', action='store_true',
+                        help="Give users random initial passwords stored as bcrypt hashes "
+                             "(needs a backend login that verifies bcrypt)")
+    parser.add_argument('--reset-passwords', action='store_true',
+                        help="With --hash-passwords, also replace the passwords of users already stored with a hash")
+    parser.add_argument('--password-workers', type=int, default=None,
+                        help="Processes hashing the user passwords (default: CPU count)")
+    parser.add_argument('--credential-folder', default=None,
+                        help="Folder of the credential report listing the generated passwords")
+    args = parser.parse_args()
+    
+    if args.update_histograms:
+        IMPORT_SETTINGS['update_histograms'] = True
+    if args.progress_events:
+        IMPORT_SETTINGS['progress_events'] = args.progress_events
+    if args.writer:
+        IMPORT_SETTINGS['writer'] = args.writer
+    if args.sort_by_key:
+        IMPORT_SETTINGS['sort_by_key'] = True
+    if args.memory_limit:
+        IMPORT_SETTINGS['memory_limit_mb'] = args.memory_limit
+    if args.transactions:
+        default_strategy, table_strategies = args.transactions
+        if default_strategy:
+            IMPORT_SETTINGS['transaction_strategy'] = default_strategy
+        IMPORT_SETTINGS['transaction_strategies'] = {**IMPORT_SETTINGS.get('transaction_strategies', {}),
+                                                     **table_strategies}
+    if args.savepoint_rows:
+        IMPORT_SETTINGS['savepoint_rows'] = args.savepoint_rows
+    if args.partition_exchange:
+        IMPORT_SETTINGS['partition_exchange'] = True
+    if args.key_index:
+        IMPORT_SETTINGS['key_index'] = args.key_index
+    if args.key_conflicts:
+        IMPORT_SETTINGS['key_conflicts'] = args.key_conflicts
+    if args.hash_passwords:
+        IMPORT_SETTINGS['hash_passwords'] = True
+    if args.reset_passwords:
+        IMPORT_SETTINGS['reset_passwords'] = True
+    if args.password_workers:
+        IMPORT_SETTINGS['password_workers'] = args.password_workers
+    if args.credential_folder:
+        IMPORT_SETTINGS['credential_folder'] = args.credential_folder
+    
     # Data folder path
     data_folder = os.path.join(os.path.dirname(__file__), 'data', 'call')
     
@@ -616,8 +845,15 @@ def main():
         print(f"Error: Data folder not found: {data_folder}")
         sys.exit(1)
     
+    if args.dry_run:
+        from import_dry_run import print_report, run_dry_run, save_report
+        report = run_dry_run({'call': data_folder})
+        print_report(report)
+        print(f"Dry-run report saved to: {save_report(report)}")
+        sys.exit(0 if report['ok'] else 1)
+    
     # Create importer instance
-    importer = EnhancedCallDataImporter()
+    importer = EnhancedCallDataImporter(async_writers=args.async_writers, shard_writers=args.shard_writers)
     
     # Run import
     print("Starting Enhanced JanssenCRM Call Data import process...")
@@ -11,7 +11,6 @@ Features:
 """
 
 import pandas as pd
-import mysql.connector
 from mysql.connector import Error
 import os
 import sys
@@ -20,6 +19,9 @@ import logging
 import time
 from typing import Dict, List, Tuple, Optional
 import json
+import argparse
+
+from import_common import BatchWriterMixin, convert_datetimes, parse_transaction_strategies, server_now
 
 # Import configuration
 try:
@@ -38,7 +40,26 @@ except ImportError:
     IMPORT_SETTINGS = {
         'batch_size': 1000,
         'max_retries': 3,
-        'log_level': 'INFO'
+        'log_level': 'INFO',
+        'async_writers': 0,
+        'reject_folder': 'rejects',
+        'reject_format': 'csv',
+        'analyze_after_import': True,
+        'update_histograms': False,
+        'histogram_columns': ['status', 'company_id', 'created_at'],
+        'histogram_buckets': 100,
+        'server_timezone': 'Africa/Cairo',
+        'source_timezone': None,
+        'progress_events': None,
+        'progress_log_seconds': 5,
+        'writer': 'mysql',
+        'sort_by_key': False,
+        'spill_folder': None,
+        'memory_limit_mb': None,
+        'transaction_strategy': 'batch',
+        'transaction_strategies': {},
+        'savepoint_rows': 50000,
+        'dedup_report': None
     }
     DEFAULT_VALUES = {
         'company_id': 0,
@@ -48,16 +69,52 @@ except ImportError:
         'city_id': 0
     }
 
-class EnhancedJanssenCRMDataImporter:
-    def __init__(self, config: Dict = None):
+class EnhancedJanssenCRMDataImporter(BatchWriterMixin):
+    # Import order (respecting foreign key constraints): (table name, Excel file, import method)
+    IMPORT_TASKS = [
+        ('governorates', 'governorate.xlsx', 'import_governorates'),
+        ('cities', 'city_id.xlsx', 'import_cities'),
+        ('customers', 'customers.xlsx', 'import_customers'),
+        ('customer_phones', 'C_Mobile_id.xlsx', 'import_customer_phones')
+    ]
+    
+    # Excel header -> database column renames applied by each prepare_* method;
+    # data_export.py applies them in reverse
+    COLUMN_MAPPINGS = {
+        'governorates': {'governorate': 'name'},
+        'cities': {
+            'areas': 'name',
+            'id_governorates': 'governorate_id'
+        },
+        'customers': {
+            'cusotmerName': 'name',
+            'id_governorates': 'governomate_id',
+            'id_city': 'city_id',
+            'adress': 'address'
+        },
+        'customer_phones': {'mobilenum': 'phone'}
+    }
+    
+    def __init__(self, config: Dict = None, async_writers: Optional[int] = None, dry_run: bool = False):
         """Initialize the enhanced data importer."""
         self.config = config or DATABASE_CONFIG
         self.connection = None
         self.cursor = None
+        self.import_settings = IMPORT_SETTINGS
+        self.dry_run = dry_run
+        self.async_writers = async_writers if async_writers is not None else IMPORT_SETTINGS.get('async_writers', 0)
+        self.changed_tables = set()
+        self.task_results = {}
+        self.write_progress = {}
         self.stats = {
             'total_records': 0,
             'successful_imports': 0,
             'failed_imports': 0,
+            'rejected_rows': 0,
+            'lock_retries': 0,
+            'reconnects': 0,
+            'analyze_seconds': {},
+            'tables': {},
             'start_time': None,
             'end_time': None
         }
@@ -72,21 +129,25 @@ class EnhancedJanssenCRMDataImporter:
         # Create formatter
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         
-        # Create file handler with UTF-8 encoding
-        file_handler = logging.FileHandler(
-            f'data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log',
-            encoding='utf-8'
-        )
-        file_handler.setFormatter(formatter)
-        
         # Create console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
+        handlers = [console_handler]
+        
+        # Create file handler with UTF-8 encoding (dry runs leave no log file
+        # behind; under import_cli.py the log file is already open)
+        if not self.dry_run and not logging.getLogger().handlers:
+            file_handler = logging.FileHandler(
+                f'data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log',
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(formatter)
+            handlers.insert(0, file_handler)
         
         # Configure root logger
         logging.basicConfig(
             level=log_level,
-            handlers=[file_handler, console_handler]
+            handlers=handlers
         )
         self.logger = logging.getLogger(__name__)
         
@@ -94,7 +155,7 @@ class EnhancedJanssenCRMDataImporter:
         """Establish database connection with retry logic."""
         for attempt in range(IMPORT_SETTINGS['max_retries']):
             try:
-                self.connection = mysql.connector.connect(**self.config)
+                self.connection = self._new_connection()
                 self.cursor = self.connection.cursor()
                 self.logger.info("Successfully connected to database")
                 return True
@@ -113,6 +174,7 @@ class EnhancedJanssenCRMDataImporter:
             self.cursor.close()
         if self.connection:
             self.connection.close()
+        self._close_writer()
         self.logger.info("Database connection closed")
     
     def validate_data(self, df: pd.DataFrame, table_name: str) -> Tuple[bool, List[str]]:
@@ -182,11 +244,24 @@ class EnhancedJanssenCRMDataImporter:
         
         return len(errors) == 0, errors
     
+    def prepare_governorates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce governorates data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['governorate', 'id']
+        # Database expects: ['id', 'name']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['governorates'])
+        
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in governorate names. Please check the Excel file.")
+        
+        return df_mapped
+    
     def import_governorates(self, excel_file: str) -> bool:
         """Import governorates data from Excel file."""
         try:
             self.logger.info(f"Importing governorates from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'governorates')
@@ -195,33 +270,20 @@ class EnhancedJanssenCRMDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['governorate', 'id']
-            # Database expects: ['id', 'name']
-            df_mapped = df.rename(columns={'governorate': 'name'})
-            
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in governorate names. Please check the Excel file.")
-                return False
+            df_mapped = self.prepare_governorates(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO governorates (id, name) 
-                    VALUES (%s, %s) 
-                    ON DUPLICATE KEY UPDATE name = VALUES(name)
-                    """
-                    self.cursor.execute(query, (row['id'], row['name']))
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO governorates (id, name) 
+            VALUES (%s, %s) 
+            ON DUPLICATE KEY UPDATE name = VALUES(name)
+            """
+            df_mapped = self._in_key_order('governorates', df_mapped)
+            rows = [(row['id'], row['name']) for _, row in df_mapped.iterrows()]
+            self._write_rows('governorates', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} governorates")
@@ -234,11 +296,24 @@ class EnhancedJanssenCRMDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_cities(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce cities data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['areas', 'id', 'id_governorates']
+        # Database expects: ['id', 'name', 'governorate_id']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['cities'])
+        
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in city names. Please check the Excel file.")
+        
+        return df_mapped
+    
     def import_cities(self, excel_file: str) -> bool:
         """Import cities data from Excel file."""
         try:
             self.logger.info(f"Importing cities from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'cities')
@@ -247,38 +322,22 @@ class EnhancedJanssenCRMDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['areas', 'id', 'id_governorates']
-            # Database expects: ['id', 'name', 'governorate_id']
-            df_mapped = df.rename(columns={
-                'areas': 'name',
-                'id_governorates': 'governorate_id'
-            })
-            
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in city names. Please check the Excel file.")
-                return False
+            df_mapped = self.prepare_cities(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO cities (id, name, governorate_id) 
-                    VALUES (%s, %s, %s) 
-                    ON DUPLICATE KEY UPDATE 
-                        name = VALUES(name), 
-                        governorate_id = VALUES(governorate_id)
-                    """
-                    self.cursor.execute(query, (row['id'], row['name'], row['governorate_id']))
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO cities (id, name, governorate_id) 
+            VALUES (%s, %s, %s) 
+            ON DUPLICATE KEY UPDATE 
+                name = VALUES(name), 
+                governorate_id = VALUES(governorate_id)
+            """
+            df_mapped = self._in_key_order('cities', df_mapped)
+            rows = [(row['id'], row['name'], row['governorate_id']) for _, row in df_mapped.iterrows()]
+            self._write_rows('cities', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} cities")
@@ -291,11 +350,37 @@ class EnhancedJanssenCRMDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_customers(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce customers data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'cusotmerName', 'id_governorates', 'id_city', 'adress', 'notes', 'created_by', 'created_at', 'updated_at']
+        # Database expects: ['id', 'company_id', 'name', 'governomate_id', 'city_id', 'address', 'notes', 'created_by', 'created_at', 'updated_at']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['customers'])
+        
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in customer names. Please check the Excel file.")
+        
+        # Handle missing values and data types properly
+        # Fill NaN values with appropriate defaults
+        df_mapped['company_id'] = df_mapped['company_id'].fillna(DEFAULT_VALUES['company_id']).astype(int)
+        df_mapped['governomate_id'] = df_mapped['governomate_id'].fillna(DEFAULT_VALUES['governorate_id']).astype(int)
+        df_mapped['city_id'] = df_mapped['city_id'].fillna(DEFAULT_VALUES['city_id']).astype(int)
+        df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype(int)
+        
+        # Handle notes column - it's all NaN, so fill with empty string
+        df_mapped['notes'] = df_mapped['notes'].fillna('').astype(str)
+        
+        # Parse datetime columns once, in server time, with NULL for empty cells
+        convert_datetimes(df_mapped, ['created_at', 'updated_at'], self.import_settings)
+        
+        return df_mapped
+    
     def import_customers(self, excel_file: str) -> bool:
         """Import customers data from Excel file."""
         try:
             self.logger.info(f"Importing customers from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'customers')
@@ -304,69 +389,35 @@ class EnhancedJanssenCRMDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'cusotmerName', 'id_governorates', 'id_city', 'adress', 'notes', 'created_by', 'created_at', 'updated_at']
-            # Database expects: ['id', 'company_id', 'name', 'governomate_id', 'city_id', 'address', 'notes', 'created_by', 'created_at', 'updated_at']
-            df_mapped = df.rename(columns={
-                'cusotmerName': 'name',
-                'id_governorates': 'governomate_id',  # Database column name has typo
-                'id_city': 'city_id',
-                'adress': 'address'
-            })
-            
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in customer names. Please check the Excel file.")
-                return False
-            
-            # Handle missing values and data types properly
-            # Fill NaN values with appropriate defaults
-            df_mapped['company_id'] = df_mapped['company_id'].fillna(DEFAULT_VALUES['company_id']).astype(int)
-            df_mapped['governomate_id'] = df_mapped['governomate_id'].fillna(DEFAULT_VALUES['governorate_id']).astype(int)
-            df_mapped['city_id'] = df_mapped['city_id'].fillna(DEFAULT_VALUES['city_id']).astype(int)
-            df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype(int)
-            
-            # Handle notes column - it's all NaN, so fill with empty string
-            df_mapped['notes'] = df_mapped['notes'].fillna('').astype(str)
-            
-            # Convert datetime columns to MySQL-compatible format
-            df_mapped['created_at'] = pd.to_datetime(df_mapped['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
-            df_mapped['updated_at'] = pd.to_datetime(df_mapped['updated_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
+            df_mapped = self.prepare_customers(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO customers (
-                        id, company_id, name, governomate_id, city_id, 
-                        address, notes, created_by, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        company_id = VALUES(company_id),
-                        name = VALUES(name),
-                        governomate_id = VALUES(governomate_id),
-                        city_id = VALUES(city_id),
-                        address = VALUES(address),
-                        notes = VALUES(notes),
-                        created_by = VALUES(created_by),
-                        updated_at = VALUES(updated_at)
-                    """
-                    
-                    values = (
-                        row['id'], row['company_id'], row['name'], 
-                        row['governomate_id'], row['city_id'], row['address'],
-                        row['notes'], row['created_by'], row['created_at'], row['updated_at']
-                    )
-                    
-                    self.cursor.execute(query, values)
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO customers (
+                id, company_id, name, governomate_id, city_id, 
+                address, notes, created_by, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+                company_id = VALUES(company_id),
+                name = VALUES(name),
+                governomate_id = VALUES(governomate_id),
+                city_id = VALUES(city_id),
+                address = VALUES(address),
+                notes = VALUES(notes),
+                created_by = VALUES(created_by),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._in_key_order('customers', df_mapped)
+            rows = [
+                (row['id'], row['company_id'], row['name'], 
+                 row['governomate_id'], row['city_id'], row['address'],
+                 row['notes'], row['created_by'], row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            self._write_rows('customers', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} customers")
@@ -381,7 +432,11 @@ class EnhancedJanssenCRMDataImporter:
     
     def get_column_info(self, table_name: str, column_name: str) -> Optional[Dict]:
         """Get information about a specific database column."""
+        if self.cursor is None:
+            return None
         try:
+            if self.schema_cache is not None:
+                return self.schema_cache.column_info(self.cursor, table_name, column_name)
             query = """
             SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, IS_NULLABLE, COLUMN_DEFAULT
             FROM INFORMATION_SCHEMA.COLUMNS 
@@ -403,11 +458,56 @@ class EnhancedJanssenCRMDataImporter:
             self.logger.error(f"Error getting column info for {table_name}.{column_name}: {e}")
             return None
 
+    def prepare_customer_phones(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce customer phones data into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['customer_id', 'mobilenum']
+        # Database expects: ['customer_id', 'phone']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['customer_phones'])
+        
+        # Check for null values in required columns
+        if df_mapped['customer_id'].isnull().any():
+            raise ValueError("Found null values in customer_id. Please check the Excel file.")
+        
+        # Get database column information for phone column
+        phone_column_info = self.get_column_info('customer_phones', 'phone')
+        if phone_column_info:
+            self.logger.info(f"Phone column info: {phone_column_info}")
+            max_db_length = phone_column_info.get('max_length', 20)
+        else:
+            max_db_length = 20  # Default fallback
+            self.logger.warning("Could not get phone column info, using default max length of 20")
+        
+        # Check phone number lengths and truncate if necessary
+        phone_lengths = df_mapped['phone'].astype(str).str.len()
+        min_length = phone_lengths.min()
+        max_length = phone_lengths.max()
+        self.logger.info(f"Phone number lengths - Min: {min_length}, Max: {max_length}, DB max: {max_db_length}")
+        
+        if max_length > max_db_length:
+            self.logger.warning(f"Some phone numbers exceed {max_db_length} characters. Truncating to fit database column.")
+            df_mapped['phone'] = df_mapped['phone'].astype(str).str[:max_db_length]
+            
+            # Log some examples of truncated numbers
+            long_numbers = df_mapped[phone_lengths > max_db_length]['phone'].head(3)
+            if not long_numbers.empty:
+                self.logger.info(f"Examples of truncated numbers: {long_numbers.tolist()}")
+        
+        # Add missing columns with default values
+        df_mapped['company_id'] = DEFAULT_VALUES['company_id']
+        df_mapped['phone_type'] = DEFAULT_VALUES['phone_type']
+        df_mapped['created_by'] = DEFAULT_VALUES['created_by']
+        now = server_now(self.import_settings)
+        df_mapped['created_at'] = now
+        df_mapped['updated_at'] = now
+        
+        return df_mapped
+    
     def import_customer_phones(self, excel_file: str) -> bool:
         """Import customer phones data from Excel file."""
         try:
             self.logger.info(f"Importing customer phones from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'customer_phones')
@@ -416,79 +516,30 @@ class EnhancedJanssenCRMDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['customer_id', 'mobilenum']
-            # Database expects: ['customer_id', 'phone']
-            df_mapped = df.rename(columns={
-                'customer_id': 'customer_id',
-                'mobilenum': 'phone'
-            })
-            
-            # Check for null values in required columns
-            if df_mapped['customer_id'].isnull().any():
-                self.logger.error("Found null values in customer_id. Please check the Excel file.")
-                return False
-            
-            # Get database column information for phone column
-            phone_column_info = self.get_column_info('customer_phones', 'phone')
-            if phone_column_info:
-                self.logger.info(f"Phone column info: {phone_column_info}")
-                max_db_length = phone_column_info.get('max_length', 20)
-            else:
-                max_db_length = 20  # Default fallback
-                self.logger.warning("Could not get phone column info, using default max length of 20")
-            
-            # Check phone number lengths and truncate if necessary
-            phone_lengths = df_mapped['phone'].astype(str).str.len()
-            min_length = phone_lengths.min()
-            max_length = phone_lengths.max()
-            self.logger.info(f"Phone number lengths - Min: {min_length}, Max: {max_length}, DB max: {max_db_length}")
-            
-            if max_length > max_db_length:
-                self.logger.warning(f"Some phone numbers exceed {max_db_length} characters. Truncating to fit database column.")
-                df_mapped['phone'] = df_mapped['phone'].astype(str).str[:max_db_length]
-                
-                # Log some examples of truncated numbers
-                long_numbers = df_mapped[phone_lengths > max_db_length]['phone'].head(3)
-                if not long_numbers.empty:
-                    self.logger.info(f"Examples of truncated numbers: {long_numbers.tolist()}")
-            
-            # Add missing columns with default values
-            df_mapped['company_id'] = DEFAULT_VALUES['company_id']
-            df_mapped['phone_type'] = DEFAULT_VALUES['phone_type']
-            df_mapped['created_by'] = DEFAULT_VALUES['created_by']
-            df_mapped['created_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            df_mapped['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            df_mapped = self.prepare_customer_phones(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO customer_phones (
-                        customer_id, company_id, phone, phone_type, 
-                        created_by, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        company_id = VALUES(company_id),
-                        phone = VALUES(phone),
-                        phone_type = VALUES(phone_type),
-                        updated_at = VALUES(updated_at)
-                    """
-                    
-                    values = (
-                        row['customer_id'], row['company_id'], row['phone'],
-                        row['phone_type'], row['created_by'], row['created_at'], row['updated_at']
-                    )
-                    
-                    self.cursor.execute(query, values)
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO customer_phones (
+                customer_id, company_id, phone, phone_type, 
+                created_by, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+                company_id = VALUES(company_id),
+                phone = VALUES(phone),
+                phone_type = VALUES(phone_type),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._in_key_order('customer_phones', df_mapped)
+            rows = [
+                (row['customer_id'], row['company_id'], row['phone'],
+                 row['phone_type'], row['created_by'], row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            self._write_rows('customer_phones', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} customer phones")
@@ -501,39 +552,49 @@ class EnhancedJanssenCRMDataImporter:
                 self.connection.rollback()
             return False
     
-    def run_import(self, data_folder: str) -> bool:
-        """Run the complete import process."""
+    def run_import(self, data_folder: str, task_names: Optional[List[str]] = None) -> bool:
+        """Run the complete import process.
+
+        ``task_names`` limits the run to those tables of IMPORT_TASKS; the
+        outcome of each task is recorded in ``task_results``.
+        """
         self.stats['start_time'] = datetime.now()
         
         try:
             if not self.connect():
                 return False
             
-            # Define import order (respecting foreign key constraints)
-            import_tasks = [
-                ('governorates', 'governorate.xlsx', self.import_governorates),
-                ('cities', 'city_id.xlsx', self.import_cities),
-                ('customers', 'customers.xlsx', self.import_customers),
-                ('customer_phones', 'C_Mobile_id.xlsx', self.import_customer_phones)
-            ]
-            
             success_count = 0
-            total_tasks = len(import_tasks)
+            tasks = [task for task in self.IMPORT_TASKS if not task_names or task[0] in task_names]
+            total_tasks = len(tasks)
             
-            for table_name, excel_file, import_func in import_tasks:
+            for table_name, excel_file, method_name in tasks:
                 file_path = os.path.join(data_folder, excel_file)
+                import_func = getattr(self, method_name)
                 
                 if not os.path.exists(file_path):
                     self.logger.warning(f"Excel file not found: {file_path}")
+                    self.task_results[table_name] = None
                     continue
                 
                 self.logger.info(f"Starting import for {table_name}...")
-                if import_func(file_path):
+                self._table_started(table_name, file_path)
+                success = self._run_import_task(file_path, import_func)
+                self._table_finished(table_name, success)
+                if success:
                     success_count += 1
+                    self.task_results[table_name] = True
                     self.logger.info(f"[SUCCESS] Successfully imported {table_name}")
                 else:
+                    self.task_results[table_name] = False
                     self.logger.error(f"[FAILED] Failed to import {table_name}")
             
+            if IMPORT_SETTINGS.get('analyze_after_import', True) and self.changed_tables:
+                self.analyze_changed_tables()
+            
+            if self.import_settings.get('dedup_report') and self.task_results.get('customers'):
+                self.report_duplicate_customers(data_folder)
+            
             self.stats['end_time'] = datetime.now()
             self._print_summary(success_count, total_tasks)
             
@@ -545,6 +606,35 @@ class EnhancedJanssenCRMDataImporter:
         finally:
             self.disconnect()
     
+    def report_duplicate_customers(self, data_folder: str):
+        """Write the likely duplicate customers of the imported workbooks to the dedup_report folder.
+
+        Only a report: merging customers moves their calls and tickets and is
+        left to someone reading it.
+        """
+        from customer_dedup import report_duplicate_customers
+
+        files = {task: excel_file for task, excel_file, _ in self.IMPORT_TASKS}
+        try:
+            customers = self._read_workbook(os.path.join(data_folder, files['customers']))
+            customers = customers.rename(columns=self.COLUMN_MAPPINGS['customers'])
+            phones_file = os.path.join(data_folder, files['customer_phones'])
+            phones = None
+            if os.path.exists(phones_file):
+                phones = self._read_workbook(phones_file).rename(columns=self.COLUMN_MAPPINGS['customer_phones'])
+            
+            folder = self.import_settings['dedup_report']
+            os.makedirs(folder, exist_ok=True)
+            output = os.path.join(folder, f'duplicate_customers_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+            summary, report = report_duplicate_customers(customers, phones, output)
+        except (OSError, KeyError, ValueError) as e:
+            # The import itself succeeded; a missing report should not fail it
+            self.logger.warning(f"Duplicate customer report failed: {e}")
+            return
+        self.logger.info(f"{summary['candidates']} likely duplicate customer pairs "
+                         f"({summary['by_shared_phone']} sharing a phone) in {summary['seconds']}s, "
+                         f"report saved to: {report}")
+    
     def _print_summary(self, success_count: int, total_tasks: int):
         """Print import summary and statistics."""
         duration = self.stats['end_time'] - self.stats['start_time']
@@ -556,6 +646,10 @@ class EnhancedJanssenCRMDataImporter:
         self.logger.info(f"Successful imports: {success_count}")
         self.logger.info(f"Failed imports: {total_tasks - success_count}")
         self.logger.info(f"Total records processed: {self.stats['total_records']}")
+        self.logger.info(f"Rejected rows: {self.stats['rejected_rows']}")
+        self.logger.info(f"Lock conflict retries: {self.stats['lock_retries']}")
+        self.logger.info(f"Reconnects: {self.stats['reconnects']}")
+        self.logger.info(f"Statistics refresh: {len(self.stats['analyze_seconds'])} tables in {sum(self.stats['analyze_seconds'].values()):.2f}s")
         self.logger.info(f"Total time: {duration}")
         self.logger.info(f"Average time per record: {duration / max(self.stats['total_records'], 1)}")
         self.logger.info("=" * 60)
@@ -564,9 +658,16 @@ class EnhancedJanssenCRMDataImporter:
         stats_file = f'import_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
         with open(stats_file, 'w', encoding='utf-8') as f:
             json.dump({
+                'importer': type(self).__module__,
+                'writer': self.import_settings.get('writer', 'mysql'),
                 'success_count': success_count,
                 'total_tasks': total_tasks,
                 'total_records': self.stats['total_records'],
+                'rejected_rows': self.stats['rejected_rows'],
+                'lock_retries': self.stats['lock_retries'],
+                'reconnects': self.stats['reconnects'],
+                'analyze_seconds': self.stats['analyze_seconds'],
+                'tables': self.stats['tables'],
                 'start_time': self.stats['start_time'].isoformat(),
                 'end_time': self.stats['end_time'].isoformat(),
                 'duration_seconds': duration.total_seconds()
@@ -576,6 +677,51 @@ class EnhancedJanssenCRMDataImporter:
 
 def main():
     """Main function to run the enhanced data import."""
+    parser = argparse.ArgumentParser(description="Import customer data from Excel into JanssenCRM")
+    parser.add_argument('--async-writers', type=int, default=None,
+                        help="Number of concurrent batch writers (0 or 1 writes sequentially)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Parse, map and validate the Excel files without connecting to the database")
+    parser.add_argument('--update-histograms', action='store_true',
+                        help="Also refresh histograms on status, company_id and created_at after the import")
+    parser.add_argument('--progress-events', default=None,
+                        help="Write JSON progress events to a file, tcp://host:port or unix:///path")
+    parser.add_argument('--writer', default=None,
+                        help="Writer backend: mysql, mysql-statement, null, recording[:file], sqlite[:file] or sqldump[:file.sql.gz]")
+    parser.add_argument('--sort-by-key', action='store_true',
+                        help="Write every table in primary-key order")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="Memory budget in MB; larger workbooks are spilled to disk and imported in partitions")
+    parser.add_argument('--transactions', type=parse_transaction_strategies, default=None,
+                        help="Commit strategy: batch, table or savepoint, for all tables or per table "
+                             "(e.g. 'batch,governorates=table')")
+    parser.add_argument('--savepoint-rows', type=int, default=None,
+                        help="Rows between savepoints with the savepoint strategy")
+    parser.add_argument('--dedup-report', default=None,
+                        help="Folder for a report of likely duplicate customers after the import")
+    args = parser.parse_args()
+    
+    if args.update_histograms:
+        IMPORT_SETTINGS['update_histograms'] = True
+    if args.progress_events:
+        IMPORT_SETTINGS['progress_events'] = args.progress_events
+    if args.writer:
+        IMPORT_SETTINGS['writer'] = args.writer
+    if args.sort_by_key:
+        IMPORT_SETTINGS['sort_by_key'] = True
+    if args.memory_limit:
+        IMPORT_SETTINGS['memory_limit_mb'] = args.memory_limit
+    if args.transactions:
+        default_strategy, table_strategies = args.transactions
+        if default_strategy:
+            IMPORT_SETTINGS['transaction_strategy'] = default_strategy
+        IMPORT_SETTINGS['transaction_strategies'] = {**IMPORT_SETTINGS.get('transaction_strategies', {}),
+                                                     **table_strategies}
+    if args.savepoint_rows:
+        IMPORT_SETTINGS['savepoint_rows'] = args.savepoint_rows
+    if args.dedup_report:
+        IMPORT_SETTINGS['dedup_report'] = args.dedup_report
+    
     # Data folder path
     data_folder = os.path.join(os.path.dirname(__file__), 'data', 'cutomer')
     
@@ -584,8 +730,15 @@ def main():
         print(f"Error: Data folder not found: {data_folder}")
         sys.exit(1)
     
+    if args.dry_run:
+        from import_dry_run import print_report, run_dry_run, save_report
+        report = run_dry_run({'customer': data_folder})
+        print_report(report)
+        print(f"Dry-run report saved to: {save_report(report)}")
+        sys.exit(0 if report['ok'] else 1)
+    
     # Create importer instance
-    importer = EnhancedJanssenCRMDataImporter()
+    importer = EnhancedJanssenCRMDataImporter(async_writers=args.async_writers)
     
     # Run import
     print("Starting Enhanced JanssenCRM data import process...")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Duplicate Customer Detection
+The importers upsert customers by legacy id, so one person entered twice,
+with a different Arabic spelling or under a second id sharing a phone,
+becomes two customers with split call and ticket history. This script lists
+likely duplicates as merge candidates with a confidence; it never merges.
+Features:
+- Arabic name normalization (diacritics, tatweel, alef/yaa/taa marbuta forms,
+  Arabic-Indic digits) and Egyptian phone normalization
+- Blocking on normalized phone and on governorate + name prefix, compared
+  with a sorted-neighbourhood window, so the work grows with n * window
+  instead of n^2
+- Vectorized scoring: character bigrams hashed into 256-bit signatures,
+  Dice similarity by popcount over all candidate pairs at once
+- CSV/JSON report of the candidate pairs with the evidence behind each
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from import_common import IMPORTERS, importer_class
+
+# Spelling variants folded to one letter; diacritics (tashkeel), superscript alef
+# and tatweel carry no identity and are dropped. Regex replacements rather than
+# str.translate, so pandas runs them on whole columns
+ARABIC_FOLDING = [
+    ('[أإآٱ]', 'ا'), ('[ىئ]', 'ي'), ('ؤ', 'و'), ('ة', 'ه'), ('[\u064B-\u0652\u0670\u0640]', ''),
+]
+# Arabic-Indic and Persian digits in phone numbers
+DIGIT_FOLDING = str.maketrans({chr(base + digit): str(digit) for base in (0x0660, 0x06F0) for digit in range(10)})
+# Explicit ranges rather than \w: pandas may run the patterns on RE2, where \w is ASCII only
+NOT_NAME = '[^0-9A-Za-z\u0621-\u064A ]+'
+
+SIGNATURE_BITS = 256
+NAME_PREFIX = 3
+# Phones shared by more customers than this are switchboards or placeholders, not evidence
+MAX_PHONE_BLOCK = 5
+SCORE_BLOCK_PAIRS = 1000000
+
+
+def normalize_names(values: pd.Series) -> pd.Series:
+    """Fold spelling variants of Arabic names to one form, keeping single spaces between words."""
+    text = values.fillna('').astype(str).str.lower()
+    for pattern, replacement in ARABIC_FOLDING:
+        text = text.str.replace(pattern, replacement, regex=True)
+    text = text.str.replace(NOT_NAME, ' ', regex=True).str.replace(' +', ' ', regex=True).str.strip()
+    # "عبد الله" and "عبدالله" are the same name
+    return text.str.replace('(^| )عبد ', r'\1عبد', regex=True)
+
+
+def normalize_phones(values: pd.Series) -> pd.Series:
+    """Egyptian numbers as 0XXXXXXXXXX: digits only, country code and missing leading zero fixed."""
+    digits = values.fillna('').astype(str).str.translate(DIGIT_FOLDING).str.replace(r'\.0$', '', regex=True)
+    digits = digits.str.replace(r'\D', '', regex=True).str.replace(r'^(?:00)?20(1\d{9})$', r'\1', regex=True)
+    digits = digits.where(~digits.str.fullmatch(r'1\d{9}'), '0' + digits)
+    # Too short to identify anyone
+    return digits.where(digits.str.len() >= 7, '')
+
+
+def bigram_signatures(texts: pd.Series) -> np.ndarray:
+    """(n, 4) uint64 bitsets of the hashed character bigrams of each text (spaces excluded)."""
+    compact = texts.str.replace(' ', '', regex=False).tolist()
+    signatures = np.zeros((len(compact), SIGNATURE_BITS // 64), dtype=np.uint64)
+    if not compact:
+        return signatures
+    # All texts in one code point array, separated by 0, so the bigrams are computed at once
+    codes = np.frombuffer('\0'.join(compact).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    owners = np.cumsum(codes == 0)
+    valid = (codes[:-1] != 0) & (codes[1:] != 0)
+    bits = ((codes[:-1] * np.uint64(31) + codes[1:]) * np.uint64(2654435761) >> np.uint64(7)) % np.uint64(SIGNATURE_BITS)
+    owners, bits = owners[:-1][valid], bits[valid]
+    np.bitwise_or.at(signatures, (owners, (bits // np.uint64(64)).astype(np.intp)),
+                     np.left_shift(np.uint64(1), bits % np.uint64(64)))
+    return signatures
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).sum(axis=-1)
+    return np.unpackbits(values.view(np.uint8), axis=-1).sum(axis=-1)
+
+
+def dice_similarity(signatures: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Dice coefficient of the bigram signatures of each (left, right) pair."""
+    scores = np.empty(len(left))
+    # In slices, so tens of millions of pairs do not materialize as many (pairs, 4) arrays
+    for start in range(0, len(left), SCORE_BLOCK_PAIRS):
+        a = signatures[left[start:start + SCORE_BLOCK_PAIRS]]
+        b = signatures[right[start:start + SCORE_BLOCK_PAIRS]]
+        sizes = _popcount(a) + _popcount(b)
+        scores[start:start + SCORE_BLOCK_PAIRS] = np.where(sizes > 0, 2 * _popcount(a & b) / np.maximum(sizes, 1), 0.0)
+    return scores
+
+
+def window_pairs(keys: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs of positions up to ``window`` apart that share a key, over keys sorted into blocks."""
+    lefts = []
+    for distance in range(1, min(window, len(keys) - 1) + 1):
+        same = np.flatnonzero(keys[:-distance] == keys[distance:])
+        lefts.append((same, same + distance))
+    if not lefts:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    return np.concatenate([left for left, _ in lefts]), np.concatenate([right for _, right in lefts])
+
+
+def block_codes(*columns: pd.Series) -> np.ndarray:
+    """Integer code per distinct combination of ``columns``; equal codes form a block."""
+    return pd.MultiIndex.from_arrays(columns).factorize()[0] if len(columns) > 1 else columns[0].factorize()[0]
+
+
+def find_duplicate_customers(customers: pd.DataFrame, phones: Optional[pd.DataFrame] = None,
+                             threshold: float = 0.8, window: int = 20) -> pd.DataFrame:
+    """Return merge candidates among ``customers`` (mapped customer columns) with their confidence.
+
+    ``phones`` (customer_id, phone) adds the shared-phone blocks. Pairs in a
+    phone block score 0.55 + 0.35 * name + 0.1 * address similarity; pairs
+    only in a name block 0.6 * name + 0.25 * address + 0.15 * same city.
+    Within a name block, customers are compared with the ``window`` nearest in
+    normalized-name order.
+    """
+    customers = customers.reset_index(drop=True)
+    count = len(customers)
+    names = normalize_names(customers['name'])
+    addresses = customers['address'] if 'address' in customers else pd.Series('', index=customers.index)
+    ids = customers['id'].to_numpy(dtype=np.int64)
+    cities = customers['city_id'].to_numpy()
+
+    # Name blocks: governorate + name prefix, names sorted inside each block
+    block = block_codes(customers['governomate_id'].fillna(0), names.str[:NAME_PREFIX])
+    order = np.lexsort((pd.factorize(names, sort=True)[0], block))
+    left, right = window_pairs(block[order], window)
+    left, right = order[left], order[right]
+    left, right = np.minimum(left, right), np.maximum(left, right)
+    phone_of = np.full(len(left), -1)
+    shared_phones = np.empty(0, dtype=object)
+
+    # Phone blocks: customers sharing a normalized number
+    if phones is not None and not phones.empty:
+        position = pd.Series(np.arange(count), index=ids)
+        shared = pd.DataFrame({'phone': normalize_phones(phones['phone']), 'customer_id': phones['customer_id']})
+        shared = shared[(shared['phone'] != '') & shared['customer_id'].isin(position.index)].drop_duplicates()
+        sizes = shared.groupby('phone')['customer_id'].transform('size')
+        shared = shared[(sizes > 1) & (sizes <= MAX_PHONE_BLOCK)].sort_values(['phone', 'customer_id'])
+        codes, shared_phones = pd.factorize(shared['phone'])
+        phone_left, phone_right = window_pairs(codes, MAX_PHONE_BLOCK)
+        members = position[shared['customer_id']].to_numpy()
+        low = np.minimum(members[phone_left], members[phone_right])
+        high = np.maximum(members[phone_left], members[phone_right])
+        # One row per pair of customers (two shared numbers, or one customer listed twice),
+        # and a pair found in a name block too keeps its phone evidence
+        phone_keys, first = np.unique(low.astype(np.int64) * count + high, return_index=True)
+        first = first[low[first] != high[first]]
+        by_name = ~np.isin(left.astype(np.int64) * count + right, phone_keys)
+        left = np.concatenate([low[first], left[by_name]])
+        right = np.concatenate([high[first], right[by_name]])
+        phone_of = np.concatenate([codes[phone_left][first], phone_of[by_name]])
+
+    # Address and city only decide pairs whose names are close enough to reach the threshold
+    by_phone = phone_of >= 0
+    name_score = dice_similarity(bigram_signatures(names), left, right)
+    possible = np.where(by_phone, 0.65 + 0.35 * name_score, 0.4 + 0.6 * name_score) >= threshold
+    left, right, phone_of = left[possible], right[possible], phone_of[possible]
+    name_score, by_phone = name_score[possible], by_phone[possible]
+    involved, positions = np.unique(np.concatenate([left, right]), return_inverse=True)
+    address_signatures = bigram_signatures(normalize_names(addresses.iloc[involved]))
+    address_score = dice_similarity(address_signatures, positions[:len(left)], positions[len(left):])
+    same_city = cities[left] == cities[right]
+    confidence = np.where(by_phone, 0.55 + 0.35 * name_score + 0.1 * address_score,
+                          0.6 * name_score + 0.25 * address_score + 0.15 * same_city)
+
+    keep = confidence >= threshold
+    left, right, phone_of = left[keep], right[keep], phone_of[keep]
+    swap = ids[left] > ids[right]
+    left, right = np.where(swap, right, left), np.where(swap, left, right)
+    candidates = pd.DataFrame({
+        'customer_id': ids[left],
+        'duplicate_id': ids[right],
+        'confidence': confidence[keep].round(3),
+        'name_similarity': name_score[keep].round(3),
+        'address_similarity': address_score[keep].round(3),
+        'same_city': same_city[keep],
+        'shared_phone': np.where(phone_of >= 0, np.asarray(shared_phones, dtype=object)[np.maximum(phone_of, 0)]
+                                 if len(shared_phones) else '', ''),
+        'name': customers['name'].to_numpy()[left],
+        'duplicate_name': customers['name'].to_numpy()[right],
+    })
+    return candidates.sort_values(['confidence', 'customer_id'], ascending=[False, True]).reset_index(drop=True)
+
+
+def load_customers(data_folder: str) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """Read customers.xlsx and C_Mobile_id.xlsx with the customer importer's column names."""
+    cls = importer_class('customer')
+    files = {task: excel_file for task, excel_file, _ in cls.IMPORT_TASKS}
+    customers = pd.read_excel(os.path.join(data_folder, files['customers']))
+    customers = customers.rename(columns=cls.COLUMN_MAPPINGS['customers'])
+    phones_file = os.path.join(data_folder, files['customer_phones'])
+    phones = None
+    if os.path.exists(phones_file):
+        phones = pd.read_excel(phones_file).rename(columns=cls.COLUMN_MAPPINGS['customer_phones'])
+    return customers, phones
+
+
+def save_report(candidates: pd.DataFrame, summary: Dict, output: Optional[str] = None) -> str:
+    """Write the candidates as CSV next to a JSON summary and return the CSV path."""
+    output = output or f'duplicate_customers_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    candidates.to_csv(output, index=False, encoding='utf-8-sig')
+    with open(os.path.splitext(output)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return output
+
+
+def summarize(candidates: pd.DataFrame, customers: int, seconds: float) -> Dict:
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'customers': customers,
+        'candidates': len(candidates),
+        'by_shared_phone': int((candidates['shared_phone'] != '').sum()),
+        'customers_involved': int(pd.concat([candidates['customer_id'], candidates['duplicate_id']]).nunique()),
+        'seconds': round(seconds, 3),
+    }
+
+
+def report_duplicate_customers(customers: pd.DataFrame, phones: Optional[pd.DataFrame] = None,
+                               output: Optional[str] = None, threshold: float = 0.8,
+                               window: int = 20) -> Tuple[Dict, str]:
+    """Find the merge candidates, save the report and return its summary and CSV path."""
+    started = time.perf_counter()
+    candidates = find_duplicate_customers(customers, phones, threshold, window)
+    summary = summarize(candidates, len(customers), time.perf_counter() - started)
+    return summary, save_report(candidates, summary, output)
+
+
+def main():
+    """Main function to list duplicate customer candidates in the customer workbooks."""
+    parser = argparse.ArgumentParser(description="List likely duplicate customers in the customer workbooks")
+    parser.add_argument('--data-folder', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                                              IMPORTERS['customer'][2]),
+                        help="Folder with customers.xlsx and C_Mobile_id.xlsx")
+    parser.add_argument('--threshold', type=float, default=0.8, help="Lowest confidence reported (default: 0.8)")
+    parser.add_argument('--window', type=int, default=20,
+                        help="Neighbours compared inside a name block (default: 20)")
+    parser.add_argument('--output', default=None, help="Path of the CSV report")
+    args = parser.parse_args()
+
+    customers, phones = load_customers(args.data_folder)
+    summary, report = report_duplicate_customers(customers, phones, args.output, args.threshold, args.window)
+    print(f"{summary['candidates']} merge candidates among {summary['customers']} customers "
+          f"({summary['by_shared_phone']} sharing a phone) in {summary['seconds']}s")
+    print(f"Report saved to: {report}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
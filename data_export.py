@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Data Export Script
+This script exports database tables back into files laid out like the import
+data folders, with each importer's column mapping applied in reverse so the
+files carry the original Excel headers (cusotmerName, Customer_ID, ...).
+Features:
+- Configuration file support
+- Streaming reads over an unbuffered (server-side) cursor in chunks
+- Constant-memory xlsx (write-only mode), CSV or Parquet output
+- Output folder can be fed straight back to the import scripts
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+from mysql.connector import Error, FieldType
+from openpyxl import Workbook
+
+from import_common import IMPORTERS, TARGET_TABLES, importer_class
+
+# Import configuration
+try:
+    from config import DATABASE_CONFIG, EXPORT_SETTINGS  # type: ignore
+except ImportError:
+    print("Warning: config.py not found. Using default values.")
+    DATABASE_CONFIG = {
+        'host': 'localhost',
+        'user': 'root',
+        'password': 'Admin@1234',
+        'database': 'janssencrm',
+        'port': 3306,
+        'charset': 'utf8mb4',
+        'collation': 'utf8mb4_unicode_ci'
+    }
+    EXPORT_SETTINGS = {
+        'chunk_size': 5000,
+        'format': 'xlsx',
+        'log_level': 'INFO'
+    }
+
+# Columns that never leave the database
+EXCLUDED_COLUMNS = {
+    'users': ['password'],
+}
+
+# Excel sheets hold at most 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1048575
+
+FILE_EXTENSIONS = {'xlsx': '.xlsx', 'csv': '.csv', 'parquet': '.parquet'}
+
+
+class XlsxChunkWriter:
+    """Append rows to the one sheet of a write-only workbook.
+
+    The importers read only the first sheet, so rows past XLSX_MAX_ROWS are
+    refused rather than spread over further sheets.
+    """
+
+    def __init__(self, path: str, headers: List[str]):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(headers)
+        self.sheet_rows = 0
+
+    def write(self, rows: Sequence[Sequence]):
+        for row in rows:
+            if self.sheet_rows == XLSX_MAX_ROWS:
+                raise ValueError(f"More than {XLSX_MAX_ROWS} rows do not fit in one Excel sheet, "
+                                 f"use --format csv or parquet")
+            self.sheet.append(row)
+            self.sheet_rows += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class CsvChunkWriter:
+    """Append rows to a UTF-8 CSV file (with BOM so Excel detects Arabic text)."""
+
+    def __init__(self, path: str, headers: List[str]):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+
+    def write(self, rows: Sequence[Sequence]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetChunkWriter:
+    """Append each chunk as a row group, with the schema fixed from the cursor description."""
+
+    def __init__(self, path: str, headers: List[str], field_types: List[int]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.types = [self._arrow_type(field_type) for field_type in field_types]
+        self.schema = pa.schema(list(zip(headers, self.types)))
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _arrow_type(self, field_type: int):
+        pa = self.pa
+        if field_type in (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+                          FieldType.INT24, FieldType.YEAR):
+            return pa.int64()
+        if field_type in (FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL):
+            return pa.float64()
+        if field_type in (FieldType.DATETIME, FieldType.TIMESTAMP):
+            return pa.timestamp('us')
+        if field_type == FieldType.DATE:
+            return pa.date32()
+        return pa.string()
+
+    def write(self, rows: Sequence[Sequence]):
+        pa = self.pa
+        arrays = []
+        for values, arrow_type in zip(zip(*rows), self.types):
+            if arrow_type == pa.float64():
+                values = [None if v is None else float(v) for v in values]
+            elif arrow_type == pa.string():
+                values = [None if v is None else v.decode('utf-8') if isinstance(v, (bytes, bytearray)) else str(v)
+                          for v in values]
+            arrays.append(pa.array(values, type=arrow_type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class JanssenCRMDataExporter:
+    def __init__(self, config: Dict = None, output_format: Optional[str] = None,
+                 chunk_size: Optional[int] = None):
+        """Initialize the data exporter."""
+        self.config = config or DATABASE_CONFIG
+        self.output_format = output_format or EXPORT_SETTINGS.get('format', 'xlsx')
+        self.chunk_size = chunk_size or EXPORT_SETTINGS.get('chunk_size', 5000)
+        self.stats = {
+            'tables': {},
+            'total_rows': 0,
+            'start_time': None,
+            'end_time': None
+        }
+
+        # Setup logging
+        self._setup_logging()
+
+    def _setup_logging(self):
+        """Setup logging configuration."""
+        logging.basicConfig(
+            level=getattr(logging, EXPORT_SETTINGS.get('log_level', 'INFO')),
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(f'data_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log', encoding='utf-8'),
+                logging.StreamHandler(sys.stdout)
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def _make_writer(self, path: str, headers: List[str], field_types: List[int]):
+        """Create the chunk writer for the configured output format."""
+        if self.output_format == 'parquet':
+            return ParquetChunkWriter(path, headers, field_types)
+        if self.output_format == 'csv':
+            return CsvChunkWriter(path, headers)
+        return XlsxChunkWriter(path, headers)
+
+    def export_table(self, table_name: str, targets: List[Tuple[Dict[str, str], str]]) -> int:
+        """Stream one table into every output file of ``targets`` and return the number of rows read.
+
+        Each target is an importer's Excel header -> database column mapping
+        and the file to write; database columns are renamed back through the
+        mapping's inverse. A table several importers load (call_categories)
+        is read once and written to each of their files.
+        """
+        excluded = EXCLUDED_COLUMNS.get(table_name, [])
+
+        connection = mysql.connector.connect(**self.config)
+        try:
+            if self.output_format == 'xlsx':
+                # Refuse before writing anything: the importers would drop rows past the first sheet
+                count_cursor = connection.cursor()
+                count_cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                (total,) = count_cursor.fetchone()
+                count_cursor.close()
+                if total > XLSX_MAX_ROWS:
+                    raise ValueError(f"{total} rows do not fit in one Excel sheet, use --format csv or parquet")
+
+            # Unbuffered: rows stay on the server until fetched, one chunk at a time
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(f"SELECT * FROM {table_name}")
+
+            keep = [i for i, column in enumerate(cursor.description) if column[0] not in excluded]
+            field_types = [cursor.description[i][1] for i in keep]
+
+            writers = []
+            row_count = 0
+            try:
+                for column_mapping, output_file in targets:
+                    reverse_mapping = {db_column: excel_column for excel_column, db_column in column_mapping.items()}
+                    headers = [reverse_mapping.get(cursor.description[i][0], cursor.description[i][0]) for i in keep]
+                    writers.append(self._make_writer(output_file, headers, field_types))
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    chunk = [tuple(row[i] for i in keep) for row in rows]
+                    for writer in writers:
+                        writer.write(chunk)
+                    row_count += len(rows)
+                    self.logger.info(f"{table_name}: exported {row_count} rows")
+            finally:
+                for writer in writers:
+                    writer.close()
+            cursor.close()
+            return row_count
+        finally:
+            connection.close()
+
+    def run_export(self, output_root: str, importer_keys: Optional[List[str]] = None,
+                   task_names: Optional[List[str]] = None) -> bool:
+        """Export every selected import task into ``output_root``/<data subfolder>.
+
+        Tables shared by several importers are read once for all their files.
+        """
+        self.stats['start_time'] = datetime.now()
+        extension = FILE_EXTENSIONS[self.output_format]
+        success = True
+
+        targets = {}
+        for importer_key in importer_keys or list(IMPORTERS):
+            cls = importer_class(importer_key)
+            output_folder = os.path.join(output_root, IMPORTERS[importer_key][2])
+            os.makedirs(output_folder, exist_ok=True)
+
+            for task_name, excel_file, method_name in cls.IMPORT_TASKS:
+                if task_names and task_name not in task_names:
+                    continue
+                table_name = TARGET_TABLES.get(task_name, task_name)
+                column_mapping = cls.COLUMN_MAPPINGS.get(method_name[len('import_'):], {})
+                output_file = os.path.join(output_folder, os.path.splitext(excel_file)[0] + extension)
+                targets.setdefault(table_name, []).append((column_mapping, output_file))
+
+        for table_name, table_targets in targets.items():
+            output_files = [output_file for _, output_file in table_targets]
+            self.logger.info(f"Exporting {table_name} to {', '.join(output_files)}")
+            try:
+                row_count = self.export_table(table_name, table_targets)
+            except (Error, ImportError, OSError, ValueError) as e:
+                self.logger.error(f"Failed to export {table_name}: {e}")
+                success = False
+                continue
+            for output_file in output_files:
+                self.stats['tables'][output_file] = row_count
+            self.stats['total_rows'] += row_count
+            self.logger.info(f"SUCCESS: Exported {row_count} rows from {table_name}")
+
+        self.stats['end_time'] = datetime.now()
+        self.logger.info(
+            f"Exported {self.stats['total_rows']} rows in {len(self.stats['tables'])} files "
+            f"in {self.stats['end_time'] - self.stats['start_time']}"
+        )
+        return success
+
+
+def main():
+    """Main function to run the data export."""
+    parser = argparse.ArgumentParser(description="Export JanssenCRM tables with their original Excel headers")
+    parser.add_argument('--output', default=f'export_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+                        help="Output folder (mirrors the data folder layout)")
+    parser.add_argument('--format', choices=sorted(FILE_EXTENSIONS), default=None,
+                        help="Output file format (default: xlsx)")
+    parser.add_argument('--importers', nargs='+', choices=sorted(IMPORTERS), default=None,
+                        help="Only export the tables of these importers")
+    parser.add_argument('--tables', nargs='+', default=None,
+                        help="Only export these import tasks, e.g. customers calls tickets ticket_items")
+    parser.add_argument('--chunk-size', type=int, default=None, help="Rows fetched per round trip")
+    args = parser.parse_args()
+
+    exporter = JanssenCRMDataExporter(output_format=args.format, chunk_size=args.chunk_size)
+
+    print("Starting JanssenCRM data export...")
+    print(f"Output folder: {args.output}")
+    print(f"Database: {DATABASE_CONFIG['database']} on {DATABASE_CONFIG['host']}")
+    print("=" * 60)
+
+    if exporter.run_export(args.output, args.importers, args.tables):
+        print("\n🎉 Data export completed successfully!")
+        sys.exit(0)
+    else:
+        print("\n❌ Data export failed!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Synthetic Data Generator
+This script generates a coherent, shareable CRM dataset at a chosen scale
+factor, laid out exactly like the import data folders so the import scripts,
+the dry run and the backend can be load tested without production data.
+Features:
+- Every foreign key resolves: governorates -> cities -> customers -> phones,
+  calls, ticket categories -> tickets -> ticket calls, products -> ticket
+  items -> maintenance / change same / change another rows
+- Arabic names, addresses and lookup values
+- Skewed distributions: a few hot customers place most calls and tickets,
+  and activity follows month, weekday and hour-of-day seasonality
+- Deterministic: the same seed and scale always give the same files
+- Vectorized with NumPy (10M calls in seconds, then written as xlsx, CSV or Parquet)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_export import FILE_EXTENSIONS, XLSX_MAX_ROWS, XlsxChunkWriter
+from import_common import IMPORTERS, importer_class
+
+# Rows per table at scale factor 1
+BASE_ROWS = {
+    'customers': 10_000,
+    'calls': 100_000,
+    'tickets': 20_000,
+    'ticket_calls': 40_000,
+    'ticket_items': 25_000,
+}
+
+# Share of ticket items resolved by maintenance, same-model or other-model replacement
+RESOLUTION_SHARES = (0.5, 0.25, 0.15)
+
+# Zipf exponent of customer activity: higher means fewer, hotter customers
+# (0.8 gives the top 1% of customers roughly a third of all calls)
+CUSTOMER_SKEW = 0.8
+
+ACTIVITY_START = '2023-01-01'
+ACTIVITY_END = '2024-12-31'
+
+COMPANY_ID = 1
+
+# Governorates with their cities and a population weight
+GOVERNORATES = [
+    ('القاهرة', ['مدينة نصر', 'مصر الجديدة', 'المعادي', 'حلوان', 'شبرا'], 10.0),
+    ('الجيزة', ['الدقي', 'الهرم', '6 أكتوبر', 'الشيخ زايد', 'إمبابة'], 9.0),
+    ('الإسكندرية', ['سيدي جابر', 'المنتزه', 'العجمي', 'محرم بك'], 5.5),
+    ('القليوبية', ['بنها', 'شبرا الخيمة', 'قليوب'], 6.0),
+    ('الشرقية', ['الزقازيق', 'بلبيس', 'العاشر من رمضان'], 7.5),
+    ('الدقهلية', ['المنصورة', 'طلخا', 'ميت غمر'], 6.9),
+    ('الغربية', ['طنطا', 'المحلة الكبرى', 'كفر الزيات'], 5.2),
+    ('المنوفية', ['شبين الكوم', 'منوف', 'السادات'], 4.5),
+    ('البحيرة', ['دمنهور', 'كفر الدوار', 'رشيد'], 6.7),
+    ('كفر الشيخ', ['كفر الشيخ', 'دسوق'], 3.6),
+    ('دمياط', ['دمياط', 'دمياط الجديدة'], 1.6),
+    ('بورسعيد', ['بورسعيد', 'بورفؤاد'], 0.8),
+    ('الإسماعيلية', ['الإسماعيلية', 'فايد'], 1.4),
+    ('السويس', ['السويس', 'الأربعين'], 0.8),
+    ('الفيوم', ['الفيوم', 'سنورس'], 3.9),
+    ('بني سويف', ['بني سويف', 'الواسطى'], 3.4),
+    ('المنيا', ['المنيا', 'ملوي'], 6.0),
+    ('أسيوط', ['أسيوط', 'ديروط'], 4.8),
+    ('سوهاج', ['سوهاج', 'جرجا'], 5.4),
+    ('قنا', ['قنا', 'نجع حمادي'], 3.5),
+    ('الأقصر', ['الأقصر', 'إسنا'], 1.4),
+    ('أسوان', ['أسوان', 'كوم أمبو'], 1.6),
+    ('البحر الأحمر', ['الغردقة', 'سفاجا'], 0.4),
+    ('الوادي الجديد', ['الخارجة', 'الداخلة'], 0.3),
+    ('مطروح', ['مرسى مطروح', 'العلمين'], 0.5),
+    ('شمال سيناء', ['العريش', 'بئر العبد'], 0.5),
+    ('جنوب سيناء', ['شرم الشيخ', 'الطور'], 0.1),
+]
+
+FIRST_NAMES = [
+    'محمد', 'أحمد', 'محمود', 'مصطفى', 'علي', 'حسن', 'حسين', 'عمر', 'خالد', 'ياسر', 'إبراهيم', 'يوسف',
+    'طارق', 'شريف', 'هشام', 'عمرو', 'كريم', 'وليد', 'سامح', 'أشرف', 'فاطمة', 'مريم', 'نورا', 'سارة',
+    'هبة', 'منى', 'دينا', 'ريهام', 'آية', 'إيمان', 'ياسمين', 'نهى', 'سلمى', 'رانيا', 'شيماء', 'أمل',
+]
+FAMILY_NAMES = [
+    'عبد الله', 'عبد الرحمن', 'السيد', 'عبد العزيز', 'الشريف', 'منصور', 'سالم', 'عثمان', 'رمضان', 'فهمي',
+    'النجار', 'الشافعي', 'حجازي', 'عبد الحميد', 'المصري', 'سليمان', 'زكي', 'فؤاد', 'شاكر', 'البنا',
+]
+STREETS = ['شارع التحرير', 'شارع الجمهورية', 'شارع النصر', 'شارع الجيش', 'شارع المحطة', 'شارع البحر', 'شارع الثورة']
+
+CALL_REASONS = ['استفسار عن منتج', 'شكوى', 'متابعة طلب', 'طلب صيانة', 'طلب استبدال', 'استفسار عن الضمان', 'اقتراح']
+CALL_TYPES = ['وارد', 'صادر']
+TICKET_CATEGORIES = ['صيانة', 'استبدال بنفس الموديل', 'استبدال بموديل آخر', 'شكوى جودة', 'تأخير توصيل']
+REQUEST_REASONS = ['عيب صناعة', 'هبوط في المرتبة', 'صوت في السوست', 'تمزق القماش', 'مقاس غير مناسب']
+PRODUCTS = [
+    ('مرتبة طبية', 'مراتب'), ('مرتبة سوست منفصلة', 'مراتب'), ('مرتبة فوم', 'مراتب'), ('مرتبة أطفال', 'مراتب'),
+    ('مخدة فايبر', 'مخدات'), ('مخدة طبية', 'مخدات'), ('سرير خشب', 'أسرّة'), ('توب مرتبة', 'إكسسوارات'),
+]
+PRODUCT_SIZES = ['90x190', '100x200', '120x195', '150x195', '160x200', '180x200']
+PURCHASE_LOCATIONS = ['معرض الشركة', 'موزع معتمد', 'الموقع الإلكتروني', 'هايبر ماركت']
+CALL_DESCRIPTIONS = ['تم الرد على الاستفسار', 'تم تسجيل الشكوى', 'تم تحويل العميل للصيانة', 'سيتم التواصل لاحقا',
+                     'تم تأكيد موعد الزيارة']
+CALL_RESULTS = ['تم الحل', 'في انتظار الفني', 'العميل لم يرد', 'تم تحديد موعد']
+
+# Relative activity by month (Jan..Dec), weekday (Mon..Sun) and hour of day
+MONTH_WEIGHTS = np.array([0.9, 0.85, 0.95, 1.0, 1.05, 1.2, 1.3, 1.25, 1.1, 1.0, 1.15, 1.35])
+WEEKDAY_WEIGHTS = np.array([1.1, 1.05, 1.0, 1.0, 0.35, 0.9, 1.15])
+HOUR_WEIGHTS = np.array([0, 0, 0, 0, 0, 0, 0, 0.2, 0.6, 1.0, 1.2, 1.3, 1.3, 1.2, 1.0, 1.0, 1.1, 1.2, 1.1, 0.9,
+                         0.7, 0.5, 0.2, 0])
+
+# The ticket importer reads call categories with its own id header
+HEADER_OVERRIDES = {
+    ('ticket', 'call_categories'): {'id': 'callReason_id'},
+}
+
+# Order in which tables are generated; each gets its own random stream so
+# selecting or reordering output never changes the others
+TABLES = ['governorates', 'cities', 'customers', 'customer_phones', 'call_categories', 'call_types', 'users',
+          'calls', 'ticket_categories', 'tickets', 'ticket_calls', 'request_reasons', 'product_info',
+          'ticket_items', 'ticket_item_maintenance', 'ticket_item_change_same', 'ticket_item_change_another']
+
+
+def pick(rng: np.random.Generator, values: List, size: int) -> pd.Categorical:
+    """Draw ``size`` values uniformly, kept as codes into ``values``."""
+    return pd.Categorical.from_codes(rng.integers(0, len(values), size), categories=values)
+
+
+def arabic_names(rng: np.random.Generator, size: int) -> pd.Series:
+    """Return ``size`` three-part Arabic names (first, father, family)."""
+    first = np.array(FIRST_NAMES, dtype=object)
+    family = np.array(FAMILY_NAMES, dtype=object)
+    return (pd.Series(first[rng.integers(0, len(first), size)]) + ' '
+            + first[rng.integers(0, 20, size)] + ' '
+            + family[rng.integers(0, len(family), size)])
+
+
+def seasonal_timestamps(rng: np.random.Generator, size: int, start: str, end: str) -> np.ndarray:
+    """Draw ``size`` sorted timestamps between ``start`` and ``end`` following the seasonality weights."""
+    days = pd.date_range(start, end, freq='D')
+    weights = MONTH_WEIGHTS[days.month - 1] * WEEKDAY_WEIGHTS[days.dayofweek]
+    day = rng.choice(len(days), size=size, p=weights / weights.sum())
+    hour = rng.choice(24, size=size, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    offset = (hour * 3600 + rng.integers(0, 3600, size)).astype('timedelta64[s]')
+    return np.sort(days.values[day] + offset)
+
+
+def hot_customers(rng: np.random.Generator, customer_ids: np.ndarray, skew: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Rank customers by activity; return (ids by rank, Zipf probability per rank)."""
+    weights = 1.0 / np.arange(1, len(customer_ids) + 1) ** skew
+    return rng.permutation(customer_ids), weights / weights.sum()
+
+
+def lookup(names: List[str]) -> pd.DataFrame:
+    return pd.DataFrame({'name': names, 'id': np.arange(1, len(names) + 1)})
+
+
+class SyntheticDataGenerator:
+    def __init__(self, scale: float = 1.0, seed: int = 42, start: str = ACTIVITY_START, end: str = ACTIVITY_END,
+                 skew: float = CUSTOMER_SKEW):
+        """Initialize the generator for ``scale`` times the BASE_ROWS volumes."""
+        self.scale = scale
+        self.seed = seed
+        self.start = start
+        self.end = end
+        self.skew = skew
+        self.rows = {table: max(1, int(round(count * scale))) for table, count in BASE_ROWS.items()}
+        self.frames: Dict[str, pd.DataFrame] = {}
+
+    def _rng(self, table: str) -> np.random.Generator:
+        return np.random.default_rng([self.seed, TABLES.index(table)])
+
+    def generate(self) -> Dict[str, pd.DataFrame]:
+        """Build every table, parents first, keyed by import task name with Excel headers."""
+        started = time.perf_counter()
+        for table in TABLES:
+            self.frames[table] = getattr(self, f'generate_{table}')(self._rng(table))
+            print(f"Generated {len(self.frames[table]):>10} {table} ({time.perf_counter() - started:.1f}s)")
+        return self.frames
+
+    def generate_governorates(self, rng) -> pd.DataFrame:
+        df = lookup([name for name, _, _ in GOVERNORATES])
+        return df.rename(columns={'name': 'governorate'})
+
+    def generate_cities(self, rng) -> pd.DataFrame:
+        names, governorates = [], []
+        for governorate_id, (_, cities, _) in enumerate(GOVERNORATES, start=1):
+            names.extend(cities)
+            governorates.extend([governorate_id] * len(cities))
+        df = lookup(names).rename(columns={'name': 'areas'})
+        df['id_governorates'] = governorates
+        return df
+
+    def generate_customers(self, rng) -> pd.DataFrame:
+        count = self.rows['customers']
+        cities = self.frames['cities']
+        population = np.array([weight for _, _, weight in GOVERNORATES])
+        governorate = rng.choice(np.arange(1, len(GOVERNORATES) + 1), size=count, p=population / population.sum())
+
+        # A uniform city within the customer's governorate
+        city_counts = cities.groupby('id_governorates').size().to_numpy()
+        first_city = np.concatenate([[0], np.cumsum(city_counts)[:-1]])
+        city_index = first_city[governorate - 1] + (rng.random(count) * city_counts[governorate - 1]).astype(int)
+
+        # Customers are registered before the activity window opens
+        created_at = seasonal_timestamps(rng, count, pd.Timestamp(self.start) - pd.DateOffset(years=3),
+                                         pd.Timestamp(self.start) - pd.Timedelta(days=1))
+        streets = np.array(STREETS, dtype=object)
+        return pd.DataFrame({
+            'id': np.arange(1, count + 1),
+            'company_id': COMPANY_ID,
+            'cusotmerName': arabic_names(rng, count),
+            'id_governorates': governorate,
+            'id_city': cities['id'].to_numpy()[city_index],
+            'adress': (pd.Series(rng.integers(1, 200, count)).astype(str) + ' '
+                       + streets[rng.integers(0, len(streets), count)]),
+            'notes': np.where(rng.random(count) < 0.1, 'عميل مميز', None),
+            'created_by': rng.integers(1, self._user_count() + 1, count),
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+
+    def generate_customer_phones(self, rng) -> pd.DataFrame:
+        customers = self.frames['customers']['id'].to_numpy()
+        # Everyone has one mobile, a quarter of customers a second one
+        customer_id = np.sort(np.concatenate([customers, customers[rng.random(len(customers)) < 0.25]]))
+        prefixes = np.array(['010', '011', '012', '015'], dtype=object)
+        numbers = rng.choice(10 ** 8, size=len(customer_id), replace=False)
+        return pd.DataFrame({
+            'customer_id': customer_id,
+            'mobilenum': prefixes[rng.integers(0, len(prefixes), len(customer_id))]
+            + pd.Series(numbers).astype(str).str.zfill(8),
+        })
+
+    def generate_call_categories(self, rng) -> pd.DataFrame:
+        return lookup(CALL_REASONS).rename(columns={'name': 'callReason'})
+
+    def generate_call_types(self, rng) -> pd.DataFrame:
+        return lookup(CALL_TYPES).rename(columns={'name': 'calltype'})
+
+    def _user_count(self) -> int:
+        return max(5, int(round(20 * self.scale ** 0.5)))
+
+    def generate_users(self, rng) -> pd.DataFrame:
+        return lookup(arabic_names(rng, self._user_count()).tolist()).rename(columns={'name': 'callRecipient'})
+
+    def generate_calls(self, rng) -> pd.DataFrame:
+        count = self.rows['calls']
+        ranked, probabilities = hot_customers(rng, self.frames['customers']['id'].to_numpy(), self.skew)
+        created_at = seasonal_timestamps(rng, count, self.start, self.end)
+        # Log-normal talk time, around three minutes
+        seconds = np.minimum(rng.lognormal(5.2, 0.6, count).astype(int), 5999)
+        durations = [f'{minute:02d}:{second:02d}' for minute in range(100) for second in range(60)]
+        return pd.DataFrame({
+            'id': np.arange(1, count + 1),
+            'company_id': COMPANY_ID,
+            'Customer_ID': ranked[rng.choice(len(ranked), size=count, p=probabilities)],
+            'calltype_ID': rng.choice([1, 2], size=count, p=[0.8, 0.2]),
+            'callReason_ID': rng.integers(1, len(CALL_REASONS) + 1, count),
+            'description': pick(rng, CALL_DESCRIPTIONS, count),
+            'notes': pd.Categorical.from_codes(np.where(rng.random(count) < 0.7, -1, 0), categories=['متابعة']),
+            'call_duration': pd.Categorical.from_codes(seconds, categories=durations),
+            'created_by': rng.integers(1, self._user_count() + 1, count),
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+
+    def generate_ticket_categories(self, rng) -> pd.DataFrame:
+        return lookup(TICKET_CATEGORIES).rename(columns={'name': 'TicketType', 'id': 'TicketType_ID'})
+
+    def generate_tickets(self, rng) -> pd.DataFrame:
+        count = self.rows['tickets']
+        # Same ranking stream as calls, so hot callers are also the ones opening tickets
+        ranked, probabilities = hot_customers(self._rng('calls'), self.frames['customers']['id'].to_numpy(),
+                                              self.skew)
+        created_at = seasonal_timestamps(rng, count, self.start, self.end)
+        closed = rng.random(count) < 0.75
+        closed_at = pd.Series(created_at + rng.exponential(72 * 3600, count).astype('timedelta64[s]'))
+        closed_at[~closed] = pd.NaT
+        updated_at = closed_at.fillna(pd.Series(created_at))
+        return pd.DataFrame({
+            'id': np.arange(1, count + 1),
+            'company_id': COMPANY_ID,
+            'Customer_ID': ranked[rng.choice(len(ranked), size=count, p=probabilities)],
+            'ticket_cat_id': rng.choice(np.arange(1, len(TICKET_CATEGORIES) + 1), size=count,
+                                        p=[0.4, 0.2, 0.1, 0.2, 0.1]),
+            'description': pick(rng, REQUEST_REASONS, count),
+            'status': closed.astype(int),
+            'Ticketresolved': closed.astype(int),
+            'notes': None,
+            'priority': rng.choice([0, 1, 2], size=count, p=[0.6, 0.3, 0.1]),
+            'created_by': rng.integers(1, self._user_count() + 1, count),
+            'created_at': created_at,
+            'closed_at': closed_at,
+            'updated_at': updated_at,
+        })
+
+    def generate_ticket_calls(self, rng) -> pd.DataFrame:
+        count = self.rows['ticket_calls']
+        tickets = self.frames['tickets']
+        ticket_index = np.sort(rng.integers(0, len(tickets), count))
+        # Follow-up calls land within two weeks of the ticket being opened
+        called_at = (tickets['created_at'].to_numpy()[ticket_index]
+                     + rng.integers(0, 14 * 86400, count).astype('timedelta64[s]'))
+        return pd.DataFrame({
+            'id': np.arange(1, count + 1),
+            'ticket_ID': tickets['id'].to_numpy()[ticket_index],
+            'Customer_ID': tickets['Customer_ID'].to_numpy()[ticket_index],
+            'callRecipient_id': rng.integers(1, self._user_count() + 1, count),
+            'calltype_id': rng.choice([1, 2], size=count, p=[0.4, 0.6]),
+            'callReason_id': rng.integers(1, len(CALL_REASONS) + 1, count),
+            'datetime': called_at,
+            'callresult': pick(rng, CALL_RESULTS, count),
+            'notes': None,
+        })
+
+    def generate_request_reasons(self, rng) -> pd.DataFrame:
+        return lookup(REQUEST_REASONS).rename(columns={'name': 'reqreqson'})
+
+    def generate_product_info(self, rng) -> pd.DataFrame:
+        return lookup([name for name, _ in PRODUCTS]).rename(columns={'name': 'pfodcut.ProductName'})
+
+    def generate_ticket_items(self, rng) -> pd.DataFrame:
+        count = self.rows['ticket_items']
+        tickets = self.frames['tickets']
+        ticket_index = np.sort(rng.integers(0, len(tickets), count))
+        created_at = tickets['created_at'].to_numpy()[ticket_index]
+        product_id = rng.integers(1, len(PRODUCTS) + 1, count)
+        inspected = rng.random(count) < 0.6
+        inspected_date = pd.Series(created_at + rng.integers(1, 10, count).astype('timedelta64[D]')).dt.normalize()
+        inspected_date[~inspected] = pd.NaT
+        purchase_date = pd.Series(created_at - rng.integers(30, 5 * 365, count).astype('timedelta64[D]')).dt.normalize()
+        product_types = np.array([kind for _, kind in PRODUCTS], dtype=object)
+        return pd.DataFrame({
+            'id': np.arange(1, count + 1),
+            'company_id': COMPANY_ID,
+            'ticket_ID': tickets['id'].to_numpy()[ticket_index],
+            'prductuionManagerdecision': 0,
+            'product_id': product_id,
+            'pfodcut.ProdcutType': product_types[product_id - 1],
+            'product_size': pick(rng, PRODUCT_SIZES, count),
+            'quantity': rng.choice([1, 2], size=count, p=[0.9, 0.1]),
+            'purchase_date': purchase_date,
+            'purchase_location': pick(rng, PURCHASE_LOCATIONS, count),
+            'request_reason_id': rng.integers(1, len(REQUEST_REASONS) + 1, count),
+            'request_reason_detail': None,
+            'inspected': inspected.astype(int),
+            'inspected_date': inspected_date,
+            'inspected_result': np.where(inspected, 'تمت المعاينة', None),
+            'client_approval': (rng.random(count) < 0.8).astype(int),
+            'create_by': rng.integers(1, self._user_count() + 1, count),
+            'create_at': created_at,
+            'update_at': created_at,
+        })
+
+    def _resolution(self, rng, share_index: int) -> Tuple[pd.DataFrame, Dict]:
+        """Pick this resolution's ticket items (disjoint from the other two) and their common columns."""
+        items = self.frames['ticket_items']
+        # Shared stream, so the three resolutions partition the same permutation
+        order = np.random.default_rng([self.seed, len(TABLES)]).permutation(len(items))
+        bounds = np.cumsum((0,) + RESOLUTION_SHARES) * len(items)
+        chosen = np.sort(order[int(bounds[share_index]):int(bounds[share_index + 1])])
+        selected = items.iloc[chosen].reset_index(drop=True)
+        count = len(selected)
+
+        approved = rng.random(count) < 0.85
+        pulled = approved & (rng.random(count) < 0.8)
+        delivered = pulled & (rng.random(count) < 0.9)
+        pulled_date = (selected['create_at'] + pd.to_timedelta(rng.integers(2, 15, count), unit='D')).dt.normalize()
+        delivered_date = pulled_date + pd.to_timedelta(rng.integers(1, 10, count), unit='D')
+        pulled_date[~pulled] = pd.NaT
+        delivered_date[~delivered] = pd.NaT
+        return selected, {
+            'approved': approved.astype(int),
+            'refused': (~approved).astype(int),
+            'refusal_reason': np.where(approved, None, 'العميل رفض التكلفة'),
+            'pulled': pulled.astype(int),
+            'pulled_date': pulled_date,
+            'delivered': delivered.astype(int),
+            'delivered_date': delivered_date,
+            'cost': np.round(rng.gamma(2.0, 400.0, count), 2),
+        }
+
+    def generate_ticket_item_maintenance(self, rng) -> pd.DataFrame:
+        selected, common = self._resolution(rng, 0)
+        count = len(selected)
+        return pd.DataFrame({
+            'id': selected['id'],
+            'company_id': COMPANY_ID,
+            'product_id': selected['product_id'],
+            'product_size': selected['product_size'],
+            'pfodcut.ProdcutType': selected['pfodcut.ProdcutType'],
+            'maintainace': 1,
+            'maintanancedescription': pick(rng, ['تغيير السوست', 'إعادة تنجيد', 'تغيير القماش', 'تقوية الإطار'], count),
+            'cost3': common['cost'],
+            'choice4Accetp': common['approved'],
+            'choice4refuse': common['refused'],
+            'choice4refusereason': common['refusal_reason'],
+            'pulled3': common['pulled'],
+            'pulledDate3': common['pulled_date'],
+            'deleverd3': common['delivered'],
+            'deleverdDate3': common['delivered_date'],
+            'finalDicition': common['delivered'],
+            'colsedMantananceReq': common['delivered'],
+            'colsedMantananceReqreason': None,
+            'create_at': selected['create_at'],
+            'update_at': selected['update_at'],
+            'create_by': selected['create_by'],
+        })
+
+    def generate_ticket_item_change_same(self, rng) -> pd.DataFrame:
+        selected, common = self._resolution(rng, 1)
+        return pd.DataFrame({
+            'id': selected['id'],
+            'company_id': COMPANY_ID,
+            'product_id': selected['product_id'],
+            'product_size': selected['product_size'],
+            'pfodcut.ProdcutType': selected['pfodcut.ProdcutType'],
+            'replaceToSameModel': 1,
+            'cost1': common['cost'],
+            'choice2Accetp': common['approved'],
+            'choice2refuse': common['refused'],
+            'create_at': selected['create_at'],
+            'update_at': selected['update_at'],
+            'create_by': selected['create_by'],
+            'choice2refusereason': common['refusal_reason'],
+            'pulled1': common['pulled'],
+            'pulledDate1': common['pulled_date'],
+            'deleverd1': common['delivered'],
+            'deleverdDate1': common['delivered_date'],
+            'pfodcut_replace_size2': selected['product_size'],
+        })
+
+    def generate_ticket_item_change_another(self, rng) -> pd.DataFrame:
+        selected, common = self._resolution(rng, 2)
+        count = len(selected)
+        # The replacement is a different product from the one returned
+        replacement = (selected['product_id'].to_numpy() - 1 + rng.integers(1, len(PRODUCTS), count)) % len(PRODUCTS)
+        product_names = np.array([name for name, _ in PRODUCTS], dtype=object)
+        return pd.DataFrame({
+            'id': selected['id'],
+            'company_id': COMPANY_ID,
+            'product_id': replacement + 1,
+            'pfodcut.ProdcutType': selected['pfodcut.ProdcutType'],
+            'replaceTosnotherModel': 1,
+            'replaceToBrandName': 'Janssen',
+            'replaceToProdcutName': product_names[replacement],
+            'cost2': common['cost'],
+            'choice3Accetp': common['approved'],
+            'choice3refuse': common['refused'],
+            'choice3refusereason': common['refusal_reason'],
+            'pulled2': common['pulled'],
+            'pulledDate2': common['pulled_date'],
+            'deleverd2': common['delivered'],
+            'deleverdDate2': common['delivered_date'],
+            'create_at': selected['create_at'],
+            'update_at': selected['update_at'],
+            'create_by': selected['create_by'],
+        })
+
+
+def write_frame(df: pd.DataFrame, path: str, output_format: str) -> None:
+    """Write one generated table in ``output_format``."""
+    if output_format == 'parquet':
+        df.to_parquet(path, index=False)
+    elif output_format == 'csv':
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+    else:
+        if len(df) > XLSX_MAX_ROWS:
+            raise ValueError(f"{len(df)} rows do not fit in one Excel sheet, use --format csv or parquet")
+        writer = XlsxChunkWriter(path, list(df.columns))
+        cells = df.astype(object).where(df.notna(), None)
+        writer.write(cells.itertuples(index=False, name=None))
+        writer.close()
+
+
+def write_dataset(frames: Dict[str, pd.DataFrame], output_root: str, output_format: str = 'xlsx',
+                  importer_keys: Optional[List[str]] = None) -> Dict[str, int]:
+    """Write the generated tables where the importers look for them; return rows per file."""
+    extension = FILE_EXTENSIONS[output_format]
+    written = {}
+    for importer_key in importer_keys or list(IMPORTERS):
+        output_folder = os.path.join(output_root, IMPORTERS[importer_key][2])
+        os.makedirs(output_folder, exist_ok=True)
+        for task_name, excel_file, _ in importer_class(importer_key).IMPORT_TASKS:
+            output_file = os.path.join(output_folder, os.path.splitext(excel_file)[0] + extension)
+            started = time.perf_counter()
+            df = frames[task_name].rename(columns=HEADER_OVERRIDES.get((importer_key, task_name), {}))
+            write_frame(df, output_file, output_format)
+            written[output_file] = len(frames[task_name])
+            print(f"Wrote {len(frames[task_name]):>10} rows to {output_file} ({time.perf_counter() - started:.1f}s)")
+    return written
+
+
+def generate_dataset(output_root: str, scale: float = 1.0, seed: int = 42, output_format: str = 'xlsx',
+                     importer_keys: Optional[List[str]] = None, start: str = ACTIVITY_START,
+                     end: str = ACTIVITY_END, skew: float = CUSTOMER_SKEW) -> str:
+    """Generate and write a dataset with its manifest; return the manifest path.
+
+    Raises ValueError when a table would not fit in one Excel sheet.
+    """
+    generator = SyntheticDataGenerator(scale, seed, start, end, skew)
+    largest = max(generator.rows.values())
+    if output_format == 'xlsx' and largest > XLSX_MAX_ROWS:
+        raise ValueError(f"{largest} rows do not fit in one Excel sheet, use --format csv or parquet")
+
+    started = time.perf_counter()
+    written = write_dataset(generator.generate(), output_root, output_format, importer_keys)
+
+    manifest = os.path.join(output_root, 'synthetic_manifest.json')
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(),
+            'scale': scale,
+            'seed': seed,
+            'skew': skew,
+            'activity': [start, end],
+            'format': output_format,
+            'files': written,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Generated {sum(written.values())} rows in {time.perf_counter() - started:.1f}s")
+    return manifest
+
+
+def main():
+    """Main function to generate a synthetic dataset."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic JanssenCRM dataset in the import layout")
+    parser.add_argument('--output', default=f'synthetic_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+                        help="Output folder (mirrors the data folder layout)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f"Scale factor; 1 is {BASE_ROWS['customers']} customers and {BASE_ROWS['calls']} calls")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (same seed, same files)")
+    parser.add_argument('--format', choices=sorted(FILE_EXTENSIONS), default='xlsx',
+                        help="Output file format (xlsx holds at most 1,048,575 rows per table)")
+    parser.add_argument('--importers', nargs='+', choices=sorted(IMPORTERS), default=None,
+                        help="Only write the workbooks of these importers")
+    parser.add_argument('--skew', type=float, default=CUSTOMER_SKEW,
+                        help="Zipf exponent of calls and tickets per customer (0 is uniform)")
+    parser.add_argument('--start', default=ACTIVITY_START, help="First day of call and ticket activity")
+    parser.add_argument('--end', default=ACTIVITY_END, help="Last day of call and ticket activity")
+    args = parser.parse_args()
+
+    try:
+        manifest = generate_dataset(args.output, args.scale, args.seed, args.format, args.importers,
+                                    args.start, args.end, args.skew)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Manifest saved to: {manifest}")
+
+
+if __name__ == "__main__":
+    main()
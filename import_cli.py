@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Import Command Line
+One entry point for the import scripts and tools. Any subset of importers and
+tables runs in a single process, sharing one connection pool, one schema
+cache and one log file.
+Subcommands:
+- import    Import the selected tables
+- resume    Re-run the tasks the last import did not finish
+- status    Summarize the last import from its state file (fast enough for cron)
+- dry-run   Validate the workbooks without a database (import_dry_run.py)
+- export    Write tables back to files with their Excel headers (data_export.py)
+- bench     Time reading and mapping of each workbook without a database
+- compare   Fail when table throughput regressed against a baseline run (import_compare.py)
+- generate  Write a synthetic, foreign-key-consistent dataset (data_generator.py)
+- partitions Monthly partitions of the call tables: status, convert, extend (import_partitions.py)
+- dedup     List likely duplicate customers in the customer workbooks (customer_dedup.py)
+- watch     Import workbooks as they change in the data folders (import_watch.py)
+pandas, mysql.connector and the importer modules are only imported by the
+subcommands that use them; status needs none of them.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from import_registry import (IMPORTERS, PARTITIONED_TABLES, PRE_VALIDATION_STEPS, importer_class,
+                             parse_transaction_strategies)
+
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+STATE_FILE = 'import_state.json'
+# Staged workbooks go to shared memory where the platform has it
+HANDOFF_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# status exit codes, for cron
+EXIT_OK, EXIT_FAILED, EXIT_RUNNING, EXIT_NO_STATE = 0, 1, 2, 3
+
+
+def selected_tasks(importer_keys: List[str], task_names: Optional[List[str]]) -> Dict[str, List[str]]:
+    """Return {importer: [task, ...]} in import order for the selection."""
+    selection = {}
+    for importer_key in importer_keys:
+        tasks = [task[0] for task in importer_class(importer_key).IMPORT_TASKS
+                 if not task_names or task[0] in task_names]
+        if tasks:
+            selection[importer_key] = tasks
+    return selection
+
+
+def load_state(state_file: str) -> Optional[Dict]:
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state: Dict, state_file: str):
+    """Write the state file atomically so status never reads half a file."""
+    state['updated_at'] = datetime.now().isoformat()
+    temp_file = f'{state_file}.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, state_file)
+
+
+def setup_logging(log_level: str):
+    """Open the one log file every importer in this process writes to."""
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log', encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+
+def run_tasks(state: Dict, state_file: str, update_histograms: bool = False) -> bool:
+    """Run every task of ``state`` that is not done yet, recording progress as it goes.
+
+    All importers share one writer (see import_writers.py) and, for MySQL,
+    one connection pool sized for the largest number of writer connections
+    any of them opens, one schema cache and one progress event stream. The state file is rewritten after each importer.
+
+    With the ``parse_workers`` option every pending workbook is parsed ahead,
+    in import order, by worker processes that hand it over as an Arrow IPC
+    file, so parsing the next workbooks overlaps writing the current one.
+    """
+    from mysql.connector import Error
+
+    from import_common import ProgressEmitter, SchemaCache, create_connection_pool
+    from import_writers import SnapshotSchemaCache, create_writer
+
+    pending = {}
+    for key, status in state['tasks'].items():
+        if status != 'done':
+            importer_key, task_name = key.split('.', 1)
+            pending.setdefault(importer_key, []).append(task_name)
+
+    importers = {}
+    for importer_key in pending:
+        importer = importer_class(importer_key)(async_writers=state['options'].get('async_writers'))
+        if state['options'].get('shard_writers') is not None and hasattr(importer, 'shard_writers'):
+            importer.shard_writers = state['options']['shard_writers']
+        if update_histograms:
+            importer.import_settings['update_histograms'] = True
+        if state['options'].get('sort_by_key'):
+            importer.import_settings['sort_by_key'] = True
+        if state['options'].get('partition_exchange'):
+            importer.import_settings['partition_exchange'] = True
+        for flag in ('hash_passwords', 'reset_passwords'):
+            if state['options'].get(flag):
+                importer.import_settings[flag] = True
+        for option in ('key_index', 'key_conflicts', 'dedup_report', 'memory_limit_mb', 'savepoint_rows',
+                       'password_workers', 'credential_folder'):
+            if state['options'].get(option):
+                importer.import_settings[option] = state['options'][option]
+        if state['options'].get('transactions'):
+            default_strategy, table_strategies = state['options']['transactions']
+            if default_strategy:
+                importer.import_settings['transaction_strategy'] = default_strategy
+            importer.import_settings['transaction_strategies'] = {
+                **(importer.import_settings.get('transaction_strategies') or {}), **table_strategies}
+        importers[importer_key] = importer
+
+    state.update({'status': 'running', 'pid': os.getpid(), 'started_at': datetime.now().isoformat()})
+    save_state(state, state_file)
+
+    if importers:
+        config = next(iter(importers.values())).config
+        writers = max(max(importer.async_writers, getattr(importer, 'shard_writers', 0))
+                      for importer in importers.values())
+        writer_spec = state['options'].get('writer') or 'mysql'
+        try:
+            pool = create_connection_pool(config, writers) if writer_spec.startswith('mysql') else None
+            writer = create_writer(writer_spec, config, pool)
+        except (Error, ValueError) as e:
+            print(f"Error: could not open the {writer_spec} writer: {e}")
+            state['status'] = 'failed'
+            save_state(state, state_file)
+            return False
+        schema_cache = SnapshotSchemaCache() if writer.uses_snapshot else SchemaCache(config['database'])
+        progress_emitter = ProgressEmitter(state['options'].get('progress_events'))
+
+    parse_workers = state['options'].get('parse_workers')
+    if parse_workers and parse_workers > 0:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Warning: parse workers need pyarrow (pip install pyarrow), parsing in the importers instead")
+            parse_workers = 0
+    if parse_workers and parse_workers > 0:
+        from concurrent.futures import ProcessPoolExecutor
+
+        from import_common import fits_in_memory, stage_workbook
+
+        memory_limit = state['options'].get('memory_limit_mb')
+        handoff_folder = tempfile.mkdtemp(prefix='import_handoff_', dir=HANDOFF_ROOT)
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+        staged_workbooks = {}
+        for importer_key, task_names in pending.items():
+            data_folder = os.path.join(state['data_root'], IMPORTERS[importer_key][2])
+            for task_name, excel_file, _ in importers[importer_key].IMPORT_TASKS:
+                file_path = os.path.join(data_folder, excel_file)
+                if task_name not in task_names or not os.path.exists(file_path):
+                    continue
+                # Workbooks over the memory budget are streamed by the importer instead
+                if not memory_limit or fits_in_memory(file_path, memory_limit * 2**20):
+                    staged_workbooks[file_path] = parse_pool.submit(stage_workbook, file_path, handoff_folder)
+    else:
+        handoff_folder = parse_pool = staged_workbooks = None
+
+    try:
+        for importer_key, task_names in pending.items():
+            importer = importers[importer_key]
+            importer.connection_pool = pool
+            importer.writer = writer
+            importer.import_settings['writer'] = writer_spec
+            importer.schema_cache = schema_cache
+            importer.progress_emitter = progress_emitter
+            importer.staged_workbooks = staged_workbooks
+            data_folder = os.path.join(state['data_root'], IMPORTERS[importer_key][2])
+
+            print(f"Importing {', '.join(task_names)} from {data_folder}")
+            importer.run_import(data_folder, task_names)
+
+            for task_name in task_names:
+                result = importer.task_results.get(task_name, False)
+                status = 'done' if result else 'missing' if result is None else 'failed'
+                state['tasks'][f'{importer_key}.{task_name}'] = status
+            state['stats'][importer_key] = {
+                key: importer.stats[key]
+                for key in ('total_records', 'rejected_rows', 'lock_retries', 'reconnects')
+            }
+            save_state(state, state_file)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+            shutil.rmtree(handoff_folder, ignore_errors=True)
+
+    if importers:
+        progress_emitter.close()
+        writer.close()
+    ok = all(status == 'done' for status in state['tasks'].values())
+    state.update({'status': 'succeeded' if ok else 'failed', 'finished_at': datetime.now().isoformat()})
+    save_state(state, state_file)
+    return ok
+
+
+def command_import(args) -> int:
+    setup_logging(args.log_level)
+    selection = selected_tasks(args.importers, args.tables)
+    state = {
+        'data_root': os.path.abspath(args.data_root),
+        'options': {'async_writers': args.async_writers, 'shard_writers': args.shard_writers,
+                    'progress_events': args.progress_events, 'parse_workers': args.parse_workers,
+                    'writer': args.writer, 'sort_by_key': args.sort_by_key,
+                    'partition_exchange': args.partition_exchange, 'key_index': args.key_index,
+                    'key_conflicts': args.key_conflicts, 'dedup_report': args.dedup_report,
+                    'memory_limit_mb': args.memory_limit_mb, 'transactions': args.transactions,
+                    'savepoint_rows': args.savepoint_rows, 'hash_passwords': args.hash_passwords,
+                    'reset_passwords': args.reset_passwords,
+                    'password_workers': args.password_workers, 'credential_folder': args.credential_folder},
+        'tasks': {f'{key}.{task}': 'pending' for key, tasks in selection.items() for task in tasks},
+        'stats': {},
+    }
+    ok = run_tasks(state, args.state, args.update_histograms)
+    print(f"\n{'[SUCCESS] Data import completed successfully!' if ok else '[FAILED] Data import failed!'}")
+    return 0 if ok else 1
+
+
+def command_resume(args) -> int:
+    state = load_state(args.state)
+    if state is None:
+        print(f"Nothing to resume: {args.state} not found")
+        return 1
+    if state.get('status') == 'succeeded':
+        print("Nothing to resume: the last import completed successfully")
+        return 0
+    setup_logging(args.log_level)
+    if args.progress_events:
+        state['options']['progress_events'] = args.progress_events
+    if args.parse_workers is not None:
+        state['options']['parse_workers'] = args.parse_workers
+    if args.writer:
+        state['options']['writer'] = args.writer
+    if args.sort_by_key:
+        state['options']['sort_by_key'] = True
+    if args.partition_exchange:
+        state['options']['partition_exchange'] = True
+    for flag in ('hash_passwords', 'reset_passwords'):
+        if getattr(args, flag):
+            state['options'][flag] = True
+    for option in ('key_index', 'key_conflicts', 'dedup_report', 'memory_limit_mb', 'transactions', 'savepoint_rows',
+                   'password_workers', 'credential_folder'):
+        if getattr(args, option):
+            state['options'][option] = getattr(args, option)
+    ok = run_tasks(state, args.state, args.update_histograms)
+    print(f"\n{'[SUCCESS] Resumed import completed successfully!' if ok else '[FAILED] Resumed import failed!'}")
+    return 0 if ok else 1
+
+
+def command_status(args) -> int:
+    state = load_state(args.state)
+    if state is None:
+        print(json.dumps({'status': 'none'}) if args.json else f"No import recorded ({args.state} not found)")
+        return EXIT_NO_STATE
+
+    if args.json:
+        print(json.dumps(state, ensure_ascii=False))
+    else:
+        counts = {}
+        for status in state['tasks'].values():
+            counts[status] = counts.get(status, 0) + 1
+        print(f"Last import: {state['status']} (started {state.get('started_at')}, updated {state.get('updated_at')})")
+        print("Tasks: " + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+        for key, status in state['tasks'].items():
+            if status != 'done':
+                print(f"    {key}: {status}")
+        for importer_key, stats in state.get('stats', {}).items():
+            print(f"    {importer_key}: {stats['total_records']} records, {stats['rejected_rows']} rejected")
+
+    return {'succeeded': EXIT_OK, 'running': EXIT_RUNNING}.get(state['status'], EXIT_FAILED)
+
+
+def command_dry_run(args) -> int:
+    from import_dry_run import print_report, run_dry_run, save_report
+
+    folders = {key: os.path.join(args.data_root, IMPORTERS[key][2]) for key in args.importers}
+    report = run_dry_run(folders, args.workers)
+    print_report(report)
+    print(f"Dry-run report saved to: {save_report(report, args.report)}")
+    return 0 if report['ok'] else 1
+
+
+def command_export(args) -> int:
+    from data_export import JanssenCRMDataExporter
+
+    exporter = JanssenCRMDataExporter(output_format=args.format, chunk_size=args.chunk_size)
+    ok = exporter.run_export(args.output, args.importers, args.tables)
+    print(f"\n{'Data export completed successfully!' if ok else 'Data export failed!'}")
+    return 0 if ok else 1
+
+
+def command_compare(args) -> int:
+    from import_compare import run_gate
+
+    return run_gate(args)
+
+
+def command_generate(args) -> int:
+    from data_generator import generate_dataset
+
+    try:
+        manifest = generate_dataset(args.output, args.scale, args.seed, args.format, args.importers,
+                                    skew=args.skew)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Manifest saved to: {manifest}")
+    return 0
+
+
+def command_partitions(args) -> int:
+    from import_partitions import PartitionManager
+
+    manager = PartitionManager(months_ahead=args.months_ahead)
+    return 0 if manager.run(args.action, args.tables, args.apply) else 1
+
+
+def command_dedup(args) -> int:
+    from customer_dedup import load_customers, report_duplicate_customers
+
+    customers, phones = load_customers(os.path.join(args.data_root, IMPORTERS['customer'][2]))
+    summary, report = report_duplicate_customers(customers, phones, args.output, args.threshold, args.window)
+    print(f"{summary['candidates']} merge candidates among {summary['customers']} customers "
+          f"({summary['by_shared_phone']} sharing a phone) in {summary['seconds']}s")
+    print(f"Report saved to: {report}")
+    return 0
+
+
+def command_bench(args) -> int:
+    import pandas as pd
+
+    results = []
+    for importer_key, task_names in selected_tasks(args.importers, args.tables).items():
+        importer = importer_class(importer_key)(dry_run=True)
+        data_folder = os.path.join(args.data_root, IMPORTERS[importer_key][2])
+
+        for task_name, excel_file, method_name in importer.IMPORT_TASKS:
+            file_path = os.path.join(data_folder, excel_file)
+            if task_name not in task_names or not os.path.exists(file_path):
+                continue
+
+            name = method_name[len('import_'):]
+            timings = {}
+            started = time.perf_counter()
+            df = pd.read_excel(file_path)
+            timings['read'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            pre_step = PRE_VALIDATION_STEPS.get(method_name)
+            if pre_step:
+                df = getattr(importer, pre_step)(df)
+            is_valid, errors = importer.validate_data(df, name)
+            timings['validate'] = time.perf_counter() - started
+
+            if is_valid:
+                started = time.perf_counter()
+                getattr(importer, f'prepare_{name}')(df)
+                timings['prepare'] = time.perf_counter() - started
+
+            result = {
+                'importer': importer_key,
+                'task': task_name,
+                'rows': len(df),
+                'seconds': {stage: round(seconds, 4) for stage, seconds in timings.items()},
+                'rows_per_second': round(len(df) / max(sum(timings.values()), 1e-9)),
+                'errors': errors,
+            }
+            results.append(result)
+            print(f"{importer_key}.{task_name}: {result['rows']} rows, "
+                  + ', '.join(f"{stage} {seconds}s" for stage, seconds in result['seconds'].items())
+                  + f", {result['rows_per_second']} rows/s")
+
+    report_file = args.report or f'bench_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), 'results': results}, f, indent=2, ensure_ascii=False)
+    print(f"Benchmark report saved to: {report_file}")
+    return 0
+
+
+def command_watch(args) -> int:
+    from import_watch import STATE_FILE as WATCH_STATE_FILE, ImportWatcher
+
+    ImportWatcher(os.path.abspath(args.data_root), args.workers, args.state or WATCH_STATE_FILE).run()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="JanssenCRM import tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    importers = argparse.ArgumentParser(add_help=False)
+    importers.add_argument('--importers', nargs='+', choices=list(IMPORTERS), default=list(IMPORTERS),
+                           help="Importers to run (default: all)")
+
+    selection = argparse.ArgumentParser(add_help=False, parents=[importers])
+    selection.add_argument('--tables', nargs='+', default=None,
+                           help="Only these import tasks, e.g. customers calls tickets ticket_items")
+
+    data_root = argparse.ArgumentParser(add_help=False)
+    data_root.add_argument('--data-root', default=DATA_ROOT, help="Folder containing the per-importer data folders")
+
+    state = argparse.ArgumentParser(add_help=False)
+    state.add_argument('--state', default=STATE_FILE, help="Import state file")
+
+    writing = argparse.ArgumentParser(add_help=False)
+    writing.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    writing.add_argument('--update-histograms', action='store_true',
+                         help="Also refresh histograms on status, company_id and created_at after the import")
+    writing.add_argument('--progress-events', default=None,
+                         help="Write JSON progress events to a file, tcp://host:port or unix:///path")
+    writing.add_argument('--parse-workers', type=int, default=None,
+                         help="Processes parsing workbooks ahead of the writers (needs pyarrow; 0 disables)")
+    writing.add_argument('--writer', default=None,
+                         help="Writer backend: mysql, mysql-statement, null, recording[:file], sqlite[:file] or sqldump[:file.sql.gz]")
+    writing.add_argument('--sort-by-key', action='store_true',
+                         help="Write every table in primary-key order")
+    writing.add_argument('--memory-limit', dest='memory_limit_mb', type=int, default=None,
+                         help="Memory budget in MB; larger workbooks are spilled to disk and imported in partitions")
+    writing.add_argument('--transactions', type=parse_transaction_strategies, default=None,
+                         help="Commit strategy: batch, table or savepoint, for all tables or per table "
+                              "(e.g. 'batch,governorates=table')")
+    writing.add_argument('--savepoint-rows', type=int, default=None,
+                         help="Rows between savepoints with the savepoint strategy")
+    writing.add_argument('--partition-exchange', action='store_true',
+                         help="Load past months of the partitioned call tables through EXCHANGE PARTITION")
+    writing.add_argument('--key-index', default=None,
+                         help="Folder of the persistent call id index; reports ids loaded by earlier files or runs")
+    writing.add_argument('--key-conflicts', default=None, choices=['report', 'skip', 'fail'],
+                         help="Ids loaded before with different content: write anyway (default), leave out, or fail")
+    writing.add_argument('--dedup-report', default=None,
+                         help="Folder for a report of likely duplicate customers after the customer import")
+    writing.add_argument('--hash-passwords', action='store_true',
+                         help="Give users random initial passwords stored as bcrypt hashes "
+                              "(needs a backend login that verifies bcrypt)")
+    writing.add_argument('--reset-passwords', action='store_true',
+                         help="With --hash-passwords, also replace the passwords of users already stored with a hash")
+    writing.add_argument('--password-workers', type=int, default=None,
+                         help="Processes hashing the user passwords (default: CPU count)")
+    writing.add_argument('--credential-folder', default=None,
+                         help="Folder of the credential report listing the generated passwords")
+
+    command = subparsers.add_parser('import', parents=[selection, data_root, state, writing],
+                                    help="Import the selected tables in one process")
+    command.add_argument('--async-writers', type=int, default=None,
+                         help="Number of concurrent batch writers (0 or 1 writes sequentially)")
+    command.add_argument('--shard-writers', type=int, default=None,
+                         help="Parallel shard writers for customercall and ticketcall (0 or 1 disables)")
+    command.set_defaults(handler=command_import)
+
+    command = subparsers.add_parser('resume', parents=[state, writing],
+                                    help="Re-run the tasks the last import did not finish")
+    command.set_defaults(handler=command_resume)
+
+    command = subparsers.add_parser('status', parents=[state], help="Summarize the last import")
+    command.add_argument('--json', action='store_true', help="Print the raw state as JSON")
+    command.set_defaults(handler=command_status)
+
+    command = subparsers.add_parser('dry-run', parents=[importers, data_root],
+                                    help="Validate the workbooks without a database")
+    command.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    command.add_argument('--report', default=None, help="Path of the JSON report")
+    command.set_defaults(handler=command_dry_run)
+
+    command = subparsers.add_parser('export', parents=[selection], help="Export tables with their Excel headers")
+    command.add_argument('--output', default=f'export_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+                         help="Output folder (mirrors the data folder layout)")
+    command.add_argument('--format', choices=['csv', 'parquet', 'xlsx'], default=None,
+                         help="Output file format (default: xlsx)")
+    command.add_argument('--chunk-size', type=int, default=None, help="Rows fetched per round trip")
+    command.set_defaults(handler=command_export)
+
+    command = subparsers.add_parser('bench', parents=[selection, data_root],
+                                    help="Time reading and mapping of each workbook")
+    command.add_argument('--report', default=None, help="Path of the JSON report")
+    command.set_defaults(handler=command_bench)
+
+    command = subparsers.add_parser('compare', help="Compare per-table throughput with a baseline run")
+    command.add_argument('--baseline', nargs='+', required=True,
+                         help="Baseline stats files, or folders (latest stats file per importer)")
+    command.add_argument('--current', nargs='+', default=['.'],
+                         help="Stats files or folders of the run to check (default: latest in the current folder)")
+    command.add_argument('--threshold', type=float, default=0.1,
+                         help="Largest tolerated rows/s drop, as a fraction (default: 0.1)")
+    command.add_argument('--latency-threshold', type=float, default=0.2,
+                         help="Largest tolerated p95 batch latency increase, as a fraction (default: 0.2)")
+    command.add_argument('--min-rows', type=int, default=1000, help="Smaller tables are reported but never gate")
+    command.add_argument('--min-latency-ms', type=float, default=5.0,
+                            help="Smallest p95 batch latency increase that can gate, in ms (default: 5)")
+    command.add_argument('--report', default=None, help="Path of the JSON report")
+    command.set_defaults(handler=command_compare)
+
+    command = subparsers.add_parser('generate', parents=[importers],
+                                    help="Write a synthetic dataset in the import data folder layout")
+    command.add_argument('--output', default=f'synthetic_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+                         help="Output folder (mirrors the data folder layout)")
+    command.add_argument('--scale', type=float, default=1.0,
+                         help="Scale factor; 1 is 10,000 customers and 100,000 calls")
+    command.add_argument('--seed', type=int, default=42, help="Random seed (same seed, same files)")
+    command.add_argument('--skew', type=float, default=0.8,
+                         help="Zipf exponent of calls and tickets per customer (0 is uniform)")
+    command.add_argument('--format', choices=['csv', 'parquet', 'xlsx'], default='xlsx',
+                         help="Output file format (xlsx holds at most 1,048,575 rows per table)")
+    command.set_defaults(handler=command_generate)
+
+    command = subparsers.add_parser('partitions', help="Monthly partitions of customercall and ticketcall")
+    command.add_argument('action', choices=['status', 'convert', 'extend'])
+    command.add_argument('--tables', nargs='+', choices=sorted(PARTITIONED_TABLES), default=sorted(PARTITIONED_TABLES))
+    command.add_argument('--months-ahead', type=int, default=3,
+                         help="Months after the current one that get their own partition (default: 3)")
+    command.add_argument('--apply', action='store_true', help="Run the statements instead of printing them only")
+    command.set_defaults(handler=command_partitions)
+
+    command = subparsers.add_parser('dedup', parents=[data_root],
+                                    help="List likely duplicate customers in the customer workbooks")
+    command.add_argument('--threshold', type=float, default=0.8, help="Lowest confidence reported (default: 0.8)")
+    command.add_argument('--window', type=int, default=20,
+                         help="Neighbours compared inside a name block (default: 20)")
+    command.add_argument('--output', default=None, help="Path of the CSV report")
+    command.set_defaults(handler=command_dedup)
+
+    command = subparsers.add_parser('watch', parents=[data_root],
+                                    help="Import workbooks as they change in the data folders")
+    command.add_argument('--workers', type=int, default=None, help="Imports running at once (default: 2)")
+    command.add_argument('--state', default=None, help="Watch state file")
+    command.set_defaults(handler=command_watch)
+
+    return parser
+
+
+def main():
+    """Main function to run the JanssenCRM import tools."""
+    args = build_parser().parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1390 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the JanssenCRM import scripts.
+Every Enhanced*Importer class routes its batch writes through BatchWriterMixin,
+so behaviour that concerns the write path lives here once instead of four times.
+Features:
+- Sequential batch writes (one commit per batch)
+- Asyncio mode with several batches in flight over separate connections
+- Bisection of failed batches, with offending rows written to a reject file
+- Key-range or hash sharded writes with deadlock / lock-wait retry
+- Reconnect with backoff and replay of the uncommitted batch on connection loss
+- Post-import ANALYZE TABLE (and optional histograms) on the tables written
+- One vectorized datetime stage: explicit formats, conversion to the
+  server timezone and NaT -> NULL for whole columns at once
+- Optional shared connection pool and INFORMATION_SCHEMA cache, so several
+  importers can run in one process (import_cli.py) without reconnecting
+- Registry of the import scripts (import_registry.py) re-exported for the tools
+- JSONL progress events (file or socket) with a rolling-throughput ETA, and
+  rate-limited batch progress logging
+- Workbooks parsed ahead in worker processes and handed over as memory-mapped
+  Arrow IPC files instead of pickled DataFrames
+- Pluggable writer backends (import_writers.py): MySQL, a null sink, a
+  statement recorder, a SQLite stand-in and an offline SQL bundle
+- Optional primary-key ordering of the mapped frames before the rows are built
+- Past months of the monthly partitioned call tables loaded through a
+  standalone table and EXCHANGE PARTITION
+- Persistent per-table id index (sorted NumPy arrays) reporting ids that an
+  earlier file or run already loaded, with the same or different content
+- Memory-budgeted mode: workbooks that would not fit are streamed, spilled to
+  Parquet and imported one key-range partition at a time (import_spill.py)
+- Per-table transaction strategy: a commit per batch, one transaction per
+  table, or one transaction with a savepoint every ``savepoint_rows`` rows
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+from import_registry import (FOREIGN_KEYS, IMPORTERS, KEY_COLUMNS, PARTITIONED_TABLES,  # noqa: F401
+                             PRE_VALIDATION_STEPS, SNAPSHOT_FILE, TARGET_TABLES, TRANSACTION_STRATEGIES,
+                             importer_class, load_schema_snapshot, parse_transaction_strategies)
+from import_spill import SpilledWorkbook, fits_in_memory
+
+INSERT_COLUMNS_PATTERN = re.compile(r'INSERT\s+INTO\s+\w+\s*\(([^)]*)\)', re.IGNORECASE)
+INSERT_TABLE_PATTERN = re.compile(r'INSERT\s+INTO\s+(\w+)', re.IGNORECASE)
+
+# ER_LOCK_WAIT_TIMEOUT and ER_LOCK_DEADLOCK: the batch itself is fine and can be replayed
+LOCK_ERRORS = (1205, 1213)
+# Server gone away / lost during query / interaction timeout: reconnect, then replay
+LOST_CONNECTION_ERRORS = (2006, 2013, 2055, 4031)
+# Errors after which InnoDB has rolled back the whole transaction, not just the statement
+TRANSACTION_LOST_ERRORS = (1213,) + LOST_CONNECTION_ERRORS
+
+# Per-table transaction counters kept in write_progress and copied to stats['tables']
+TRANSACTION_COUNTERS = ('commits', 'commit_seconds', 'savepoints', 'rollbacks', 'rolled_back_rows')
+
+STATS_LOCK = threading.Lock()
+
+# Hot report filter columns that get histograms when update_histograms is on
+HISTOGRAM_COLUMNS = ['status', 'company_id', 'created_at']
+
+# mysql-connector refuses pools larger than this
+MAX_POOL_SIZE = 32
+
+# Columns the importers set to the import time; they do not count as content in the key index
+VOLATILE_COLUMNS = ('updated_at',)
+
+# Timezone of the MySQL server (TZ in docker-compose.yml); DATETIME columns hold its wall-clock time
+SERVER_TIMEZONE = 'Africa/Cairo'
+
+# Formats tried in order for datetime cells that arrive as text; cells openpyxl
+# already read as dates pass through every format unchanged
+DATETIME_FORMATS = ['ISO8601', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y']
+UTC_OFFSET_PATTERN = r'(?:Z|[+-]\d{2}:?\d{2})$'
+
+# Text of a missing value in KeyIndex fingerprints; a control character no cell holds
+CANONICAL_NULL = '\x00'
+
+
+def create_connection_pool(config: Dict, writers: int, jobs: int = 1):
+    """Open a pool big enough for ``jobs`` concurrent imports of ``writers`` writer connections each."""
+    from mysql.connector.pooling import MySQLConnectionPool
+
+    pool_size = min(MAX_POOL_SIZE, jobs * (1 + max(writers, 1)))
+    return MySQLConnectionPool(pool_name='janssencrm_import', pool_size=pool_size, **config)
+
+
+def server_now(settings: Dict) -> datetime:
+    """Return the server's current wall-clock time as a naive datetime."""
+    now = pd.Timestamp.now(tz=settings.get('server_timezone', SERVER_TIMEZONE))
+    return now.tz_localize(None).to_pydatetime()
+
+
+def _to_server_time(parsed: pd.Series, settings: Dict) -> pd.Series:
+    """Convert parsed datetimes to naive server wall-clock time."""
+    server_timezone = settings.get('server_timezone', SERVER_TIMEZONE)
+    source_timezone = settings.get('source_timezone')
+    if parsed.dt.tz is None:
+        if not source_timezone:
+            return parsed
+        parsed = parsed.dt.tz_localize(source_timezone, ambiguous='NaT', nonexistent='shift_forward')
+    return parsed.dt.tz_convert(server_timezone).dt.tz_localize(None)
+
+
+class DatetimeParseError(ValueError):
+    """Non-empty datetime cells no format matches; ``failures`` maps column to count and sample."""
+
+    def __init__(self, failures: Dict[str, Dict]):
+        self.failures = failures
+        super().__init__('; '.join(f"{failure['count']} values in {col} match no datetime format, "
+                                   f"e.g. {failure['sample']}" for col, failure in failures.items()))
+
+
+def unparsed_datetimes(values: pd.Series, parsed: pd.Series) -> pd.Series:
+    """Mask of the non-empty cells of ``values`` that ``parsed`` left NaT; blank cells are empty."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.notna() & parsed.isna()
+    filled = values.notna() & (values.astype(str).str.strip() != '')
+    return filled & parsed.isna()
+
+
+def parse_datetimes(values: pd.Series, settings: Dict) -> pd.Series:
+    """Parse a workbook column into naive server-time datetime64 in one vectorized pass.
+
+    Text is matched against each of ``datetime_formats`` in turn instead of
+    letting pandas guess a format per cell. Values with a UTC offset, and
+    naive values when ``source_timezone`` is set, are converted to
+    ``server_timezone``. Cells no format matches become NaT; tell them from
+    empty cells with unparsed_datetimes().
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return _to_server_time(values, settings)
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    remaining = values.notna()
+    for fmt in settings.get('datetime_formats', DATETIME_FORMATS):
+        if not remaining.any():
+            break
+        candidates = values[remaining]
+        try:
+            attempt = _to_server_time(pd.to_datetime(candidates, format=fmt, errors='coerce'), settings)
+        except ValueError:
+            # Naive values mixed with values carrying (possibly different) UTC offsets
+            has_offset = candidates.astype(str).str.contains(UTC_OFFSET_PATTERN)
+            attempt = pd.concat([
+                _to_server_time(pd.to_datetime(candidates[~has_offset], format=fmt, errors='coerce'), settings),
+                _to_server_time(pd.to_datetime(candidates[has_offset], format=fmt, errors='coerce', utc=True), settings),
+            ])
+        attempt = attempt.dropna()
+        parsed[attempt.index] = attempt
+        remaining[attempt.index] = False
+    return parsed
+
+
+def native_datetimes(parsed: pd.Series) -> pd.Series:
+    """Turn datetime64 values into datetime objects, with None for NaT, ready to bind as parameters."""
+    values = np.array(parsed.dt.to_pydatetime(), dtype=object)
+    values[parsed.isna().to_numpy()] = None
+    return pd.Series(values, index=parsed.index, dtype=object)
+
+
+def convert_datetimes(df: pd.DataFrame, columns: List[str], settings: Dict,
+                      default: Optional[datetime] = None) -> pd.DataFrame:
+    """Run the datetime stage over ``columns`` of ``df`` in place and return ``df``.
+
+    Each column is parsed once, moved to server time and handed on as native
+    datetimes with NULLs, so the row loops need no per-cell checks. Cells
+    left empty take ``default`` when one is given. Absent columns are skipped.
+    Raises DatetimeParseError, before changing ``df``, when a non-empty cell
+    matches none of ``datetime_formats``.
+    """
+    converted, failures = {}, {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        parsed = parse_datetimes(df[col], settings)
+        failed = unparsed_datetimes(df[col], parsed)
+        if failed.any():
+            failures[col] = {'count': int(failed.sum()),
+                             'sample': df.loc[failed, col].astype(str).head(5).tolist()}
+            continue
+        if default is not None:
+            parsed = parsed.fillna(pd.Timestamp(default))
+        converted[col] = native_datetimes(parsed)
+    if failures:
+        raise DatetimeParseError(failures)
+    for col, values in converted.items():
+        df[col] = values
+    return df
+
+
+def stage_workbook(file_path: str, folder: str) -> Optional[str]:
+    """Parse a workbook and write it to ``folder`` as an Arrow IPC file. Runs in a worker process.
+
+    Returns the path of the staged file, or None when a column mixes types
+    Arrow cannot hold in one array; the importer then reads the workbook itself.
+    """
+    import pyarrow as pa
+
+    df = pd.read_excel(file_path)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+    staged = os.path.join(folder, f'{uuid.uuid4().hex}.arrow')
+    with pa.OSFile(staged, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return staged
+
+
+def load_staged(path: str) -> pd.DataFrame:
+    """Map a staged Arrow IPC file read-only and return it as a DataFrame.
+
+    The record batches stay in the mapped file; only columns pandas cannot
+    view in place (strings, nullable integers) are materialized.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+class ProgressEmitter:
+    """Write progress events as JSON lines, and track write throughput per table.
+
+    ``target`` is a file path (appended to), ``tcp://host:port`` or
+    ``unix:///path``. Without a target events are dropped, so the write path
+    can always emit. A target that goes away mid-run stops the stream rather
+    than the import.
+    """
+
+    def __init__(self, target: Optional[str] = None, window_seconds: float = 30.0):
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.stream = self._open(target) if target else None
+
+    @staticmethod
+    def _open(target: str):
+        if target.startswith('tcp://'):
+            host, port = target[len('tcp://'):].rsplit(':', 1)
+            return socket.create_connection((host, int(port))).makefile('w', encoding='utf-8')
+        if target.startswith('unix://'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(target[len('unix://'):])
+            return sock.makefile('w', encoding='utf-8')
+        return open(target, 'a', encoding='utf-8')
+
+    def emit(self, event: str, **fields) -> None:
+        if self.stream is None:
+            return
+        line = json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, ensure_ascii=False, default=str)
+        with self.lock:
+            try:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+            except (OSError, ValueError):
+                self.stream = None
+
+    def start(self, table_name: str) -> None:
+        """Begin a throughput window for ``table_name``."""
+        with self.lock:
+            self.samples[table_name] = deque([(time.monotonic(), 0)])
+
+    def throughput(self, table_name: str, rows: int) -> float:
+        """Record ``rows`` just committed to ``table_name``; return rows/s over the last ``window_seconds``."""
+        now = time.monotonic()
+        with self.lock:
+            samples = self.samples.setdefault(table_name, deque([(now, 0)]))
+            samples.append((now, rows))
+            while len(samples) > 2 and now - samples[1][0] >= self.window_seconds:
+                samples.popleft()
+            elapsed = now - samples[0][0]
+            # Rows of the oldest sample were committed before the window opened
+            return sum(count for _, count in list(samples)[1:]) / elapsed if elapsed > 0 else 0.0
+
+    def close(self) -> None:
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+
+
+def _canonical_value(value) -> str:
+    """Text of one cell, the same whatever dtype the column it came in had."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return CANONICAL_NULL
+    if isinstance(value, (bool, np.bool_, int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    if isinstance(value, (datetime, np.datetime64)):
+        # DATETIME columns keep whole seconds
+        return pd.Timestamp(value).round('s').strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def canonical_text(values: pd.Series) -> pd.Series:
+    """Render a column as text that does not depend on its dtype.
+
+    1, 1.0 and an object column holding 1 all render as '1', so a re-export
+    whose int column gained a blank (and became float) reads the same.
+    """
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        text = values.astype('Int64').astype('string')
+    elif pd.api.types.is_float_dtype(values):
+        numbers = values.astype('float64')
+        integral = numbers.notna() & (numbers == numbers.round())
+        text = numbers.map(repr).astype('string')
+        text[integral] = numbers[integral].astype('int64').astype('string')
+        text[numbers.isna()] = pd.NA
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        text = values.dt.round('s').dt.strftime('%Y-%m-%d %H:%M:%S').astype('string')
+    else:
+        return values.map(_canonical_value).astype('string')
+    return text.fillna(CANONICAL_NULL)
+
+
+class KeyIndex:
+    """Ids a table was loaded with, and a fingerprint of each row's content, kept across runs.
+
+    Stored as two sorted, memory-mapped .npy files per table in ``folder``
+    (16 bytes per id), so lookups are one np.searchsorted over the batch
+    instead of a query per id. The fingerprint file name carries
+    FINGERPRINT_VERSION; an index written by another version starts over.
+    """
+
+    FINGERPRINT_VERSION = 2
+
+    def __init__(self, folder: str, table_name: str):
+        self.folder = folder
+        self.paths = {'ids': os.path.join(folder, f'{table_name}.ids.npy'),
+                      'fingerprints': os.path.join(folder, f'{table_name}.fingerprints.v{self.FINGERPRINT_VERSION}.npy')}
+        if all(os.path.exists(path) for path in self.paths.values()):
+            self.ids = np.load(self.paths['ids'], mmap_mode='r')
+            self.fingerprints = np.load(self.paths['fingerprints'], mmap_mode='r')
+        else:
+            self.ids = np.empty(0, dtype=np.int64)
+            self.fingerprints = np.empty(0, dtype=np.uint64)
+
+    @staticmethod
+    def fingerprint(frame: pd.DataFrame) -> np.ndarray:
+        """64-bit hash of each row's canonical text, so dtype changes between exports do not count."""
+        rendered = pd.DataFrame({col: canonical_text(frame[col]) for col in frame.columns}, index=frame.index)
+        return pd.util.hash_pandas_object(rendered, index=False).to_numpy()
+
+    def check(self, ids: np.ndarray, fingerprints: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ids loaded before with the same content and those loaded with different content."""
+        if not len(self.ids):
+            return ids[:0], ids[:0]
+        positions = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        found = self.ids[positions] == ids
+        same = found & (self.fingerprints[positions] == fingerprints)
+        return ids[same], ids[found & ~same]
+
+    def add(self, ids: np.ndarray, fingerprints: np.ndarray) -> None:
+        """Merge ids into the index and save it; for an id given twice the later row wins, like the upserts."""
+        # Reversed so np.unique, which keeps first occurrences, keeps the newest fingerprint
+        merged_ids = np.concatenate([ids[::-1], self.ids])
+        merged_fingerprints = np.concatenate([fingerprints[::-1], self.fingerprints])
+        self.ids, first = np.unique(merged_ids, return_index=True)
+        self.fingerprints = merged_fingerprints[first]
+
+        os.makedirs(self.folder, exist_ok=True)
+        for name, values in (('ids', self.ids), ('fingerprints', self.fingerprints)):
+            temp_path = self.paths[name] + '.tmp'
+            with open(temp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(temp_path, self.paths[name])
+
+
+class SchemaCache:
+    """Column metadata of one database, read from INFORMATION_SCHEMA in a single query.
+
+    Shared by every importer in a process so the table and column checks of
+    each import do not each go back to the server. Only tables that were
+    found are cached; a table reported missing is looked up again, since
+    the importers create some tables on the fly.
+    """
+
+    def __init__(self, database: str):
+        self.database = database
+        self.tables = None
+        self.lock = threading.Lock()
+
+    def _load(self, cursor) -> None:
+        cursor.execute(
+            """
+            SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, IS_NULLABLE, COLUMN_DEFAULT
+            FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = %s
+            """,
+            (self.database,)
+        )
+        tables = {}
+        for table_name, column_name, data_type, max_length, is_nullable, default_value in cursor.fetchall():
+            tables.setdefault(table_name, {})[column_name] = {
+                'column_name': column_name,
+                'data_type': data_type,
+                'max_length': max_length,
+                'is_nullable': is_nullable,
+                'default_value': default_value
+            }
+        self.tables = tables
+
+    def columns(self, cursor, table_name: str) -> Dict[str, Dict]:
+        """Return {column: info} for ``table_name`` (empty if the table does not exist)."""
+        with self.lock:
+            if self.tables is None or table_name not in self.tables:
+                self._load(cursor)
+            return self.tables.get(table_name, {})
+
+    def table_exists(self, cursor, table_name: str) -> bool:
+        return bool(self.columns(cursor, table_name))
+
+    def column_info(self, cursor, table_name: str, column_name: str) -> Optional[Dict]:
+        return self.columns(cursor, table_name).get(column_name)
+
+
+class BatchWriterMixin:
+    """Batch write path shared by the importer classes.
+
+    The importer provides ``config``, ``connection``, ``cursor``, ``logger``,
+    ``import_settings``, ``async_writers``, ``stats``, ``changed_tables``
+    (a set) and ``write_progress`` (a dict); importers that pass
+    ``shard_column`` also provide ``shard_writers``.
+
+    Every batch goes through ``_write_batch_with_retry``. Transient errors
+    (lost connection, deadlock, lock wait timeout) roll back and replay only
+    the uncommitted batch, reconnecting first when the connection is gone;
+    the statements are upserts, so a replay is safe even if the lost commit
+    did land. A batch that fails on its data (bad value, constraint
+    violation) is bisected: each half is retried on its own and halves that
+    still fail are split again, so k bad rows cost O(k log n) statements.
+    Single rows that fail are written to a per-table reject file together
+    with the error message and every other row is committed.
+
+    ``connection_pool`` and ``schema_cache`` are set by import_cli.py when
+    several importers share one process; standalone scripts leave them unset
+    and open their own connections.
+
+    Connections come from ``writer`` (see import_writers.py), built from the
+    ``writer`` setting on first use; anything other than MySQL also answers
+    the schema checks from schema_snapshot.json.
+
+    Progress goes out as JSONL events to the ``progress_events`` target
+    (table_start/table_end from run_import, batch_committed with latency
+    and a rolling-throughput ETA, retry, bisect, rejects). The log gets at
+    most one progress line per ``progress_log_seconds`` per table; the
+    per-batch line is DEBUG.
+
+    ``transaction_strategy`` (default 'batch', overridden per table by
+    ``transaction_strategies``) picks the commit strategy, see
+    ``_write_rows_transaction``; its commits, commit time, savepoints and
+    rollbacks are recorded per table in ``stats['tables']``.
+
+    run_import starts each import method through ``_run_import_task``; with
+    ``memory_limit_mb`` set, workbooks too large for that budget are
+    imported out of core, see ``_import_out_of_core``.
+    """
+
+    connection_pool = None
+    schema_cache = None
+    progress_emitter = None
+    staged_workbooks = None
+    spilled_frames = None
+    deferred_rejects = None
+    writer = None
+    owns_writer = False
+
+    def _progress(self) -> ProgressEmitter:
+        """Return the event emitter, opening the ``progress_events`` target on first use."""
+        if self.progress_emitter is None:
+            self.progress_emitter = ProgressEmitter(self.import_settings.get('progress_events'))
+        return self.progress_emitter
+
+    def _emit(self, event: str, **fields) -> None:
+        self._progress().emit(event, importer=type(self).__module__, **fields)
+
+    def _table_started(self, task_name: str, file_path: str) -> None:
+        """Announce one import task; run_import calls this before the import method."""
+        self.task_started = time.perf_counter()
+        self._emit('table_start', task=task_name, table=TARGET_TABLES.get(task_name, task_name), file=file_path)
+
+    def _table_finished(self, task_name: str, success: bool) -> None:
+        """Announce the outcome of one import task and record its timings in ``stats['tables']``.
+
+        run_import calls this after the import method. ``seconds`` covers the
+        whole task (read, map and write); the batch latencies only the writes.
+        """
+        table_name = TARGET_TABLES.get(task_name, task_name)
+        seconds = time.perf_counter() - self.task_started
+        progress = self.write_progress.get(table_name, {})
+        rows = progress.get('rows_done', 0)
+        latencies = progress.get('latencies', [])
+        self.stats['tables'][table_name] = {
+            'success': bool(success),
+            'rows': rows,
+            'rejected': progress.get('rejected', 0),
+            'batches': len(latencies),
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+            'p95_batch_ms': round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies else None,
+            'transaction': progress.get('strategy', self._transaction_strategy(table_name)),
+            'commits': progress.get('commits', 0),
+            'commit_seconds': round(progress.get('commit_seconds', 0), 3),
+            'savepoints': progress.get('savepoints', 0),
+            'rollbacks': progress.get('rollbacks', 0),
+            'rolled_back_rows': progress.get('rolled_back_rows', 0),
+        }
+        self._emit('table_end', task=task_name, table=table_name, success=success, seconds=round(seconds, 3),
+                   rows=rows, rejected=progress.get('rejected', 0))
+
+    def _batch_committed(self, table_name: str, index: int, total_batches: int, rows: int,
+                         rejected: int, started: float, shard: Optional[int] = None) -> None:
+        """Count one finished batch, emit batch_committed and log progress at most every few seconds."""
+        latency = time.perf_counter() - started
+        progress = self.write_progress[table_name]
+        with STATS_LOCK:
+            progress['rows_done'] += rows
+            progress['rejected'] += rejected
+            progress['batches_done'] += 1
+            progress['latencies'].append(latency)
+            rows_done, batches_done = progress['rows_done'], progress['batches_done']
+        rate = self._progress().throughput(table_name, rows)
+        eta = round((progress['rows_total'] - rows_done) / rate, 1) if rate > 0 else None
+
+        self._emit('batch_committed', table=table_name, batch=index + 1, batches=total_batches, shard=shard,
+                   rows=rows, rejected=rejected, latency_ms=round(latency * 1000, 1), rows_done=rows_done,
+                   rows_total=progress['rows_total'], rows_per_second=round(rate, 1), eta_seconds=eta)
+
+        now = time.monotonic()
+        if (batches_done == progress['batches']
+                or now - progress['logged_at'] >= self.import_settings.get('progress_log_seconds', 5)):
+            progress['logged_at'] = now
+            self.logger.info(f"{table_name}: {rows_done}/{progress['rows_total']} rows, "
+                             f"{batches_done}/{progress['batches']} batches, {rate:.0f} rows/s, ETA {eta}s")
+        else:
+            self.logger.debug(f"{table_name}: processed batch {index + 1}/{total_batches} in {latency * 1000:.0f} ms")
+
+    def _read_workbook(self, excel_file: str) -> pd.DataFrame:
+        """Read a workbook, using the copy staged by a parse worker when there is one.
+
+        ``staged_workbooks`` maps workbook paths to futures of ``stage_workbook``;
+        ``spilled_frames`` holds the partition _import_out_of_core is importing.
+        """
+        frame = (self.spilled_frames or {}).get(excel_file)
+        if frame is not None:
+            return frame
+        future = (self.staged_workbooks or {}).get(excel_file)
+        if future is not None:
+            staged = future.result()
+            if staged:
+                return load_staged(staged)
+            self.logger.warning(f"{excel_file} has mixed-type columns, reading it directly")
+        return pd.read_excel(excel_file)
+
+    def _run_import_task(self, file_path: str, import_func: Callable[[str], bool]) -> bool:
+        """Run one import method on ``file_path``, out of core when the workbook exceeds ``memory_limit_mb``."""
+        memory_limit = self.import_settings.get('memory_limit_mb')
+        if not memory_limit or fits_in_memory(file_path, memory_limit * 2**20):
+            return import_func(file_path)
+        return self._import_out_of_core(file_path, import_func, memory_limit * 2**20)
+
+    def _import_out_of_core(self, file_path: str, import_func: Callable[[str], bool], memory_limit: int) -> bool:
+        """Import a workbook partition by partition through its unchanged import method.
+
+        The workbook is spilled by SpilledWorkbook first. Every partition is
+        validated before any is written, so a workbook that fails validation
+        still writes nothing; each partition then goes through
+        ``import_func``, which reads it back from ``spilled_frames``. The
+        write progress of the partitions is summed into one entry per table,
+        and their rejects are collected in ``deferred_rejects`` and written
+        to one file per table at the end.
+
+        Each partition commits on its own, so a table under the 'table'
+        transaction strategy would no longer be atomic: such imports are
+        refused here, and ``_write_rows`` refuses any other table of the
+        method that resolves to 'table'.
+        """
+        method_name = import_func.__name__
+        name = method_name[len('import_'):]
+        table_name = TARGET_TABLES.get(name, name)
+        if self._transaction_strategy(table_name) == 'table':
+            self.logger.error(f"{os.path.basename(file_path)} exceeds memory_limit_mb, and {table_name} uses the "
+                              f"'table' transaction strategy, which cannot span its partitions; "
+                              f"raise memory_limit_mb or use 'savepoint'")
+            return False
+        pre_step = PRE_VALIDATION_STEPS.get(method_name)
+        started = time.perf_counter()
+        with SpilledWorkbook(file_path, memory_limit, self.import_settings.get('spill_folder')).spill() as workbook:
+            if not workbook.rows:
+                return import_func(file_path)
+            self.logger.info(f"Spilled {workbook.rows} rows of {os.path.basename(file_path)} in "
+                             f"{len(workbook.chunks)} chunks in {time.perf_counter() - started:.2f}s "
+                             f"({workbook.partition_rows} rows per partition)")
+
+            for frame in workbook.partitions():
+                if pre_step:
+                    frame = getattr(self, pre_step)(frame)
+                is_valid, errors = self.validate_data(frame, name)
+                if not is_valid:
+                    for error in errors:
+                        self.logger.error(f"Validation error: {error}")
+                    return False
+
+            partitions = len(workbook.partition_files)
+            written = dict(self.write_progress)
+            totals = {}
+            self.deferred_rejects = {}
+            try:
+                for index, frame in enumerate(workbook.partitions()):
+                    self.spilled_frames = {file_path: frame}
+                    success = import_func(file_path)
+                    for table_name, progress in self.write_progress.items():
+                        if written.get(table_name) is progress:
+                            continue
+                        written[table_name] = progress
+                        total = totals.get(table_name)
+                        if total is None:
+                            totals[table_name] = {**progress, 'latencies': list(progress['latencies'])}
+                            continue
+                        for field in ('rows_total', 'rows_done', 'rejected', 'batches', 'batches_done',
+                                      *TRANSACTION_COUNTERS):
+                            total[field] += progress[field]
+                        total['latencies'] += progress['latencies']
+                    if not success:
+                        self.logger.error(f"Partition {index + 1}/{partitions} of {file_path} failed, "
+                                          f"{index} written before it")
+                        return False
+            finally:
+                self.spilled_frames = None
+                self.write_progress.update(totals)
+                deferred, self.deferred_rejects = self.deferred_rejects, None
+                for table_name, (query, rejected) in deferred.items():
+                    self._write_rejects(table_name, query, rejected)
+        return True
+
+    def _new_connection(self):
+        """Open a connection from the writer, borrowing it from the shared pool when there is one."""
+        if self.writer is None:
+            spec = self.import_settings.get('writer', 'mysql')
+            if spec == 'mysql':
+                if self.connection_pool is not None:
+                    return self.connection_pool.get_connection()
+                return mysql.connector.connect(**self.config)
+            from import_writers import create_writer
+            self.writer = create_writer(spec, self.config, self.connection_pool)
+            self.owns_writer = True
+        if self.writer.uses_snapshot and self.schema_cache is None:
+            from import_writers import SnapshotSchemaCache
+            self.schema_cache = SnapshotSchemaCache()
+        return self.writer.connect()
+
+    def _close_writer(self) -> None:
+        """Close the writer if this importer built it; import_cli closes the one it shares."""
+        if self.writer is not None and self.owns_writer:
+            self.writer.close()
+            self.writer = None
+            self.owns_writer = False
+
+    def _write_rows(self, table_name: str, query: str, rows: List[Tuple],
+                    shard_column: Optional[str] = None,
+                    rejects: Sequence[Tuple[Tuple, str]] = ()) -> List[Tuple[Tuple, str]]:
+        """Write rows in batches of ``batch_size``, committing after each batch.
+
+        Tables whose transaction strategy is not 'batch' are written over the
+        main connection in one transaction instead, see
+        ``_write_rows_transaction``. Otherwise, with ``shard_column`` set and
+        ``shard_writers`` > 1 the rows are split
+        into shards written in parallel, see ``_write_rows_sharded``. With
+        ``partition_exchange`` on, rows of past months of a partitioned table
+        go through ``_exchange_partitions`` first. ``rejects`` are (row,
+        error) pairs the caller rejected before writing; they are counted and
+        written with the table's other rejects. Returns the rejected rows.
+        """
+        batch_size = self.import_settings['batch_size']
+        if rows:
+            self.changed_tables.add(table_name)
+        total_batches = (len(rows) - 1) // batch_size + 1 if rows else 0
+        strategy = self._transaction_strategy(table_name)
+        if strategy == 'table' and self.spilled_frames is not None:
+            raise ValueError(f"{table_name} uses the 'table' transaction strategy, which cannot span "
+                             f"the partitions of an out-of-core import")
+        self.write_progress[table_name] = {
+            'rows_total': len(rows), 'rows_done': 0, 'rejected': len(rejects),
+            'batches': total_batches, 'batches_done': 0, 'logged_at': 0.0, 'latencies': [],
+            'strategy': strategy, **dict.fromkeys(TRANSACTION_COUNTERS, 0)
+        }
+        self._progress().start(table_name)
+        rejected = list(rejects)
+        if self.import_settings.get('partition_exchange') and table_name in PARTITIONED_TABLES and rows:
+            rows, exchange_rejected = self._exchange_partitions(table_name, query, rows)
+            rejected += exchange_rejected
+            total_batches = (len(rows) - 1) // batch_size + 1 if rows else 0
+            self.write_progress[table_name]['batches'] = self.write_progress[table_name]['batches_done'] + total_batches
+        if strategy != 'batch' and rows:
+            rejected += self._write_rows_transaction(table_name, query, rows, strategy)
+        elif shard_column and self.shard_writers > 1 and len(rows) > batch_size:
+            rejected += self._write_rows_sharded(table_name, query, rows, shard_column)
+        elif self.async_writers > 1 and len(rows) > batch_size:
+            rejected += asyncio.run(self._write_rows_async(table_name, query, rows))
+        else:
+            for i in range(0, len(rows), batch_size):
+                started = time.perf_counter()
+                batch = rows[i:i + batch_size]
+                conn, batch_rejected = self._write_batch_with_retry(self.connection, query, batch)
+                if conn is not self.connection:
+                    self.connection, self.cursor = conn, conn.cursor()
+                rejected.extend(batch_rejected)
+                self._batch_committed(table_name, i // batch_size, total_batches, len(batch), len(batch_rejected), started)
+
+        if rejected and self.deferred_rejects is not None:
+            self.deferred_rejects.setdefault(table_name, (query, []))[1].extend(rejected)
+        elif rejected:
+            self._write_rejects(table_name, query, rejected)
+        return rejected
+
+    def _check_key_index(self, table_name: str, query: str, frame: pd.DataFrame) -> pd.DataFrame:
+        """Report ids of ``frame`` that an earlier file or run already loaded into ``table_name``.
+
+        Needs the ``key_index`` folder setting. Ids loaded before with the
+        same content are re-exports and only counted; ids loaded with
+        different content are conflicts, listed in
+        ``<key_index>/<table>_conflicts_<timestamp>.csv`` and handled by
+        ``key_conflicts``: 'report' writes them anyway (the upsert
+        overwrites), 'skip' leaves them out, 'fail' fails the task.
+        Content is the statement's columns except VOLATILE_COLUMNS.
+        Returns the frame to write.
+        """
+        folder = self.import_settings.get('key_index')
+        if not folder or frame.empty:
+            return frame
+        index = KeyIndex(folder, table_name)
+        columns = [col.strip() for col in INSERT_COLUMNS_PATTERN.search(query).group(1).split(',')]
+        ids = frame['id'].to_numpy(dtype=np.int64)
+        known, conflicting = index.check(ids, KeyIndex.fingerprint(frame[[col for col in columns
+                                                                          if col not in VOLATILE_COLUMNS]]))
+        self._emit('key_check', table=table_name, rows=len(frame), indexed=len(index.ids),
+                   known=len(known), conflicting=len(conflicting))
+        if len(known):
+            self.logger.info(f"{table_name}: {len(known)} ids were already loaded with the same content")
+        if not len(conflicting):
+            return frame
+
+        report_file = os.path.join(folder, f'{table_name}_conflicts_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+        frame[frame['id'].isin(conflicting)].to_csv(report_file, index=False, encoding='utf-8-sig')
+        policy = self.import_settings.get('key_conflicts', 'report')
+        message = (f"{table_name}: {len(conflicting)} ids were loaded before with different content, "
+                   f"e.g. {conflicting[:5].tolist()}; see {report_file}")
+        if policy == 'fail':
+            raise ValueError(message)
+        self.logger.warning(message + (", leaving them out" if policy == 'skip' else ", overwriting them"))
+        return frame[~frame['id'].isin(conflicting)] if policy == 'skip' else frame
+
+    def _update_key_index(self, table_name: str, query: str, frame: pd.DataFrame,
+                          rejected: List[Tuple[Tuple, str]]) -> None:
+        """Add the rows of ``frame`` that were written, i.e. not rejected, to the key index."""
+        folder = self.import_settings.get('key_index')
+        if not folder or frame.empty:
+            return
+        columns = [col.strip() for col in INSERT_COLUMNS_PATTERN.search(query).group(1).split(',')]
+        if rejected:
+            id_index = columns.index('id')
+            frame = frame[~frame['id'].isin([row[id_index] for row, _ in rejected])]
+        index = KeyIndex(folder, table_name)
+        index.add(frame['id'].to_numpy(dtype=np.int64),
+                  KeyIndex.fingerprint(frame[[col for col in columns if col not in VOLATILE_COLUMNS]]))
+
+    def _exchange_partitions(self, table_name: str, query: str,
+                             rows: List[Tuple]) -> Tuple[List[Tuple], List[Tuple[Tuple, str]]]:
+        """Load the rows of past months through a standalone table swapped in with EXCHANGE PARTITION.
+
+        A monthly partition (see import_partitions.py) that ends before the
+        current month qualifies when it is empty (a backfill) or the import
+        brings at least ``exchange_min_rows`` rows for it; a few late rows for
+        a loaded month are upserted directly rather than rewriting the month.
+        For each qualifying month the partition's rows are copied into
+        ``<table>_exchange`` (nothing to copy for a backfill), the import rows
+        are upserted there without touching the live table, and ALTER TABLE
+        ... EXCHANGE PARTITION swaps it in as a metadata operation. Writes the
+        application makes to that month meanwhile are lost and no triggers
+        fire, so only past months qualify. Returns the rows left for the
+        normal write path, in their original order, and the rejected rows.
+        """
+        if self.writer is not None and self.writer.uses_snapshot:
+            return rows, []
+        from import_partitions import table_partitions, to_days
+
+        partitions = [(name, bound) for name, bound, _ in
+                      table_partitions(self.cursor, self.config['database'], table_name) if bound is not None]
+        if not partitions:
+            self.logger.warning(f"{table_name} is not partitioned by month, writing it directly")
+            return rows, []
+
+        columns = [col.strip() for col in INSERT_COLUMNS_PATTERN.search(query).group(1).split(',')]
+        index = columns.index(PARTITIONED_TABLES[table_name])
+        bounds = [bound for _, bound in partitions]
+        cutoff = to_days(server_now(self.import_settings).replace(day=1))
+        positions = [bisect.bisect_right(bounds, to_days(row[index])) if row[index] is not None else len(bounds)
+                     for row in rows]
+        months = {}
+        for row, position in zip(rows, positions):
+            if position < len(bounds) and bounds[position] <= cutoff:
+                months.setdefault(position, []).append(row)
+
+        min_rows = self.import_settings.get('exchange_min_rows', 100000)
+        occupied = {}
+        for position, month_rows in list(months.items()):
+            partition = partitions[position][0]
+            self.cursor.execute(f"SELECT 1 FROM {table_name} PARTITION ({partition}) LIMIT 1")
+            occupied[position] = self.cursor.fetchone() is not None
+            if occupied[position] and len(month_rows) < min_rows:
+                self.logger.info(f"{table_name} partition {partition} already holds rows and gets only "
+                                 f"{len(month_rows)}, upserting them directly")
+                del months[position]
+        remaining = [row for row, position in zip(rows, positions) if position not in months]
+
+        staging = f'{table_name}_exchange'
+        staging_query = INSERT_TABLE_PATTERN.sub(f'INSERT INTO {staging}', query, count=1)
+        batch_size = self.import_settings['batch_size']
+        rejected = []
+        for position, month_rows in sorted(months.items()):
+            partition = partitions[position][0]
+            started = time.perf_counter()
+            for statement in (f"DROP TABLE IF EXISTS {staging}", f"CREATE TABLE {staging} LIKE {table_name}",
+                              f"ALTER TABLE {staging} REMOVE PARTITIONING"):
+                self.cursor.execute(statement)
+            if occupied[position]:
+                self.cursor.execute(f"INSERT INTO {staging} SELECT * FROM {table_name} PARTITION ({partition})")
+                self.connection.commit()
+
+            for i in range(0, len(month_rows), batch_size):
+                batch_started = time.perf_counter()
+                batch = month_rows[i:i + batch_size]
+                conn, batch_rejected = self._write_batch_with_retry(self.connection, staging_query, batch)
+                if conn is not self.connection:
+                    self.connection, self.cursor = conn, conn.cursor()
+                rejected.extend(batch_rejected)
+                progress = self.write_progress[table_name]
+                self._batch_committed(table_name, progress['batches_done'], progress['batches'], len(batch),
+                                      len(batch_rejected), batch_started)
+
+            self.cursor.execute(f"ALTER TABLE {table_name} EXCHANGE PARTITION {partition} WITH TABLE {staging}")
+            self.cursor.execute(f"DROP TABLE {staging}")
+            self._emit('partition_exchanged', table=table_name, partition=partition, rows=len(month_rows),
+                       seconds=round(time.perf_counter() - started, 3))
+            self.logger.info(f"Exchanged {table_name} partition {partition}: {len(month_rows)} rows loaded "
+                             f"through {staging} in {time.perf_counter() - started:.2f}s")
+        return remaining, rejected
+
+    def _in_key_order(self, table_name: str, frame: pd.DataFrame) -> pd.DataFrame:
+        """Return ``frame`` in primary-key order when ``sort_by_key`` is on.
+
+        Workbook order sends the inserts to random InnoDB pages; in key order
+        the upserts append to the clustered index, with fewer page splits and
+        less redo. One stable argsort over the key column, before the rows are
+        built; rows of one key keep their order and missing keys go last.
+        Tables without a single-column key keep their order. Out-of-core
+        partitions come in ascending key ranges, so sorting each one orders
+        the whole table.
+        """
+        key_column = KEY_COLUMNS.get(table_name, 'id')
+        if not self.import_settings.get('sort_by_key') or key_column not in frame.columns or len(frame) < 2:
+            return frame
+        started = time.perf_counter()
+        keys = pd.to_numeric(frame[key_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        if np.all(keys[1:] >= keys[:-1]):
+            return frame
+        frame = frame.iloc[np.argsort(keys, kind='stable')]
+        self.logger.info(f"Sorted {len(frame)} {table_name} rows by {key_column} "
+                         f"in {time.perf_counter() - started:.2f}s")
+        return frame
+
+    def _transaction_strategy(self, table_name: str) -> str:
+        """Return the commit strategy of ``table_name``: its ``transaction_strategies`` entry or the default."""
+        strategy = (self.import_settings.get('transaction_strategies') or {}).get(
+            table_name, self.import_settings.get('transaction_strategy') or 'batch')
+        if strategy not in TRANSACTION_STRATEGIES:
+            raise ValueError(f"Unknown transaction strategy '{strategy}' for {table_name}, "
+                             f"expected one of {', '.join(TRANSACTION_STRATEGIES)}")
+        return strategy
+
+    def _count_transaction(self, table_name: Optional[str], **counts) -> None:
+        """Add to the transaction counters of a table being written; writers may run in several threads."""
+        progress = self.write_progress.get(table_name)
+        if progress is None:
+            return
+        with STATS_LOCK:
+            for counter, value in counts.items():
+                progress[counter] += value
+
+    def _write_rows_transaction(self, table_name: str, query: str, rows: List[Tuple],
+                                strategy: str) -> List[Tuple[Tuple, str]]:
+        """Write the rows in one transaction over the main connection and commit once.
+
+        With 'table' the table is atomic: a failing row rolls back every row
+        of the table and the error is raised, so the import method fails and
+        none of the table is written. With 'savepoint' a savepoint is set
+        every ``savepoint_rows`` rows; a failing batch rolls back to the
+        savepoint of its chunk and only that chunk is bisected, so bad rows
+        are rejected without redoing the rest of the transaction. A deadlock
+        or lost connection ends the whole transaction either way; the table
+        is then replayed from its first row, up to ``max_retries`` times.
+
+        One commit saves the log flush of every batch but holds undo and
+        locks until the end, and a lost connection costs the whole table.
+        Async and sharded writers do not apply. Returns the rejected rows.
+        """
+        batch_size = self.import_settings['batch_size']
+        chunk_rows = batch_size
+        if strategy == 'savepoint':
+            chunk_rows = max(batch_size, self.import_settings.get('savepoint_rows', 50000))
+        total_chunks = (len(rows) - 1) // chunk_rows + 1
+        progress = self.write_progress[table_name]
+        progress['batches'] = progress['batches_done'] + total_chunks
+        before = {field: progress[field] for field in ('rows_done', 'rejected', 'batches_done')}
+        max_retries = self.import_settings.get('max_retries', 3)
+        attempt = 0
+        while True:
+            conn = self.connection
+            rejected = []
+            written = 0
+            try:
+                for index, start in enumerate(range(0, len(rows), chunk_rows)):
+                    started = time.perf_counter()
+                    chunk = rows[start:start + chunk_rows]
+                    if strategy == 'savepoint':
+                        chunk_rejected = self._write_savepoint(table_name, conn, query, chunk, f'import_{index}')
+                    else:
+                        self._execute_batch(conn, query, chunk)
+                        chunk_rejected = []
+                    written += len(chunk)
+                    rejected.extend(chunk_rejected)
+                    self._batch_committed(table_name, index, total_chunks, len(chunk), len(chunk_rejected), started)
+                started = time.perf_counter()
+                conn.commit()
+                self._count_transaction(table_name, commits=1, commit_seconds=time.perf_counter() - started)
+                return rejected
+            except mysql.connector.Error as error:
+                self._rollback_quietly(conn)
+                self._count_transaction(table_name, rollbacks=1, rolled_back_rows=written)
+                if not (self._is_transient_error(error) and attempt < max_retries):
+                    self.logger.error(f"Rolled back the {table_name} transaction after {written} rows: {error}")
+                    raise
+                attempt += 1
+                conn = self._before_replay(conn, error, attempt, table_name, len(rows), 'table')
+                if conn is not self.connection:
+                    self.connection, self.cursor = conn, conn.cursor()
+                with STATS_LOCK:
+                    progress.update(before)
+
+    def _write_savepoint(self, table_name: str, conn, query: str, rows: List[Tuple],
+                         name: str) -> List[Tuple[Tuple, str]]:
+        """Write rows in batches after SAVEPOINT ``name``, rolling back to it when a batch fails.
+
+        A lock wait timeout undoes only the statement, so the rows are
+        replayed from the savepoint; a batch that fails on its data is
+        bisected under nested savepoints. The savepoint is released once its
+        rows are written or rejected, so the server does not keep every one
+        until the commit. Errors that end the transaction propagate to
+        ``_write_rows_transaction``. Returns the rejected rows.
+        """
+        batch_size = self.import_settings['batch_size']
+        max_retries = self.import_settings.get('max_retries', 3)
+        self._execute_statement(conn, f"SAVEPOINT {name}")
+        self._count_transaction(table_name, savepoints=1)
+        attempt = 0
+        while True:
+            sent = 0
+            try:
+                for i in range(0, len(rows), batch_size):
+                    sent = min(len(rows), i + batch_size)
+                    self._execute_batch(conn, query, rows[i:i + batch_size])
+                rejected = []
+                break
+            except mysql.connector.Error as error:
+                if error.errno in TRANSACTION_LOST_ERRORS:
+                    raise
+                self._execute_statement(conn, f"ROLLBACK TO SAVEPOINT {name}")
+                self._count_transaction(table_name, rollbacks=1, rolled_back_rows=sent)
+                if error.errno in LOCK_ERRORS and attempt < max_retries:
+                    attempt += 1
+                    self._before_replay(conn, error, attempt, table_name, len(rows), 'savepoint')
+                    continue
+                if not self._is_row_error(error):
+                    raise
+                if len(rows) == 1:
+                    rejected = [(rows[0], str(error))]
+                    break
+
+                self.logger.warning(f"Savepoint {name} of {len(rows)} rows failed ({error}), bisecting")
+                self._emit('bisect', table=table_name, rows=len(rows), error=str(error))
+                middle = len(rows) // 2
+                rejected = []
+                for suffix, half in (('a', rows[:middle]), ('b', rows[middle:])):
+                    rejected.extend(self._write_savepoint(table_name, conn, query, half, name + suffix))
+                break
+        self._execute_statement(conn, f"RELEASE SAVEPOINT {name}")
+        return rejected
+
+    async def _write_rows_async(self, table_name: str, query: str,
+                                rows: List[Tuple]) -> List[Tuple[Tuple, str]]:
+        """Write batches concurrently over ``async_writers`` connections.
+
+        Statements run in worker threads. When no key repeats across batches,
+        every batch commits as soon as its statements succeed, in any order:
+        no batch holds locks while waiting on another outside the server's
+        view, so a lock conflict is resolved by InnoDB (a wait or a deadlock
+        that is retried) instead of running into the lock wait timeout. When
+        keys repeat, the last write must win as in the sequential loop, so a
+        batch only starts once its predecessor has committed. Once a batch
+        fails, batches not yet started are skipped. A batch that hits a
+        transient or data error is retried on its own connection. Returns the
+        rejected rows.
+        """
+        batch_size = self.import_settings['batch_size']
+        batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+        workers = min(self.async_writers, len(batches))
+        ordered = not self._keys_unique(table_name, query, rows)
+        self.logger.info(f"Writing {len(batches)} batches to {table_name} with {workers} async writers"
+                         + (" in batch order (keys repeat across batches)" if ordered else ""))
+
+        connections = await asyncio.gather(*(
+            asyncio.to_thread(self._new_connection) for _ in range(workers)
+        ))
+        idle = asyncio.Queue()
+        for conn in connections:
+            idle.put_nowait(conn)
+        semaphore = asyncio.Semaphore(workers)
+        committed = [asyncio.Event() for _ in batches]
+        first_failed = len(batches)
+        rejected = []
+
+        async def write_batch(index: int, batch: Sequence[Tuple]) -> None:
+            nonlocal first_failed
+            async with semaphore:
+                conn = idle.get_nowait()
+                started = time.perf_counter()
+                batch_rejected = []
+                try:
+                    if ordered and index > 0:
+                        await committed[index - 1].wait()
+                    if first_failed < index:
+                        return
+                    try:
+                        await asyncio.to_thread(self._execute_batch, conn, query, batch)
+                        error = None
+                    except mysql.connector.Error as e:
+                        if not (self._is_transient_error(e) or self._is_row_error(e)):
+                            raise
+                        error = e
+                    if error is None:
+                        try:
+                            await asyncio.to_thread(conn.commit)
+                        except mysql.connector.Error as e:
+                            if not (self._is_transient_error(e) or self._is_row_error(e)):
+                                raise
+                            error = e
+                    if error is not None:
+                        conn, batch_rejected = await asyncio.to_thread(
+                            self._write_batch_with_retry, conn, query, batch, error
+                        )
+                        rejected.extend(batch_rejected)
+                    self._batch_committed(table_name, index, len(batches), len(batch), len(batch_rejected), started)
+                except Exception:
+                    first_failed = min(first_failed, index)
+                    await asyncio.to_thread(self._rollback_quietly, conn)
+                    raise
+                finally:
+                    committed[index].set()
+                    idle.put_nowait(conn)
+
+        try:
+            results = await asyncio.gather(
+                *(write_batch(index, batch) for index, batch in enumerate(batches)),
+                return_exceptions=True
+            )
+        finally:
+            while not idle.empty():
+                self._close_quietly(idle.get_nowait())
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return rejected
+
+    @staticmethod
+    def _keys_unique(table_name: str, query: str, rows: List[Tuple]) -> bool:
+        """Whether every row of ``rows`` has its own key (KEY_COLUMNS, default ``id``)."""
+        key_column = KEY_COLUMNS.get(table_name, 'id')
+        columns = [col.strip() for col in INSERT_COLUMNS_PATTERN.search(query).group(1).split(',')]
+        if key_column not in columns:
+            return False
+        index = columns.index(key_column)
+        return len({row[index] for row in rows}) == len(rows)
+
+    def _write_rows_sharded(self, table_name: str, query: str, rows: List[Tuple],
+                            shard_column: str) -> List[Tuple[Tuple, str]]:
+        """Write disjoint shards of rows in parallel, one connection per shard.
+
+        ``shard_mode`` 'range' sorts by primary key (the first column) and cuts
+        contiguous key ranges; 'hash' groups rows by ``shard_column`` so every
+        parent's rows land in one shard. Either way the shards touch mostly
+        disjoint index pages, and a batch that hits a lock conflict is replayed
+        by its own worker. Shards commit independently, so a failing shard
+        does not undo the others. Returns the rejected rows.
+        """
+        columns = [col.strip() for col in INSERT_COLUMNS_PATTERN.search(query).group(1).split(',')]
+        workers = self.shard_writers
+        if self.import_settings.get('shard_mode', 'range') == 'hash':
+            key_index = columns.index(shard_column)
+            shards = [[] for _ in range(workers)]
+            for row in rows:
+                shards[hash(row[key_index]) % workers].append(row)
+        else:
+            ordered = sorted(rows, key=lambda row: row[0])
+            shard_size = (len(ordered) - 1) // workers + 1
+            shards = [ordered[i:i + shard_size] for i in range(0, len(ordered), shard_size)]
+        shards = [shard for shard in shards if shard]
+        batch_size = self.import_settings['batch_size']
+        progress = self.write_progress[table_name]
+        progress['batches'] = progress['batches_done'] + sum((len(shard) - 1) // batch_size + 1 for shard in shards)
+        self.logger.info(
+            f"Writing {len(rows)} rows to {table_name} in {len(shards)} shards "
+            f"({self.import_settings.get('shard_mode', 'range')} on {shard_column})"
+        )
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [
+                pool.submit(self._write_shard, table_name, index, query, shard)
+                for index, shard in enumerate(shards)
+            ]
+            rejected = []
+            errors = []
+            for future in futures:
+                try:
+                    rejected.extend(future.result())
+                except Exception as e:
+                    errors.append(e)
+
+        if errors:
+            raise errors[0]
+        return rejected
+
+    def _write_shard(self, table_name: str, shard_index: int, query: str,
+                     rows: List[Tuple]) -> List[Tuple[Tuple, str]]:
+        """Write one shard in batches over its own connection. Runs in a worker thread."""
+        batch_size = self.import_settings['batch_size']
+        total_batches = (len(rows) - 1) // batch_size + 1
+        rejected = []
+        conn = self._new_connection()
+        try:
+            for i in range(0, len(rows), batch_size):
+                started = time.perf_counter()
+                batch = rows[i:i + batch_size]
+                conn, batch_rejected = self._write_batch_with_retry(conn, query, batch)
+                rejected.extend(batch_rejected)
+                self._batch_committed(table_name, i // batch_size, total_batches, len(batch), len(batch_rejected),
+                                      started, shard=shard_index)
+        finally:
+            self._close_quietly(conn)
+        return rejected
+
+    def analyze_changed_tables(self) -> None:
+        """Refresh optimizer statistics on every table this run wrote to.
+
+        After a large load InnoDB's persistent statistics lag behind until
+        the background recalculation catches up, and the report queries pick
+        poor plans meanwhile. ANALYZE TABLE brings them up to date at once.
+        With ``update_histograms`` the ``histogram_columns`` a table has also
+        get histograms (MySQL 8.0+). Timings are recorded per table.
+        """
+        update_histograms = self.import_settings.get('update_histograms', False)
+        histogram_columns = self.import_settings.get('histogram_columns', HISTOGRAM_COLUMNS)
+        buckets = self.import_settings.get('histogram_buckets', 100)
+
+        for table_name in sorted(self.changed_tables):
+            started = time.perf_counter()
+            try:
+                self.cursor.execute(f"ANALYZE TABLE {table_name}")
+                self.cursor.fetchall()
+                columns = self._existing_columns(table_name, histogram_columns) if update_histograms else []
+                if columns:
+                    self.cursor.execute(
+                        f"ANALYZE TABLE {table_name} UPDATE HISTOGRAM ON {', '.join(columns)} WITH {buckets} BUCKETS"
+                    )
+                    self.cursor.fetchall()
+            except mysql.connector.Error as e:
+                self.logger.warning(f"Could not refresh statistics for {table_name}: {e}")
+                continue
+            self.stats['analyze_seconds'][table_name] = round(time.perf_counter() - started, 3)
+            histogram_note = f" (histograms on {', '.join(columns)})" if columns else ""
+            self.logger.info(f"Analyzed {table_name}{histogram_note} in {self.stats['analyze_seconds'][table_name]}s")
+
+    def _existing_columns(self, table_name: str, columns: List[str]) -> List[str]:
+        """Return those of ``columns`` that exist in ``table_name``."""
+        if self.schema_cache is not None:
+            existing = self.schema_cache.columns(self.cursor, table_name)
+            return [col for col in columns if col in existing]
+        placeholders = ', '.join(['%s'] * len(columns))
+        self.cursor.execute(
+            f"""
+            SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME IN ({placeholders})
+            """,
+            (self.config['database'], table_name, *columns)
+        )
+        existing = {row[0] for row in self.cursor.fetchall()}
+        return [col for col in columns if col in existing]
+
+    def _write_batch_with_retry(self, conn, query: str, batch: Sequence[Tuple],
+                                error: Optional[Exception] = None) -> Tuple[object, List[Tuple[Tuple, str]]]:
+        """Commit one batch, surviving transient errors and isolating bad rows.
+
+        ``error`` is the failure of an attempt the caller already made. Returns
+        the connection to keep using (a new one after a reconnect) and the
+        rejected rows.
+        """
+        max_retries = self.import_settings.get('max_retries', 3)
+        attempt = 0
+        while True:
+            if error is None:
+                try:
+                    self._execute_batch(conn, query, batch)
+                    started = time.perf_counter()
+                    conn.commit()
+                    self._count_transaction(self._query_table(query), commits=1,
+                                            commit_seconds=time.perf_counter() - started)
+                    return conn, []
+                except mysql.connector.Error as e:
+                    error = e
+            self._rollback_quietly(conn)
+            self._count_transaction(self._query_table(query), rollbacks=1, rolled_back_rows=len(batch))
+
+            if self._is_transient_error(error) and attempt < max_retries:
+                attempt += 1
+                conn = self._before_replay(conn, error, attempt, self._query_table(query), len(batch))
+                error = None
+                continue
+
+            if not self._is_row_error(error):
+                raise error
+            if len(batch) == 1:
+                return conn, [(batch[0], str(error))]
+
+            self.logger.warning(f"Batch of {len(batch)} rows failed ({error}), bisecting")
+            self._emit('bisect', table=self._query_table(query), rows=len(batch), error=str(error))
+            rejected = []
+            middle = len(batch) // 2
+            for half in (batch[:middle], batch[middle:]):
+                conn, half_rejected = self._write_batch_with_retry(conn, query, half)
+                rejected.extend(half_rejected)
+            return conn, rejected
+
+    def _before_replay(self, conn, error: mysql.connector.Error, attempt: int, table_name: Optional[str],
+                       rows: int, what: str = 'batch'):
+        """Count and announce the replay after a transient error, then back off or reconnect.
+
+        Returns the connection to replay on.
+        """
+        max_retries = self.import_settings.get('max_retries', 3)
+        kind = 'lock' if error.errno in LOCK_ERRORS else 'reconnect'
+        self._emit('retry', table=table_name, kind=kind, attempt=attempt, rows=rows, error=str(error))
+        if kind == 'lock':
+            self._count_stat('lock_retries')
+            self.logger.warning(f"Lock conflict ({error}), replaying {what} (attempt {attempt + 1}/{max_retries + 1})")
+            time.sleep(0.1 * 2 ** attempt)
+            return conn
+        self._count_stat('reconnects')
+        self.logger.warning(f"Connection lost ({error}), reconnecting to replay {what} (attempt {attempt + 1}/{max_retries + 1})")
+        return self._reconnect(conn)
+
+    def _reconnect(self, conn):
+        """Replace a dead connection, backing off between attempts."""
+        self._close_quietly(conn)
+        max_retries = self.import_settings.get('max_retries', 3)
+        for attempt in range(max_retries):
+            try:
+                return self._new_connection()
+            except mysql.connector.Error as e:
+                if attempt == max_retries - 1:
+                    raise
+                self.logger.warning(f"Reconnect attempt {attempt + 1} failed: {e}")
+                time.sleep(2 ** attempt)
+
+    @staticmethod
+    def _query_table(query: str) -> Optional[str]:
+        match = INSERT_TABLE_PATTERN.search(query)
+        return match.group(1) if match else None
+
+    def _count_stat(self, key: str) -> None:
+        """Increment a stats counter; writers may run in several threads."""
+        with STATS_LOCK:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _is_transient_error(error: mysql.connector.Error) -> bool:
+        """Errors after which the same batch can simply be replayed."""
+        return error.errno in LOCK_ERRORS or error.errno in LOST_CONNECTION_ERRORS
+
+    @staticmethod
+    def _is_row_error(error: mysql.connector.Error) -> bool:
+        """Tell errors caused by the rows themselves from connection or SQL errors."""
+        # Lock conflicts and client-side (2xxx) errors say nothing about the rows
+        if error.errno in LOCK_ERRORS or (error.errno or 0) >= 2000:
+            return False
+        if isinstance(error, (mysql.connector.errors.DataError, mysql.connector.errors.IntegrityError)):
+            return True
+        # Errors such as 1366 (incorrect integer value) carry SQLSTATE HY000
+        # and surface as the generic DatabaseError.
+        return type(error) is mysql.connector.errors.DatabaseError
+
+    @staticmethod
+    def _rollback_quietly(conn) -> None:
+        """Roll back, ignoring errors from a connection that is already gone."""
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            pass
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        """Close a connection, ignoring errors from one that is already gone."""
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _write_rejects(self, table_name: str, query: str, rejected: List[Tuple[Tuple, str]]) -> str:
+        """Write rejected rows with their error messages and return the file path."""
+        columns = [col.strip() for col in INSERT_COLUMNS_PATTERN.search(query).group(1).split(',')]
+        df = pd.DataFrame([row for row, _ in rejected], columns=columns)
+        df['error'] = [message for _, message in rejected]
+
+        reject_folder = self.import_settings.get('reject_folder', 'rejects')
+        os.makedirs(reject_folder, exist_ok=True)
+        reject_file = os.path.join(
+            reject_folder, f'{table_name}_rejects_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        )
+        if self.import_settings.get('reject_format', 'csv') == 'parquet':
+            try:
+                reject_file += '.parquet'
+                text_columns = {col: 'string' for col in df.columns if df[col].dtype == object}
+                df.astype(text_columns).to_parquet(reject_file, index=False)
+            except ImportError:
+                self.logger.warning("Parquet support not installed (pyarrow), writing rejects as CSV")
+                reject_file = reject_file[:-len('.parquet')] + '.csv'
+                df.to_csv(reject_file, index=False, encoding='utf-8-sig')
+        else:
+            reject_file += '.csv'
+            df.to_csv(reject_file, index=False, encoding='utf-8-sig')
+
+        self.stats['rejected_rows'] += len(rejected)
+        self.logger.warning(f"Rejected {len(rejected)} rows from {table_name}, see {reject_file}")
+        self._emit('rejects', table=table_name, rows=len(rejected), file=reject_file)
+        return reject_file
+
+    @staticmethod
+    def _execute_statement(conn, statement: str) -> None:
+        """Run one statement without parameters on ``conn``, such as SAVEPOINT."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _execute_batch(conn, query: str, batch: Sequence[Tuple]) -> None:
+        """Run one batch on a dedicated connection without committing."""
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(query, batch)
+        finally:
+            cursor.close()
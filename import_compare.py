@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Import Throughput Gate
+This script compares the import_stats_*.json files of a run against those of a
+baseline run and fails when a table got slower, so importer regressions are
+caught before they reach a production load window.
+Features:
+- Per-table rows/s (whole task: read, map and write) and p95 batch latency
+- Stats files given one by one, or a folder reduced to the latest file per importer
+- Separate thresholds for throughput and latency; small tables and
+  sub-millisecond latency shifts are reported but never gate, they are noise
+- Diff report as text and JSON, exit code 1 on regression
+Standard library only, so it runs anywhere the stats files are.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Stats files every importer writes, e.g. import_stats_*, call_import_stats_*
+STATS_PATTERN = '*import_stats_*.json'
+
+# Exit codes: no regression, regression, nothing comparable
+EXIT_OK, EXIT_REGRESSION, EXIT_NO_DATA = 0, 1, 2
+
+
+def stats_files(paths: List[str]) -> List[str]:
+    """Expand folders into their latest stats file per importer."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        latest = {}
+        # Names end in a sortable timestamp; the prefix identifies the importer
+        for file_path in sorted(glob.glob(os.path.join(path, STATS_PATTERN))):
+            latest[os.path.basename(file_path).split('import_stats_')[0]] = file_path
+        files.extend(latest.values())
+    return files
+
+
+def load_tables(paths: List[str]) -> Dict[str, Dict]:
+    """Return the per-table stats of the given runs keyed '<importer>.<table>'.
+
+    Stats files written before per-table timings were recorded are skipped.
+    """
+    tables = {}
+    for file_path in stats_files(paths):
+        with open(file_path, encoding='utf-8') as f:
+            stats = json.load(f)
+        if 'tables' not in stats:
+            print(f"Warning: {file_path} has no per-table timings, skipped")
+            continue
+        importer = stats.get('importer') or os.path.basename(file_path).split('import_stats_')[0] or 'import'
+        for table_name, table_stats in stats['tables'].items():
+            tables[f'{importer}.{table_name}'] = dict(table_stats, file=file_path)
+    return tables
+
+
+def _change(baseline: Optional[float], current: Optional[float]) -> Optional[float]:
+    if not baseline or current is None:
+        return None
+    return round((current - baseline) / baseline, 4)
+
+
+def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], threshold: float = 0.1,
+            latency_threshold: float = 0.2, min_rows: int = 1000, min_latency_ms: float = 5.0) -> Dict:
+    """Compare per-table throughput and p95 batch latency of two runs.
+
+    A table regresses when its rows/s drops by more than ``threshold`` or its
+    p95 batch latency grows by more than ``latency_threshold`` (fractions)
+    and by at least ``min_latency_ms``.
+    Tables below ``min_rows`` in either run, or failed in either run, only
+    show in the report.
+    """
+    results = []
+    for key in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(key), current.get(key)
+        result = {'table': key}
+        if before is None or after is None:
+            result['status'] = 'new' if before is None else 'missing'
+            results.append(result)
+            continue
+
+        result.update({
+            'rows': [before['rows'], after['rows']],
+            'rows_per_second': [before.get('rows_per_second'), after.get('rows_per_second')],
+            'p95_batch_ms': [before.get('p95_batch_ms'), after.get('p95_batch_ms')],
+            'throughput_change': _change(before.get('rows_per_second'), after.get('rows_per_second')),
+            'latency_change': _change(before.get('p95_batch_ms'), after.get('p95_batch_ms')),
+        })
+        if not (before.get('success', True) and after.get('success', True)):
+            result['status'] = 'failed'
+        elif min(before['rows'], after['rows']) < min_rows:
+            result['status'] = 'too_small'
+        else:
+            reasons = []
+            if result['throughput_change'] is not None and result['throughput_change'] < -threshold:
+                reasons.append(f"throughput {result['throughput_change']:+.1%}")
+            if (result['latency_change'] is not None and result['latency_change'] > latency_threshold
+                    and after['p95_batch_ms'] - before['p95_batch_ms'] >= min_latency_ms):
+                reasons.append(f"p95 batch latency {result['latency_change']:+.1%}")
+            result['status'] = 'regression' if reasons else 'ok'
+            if reasons:
+                result['reasons'] = reasons
+        results.append(result)
+
+    compared = [result for result in results if result['status'] in ('ok', 'regression')]
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'threshold': threshold,
+        'latency_threshold': latency_threshold,
+        'min_rows': min_rows,
+        'min_latency_ms': min_latency_ms,
+        'compared': len(compared),
+        'regressions': sum(result['status'] == 'regression' for result in results),
+        'tables': results,
+    }
+
+
+def print_report(report: Dict):
+    """Print one line per table with the baseline -> current figures."""
+    for result in report['tables']:
+        status = result['status'].upper()
+        if 'rows_per_second' not in result:
+            print(f"[{status}] {result['table']}")
+            continue
+        (rate_before, rate_after), (p95_before, p95_after) = result['rows_per_second'], result['p95_batch_ms']
+        change = f" ({result['throughput_change']:+.1%})" if result['throughput_change'] is not None else ''
+        print(f"[{status}] {result['table']}: {rate_before} -> {rate_after} rows/s{change}, "
+              f"p95 batch {p95_before} -> {p95_after} ms")
+        for reason in result.get('reasons', []):
+            print(f"    regression: {reason}")
+    print(f"{report['regressions']} regressions in {report['compared']} compared tables")
+
+
+def run_gate(args) -> int:
+    """Compare, print and save the report; return the exit code."""
+    report = compare(load_tables(args.baseline), load_tables(args.current), args.threshold,
+                     args.latency_threshold, args.min_rows, args.min_latency_ms)
+    print_report(report)
+
+    report_file = args.report or f'compare_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Comparison report saved to: {report_file}")
+
+    if not report['compared']:
+        return EXIT_NO_DATA
+    return EXIT_REGRESSION if report['regressions'] else EXIT_OK
+
+
+def main():
+    """Main function to compare an import run with a baseline."""
+    parser = argparse.ArgumentParser(description="Fail when import throughput regressed against a baseline run")
+    parser.add_argument('--baseline', nargs='+', required=True,
+                        help="Baseline stats files, or folders (latest stats file per importer)")
+    parser.add_argument('--current', nargs='+', default=['.'],
+                        help="Stats files or folders of the run to check (default: latest in the current folder)")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Largest tolerated rows/s drop, as a fraction (default: 0.1)")
+    parser.add_argument('--latency-threshold', type=float, default=0.2,
+                        help="Largest tolerated p95 batch latency increase, as a fraction (default: 0.2)")
+    parser.add_argument('--min-rows', type=int, default=1000, help="Smaller tables are reported but never gate")
+    parser.add_argument('--min-latency-ms', type=float, default=5.0,
+                           help="Smallest p95 batch latency increase that can gate, in ms (default: 5)")
+    parser.add_argument('--report', default=None, help="Path of the JSON report")
+    args = parser.parse_args()
+    sys.exit(run_gate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Import Dry Run
+This script runs the full parse, mapping and coercion of every import script
+without connecting to the database, and reports everything that would fail.
+Features:
+- Parallel parsing across workbooks (one worker process per file)
+- Vectorized duplicate, null, length and date checks against schema_snapshot.json
+- Cross-file foreign key consistency
+- Machine-readable JSON report
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from import_common import (FOREIGN_KEYS, IMPORTERS, KEY_COLUMNS, PRE_VALIDATION_STEPS, TARGET_TABLES,
+                           DatetimeParseError, importer_class, load_schema_snapshot)
+
+DATE_TYPES = ('datetime', 'date', 'timestamp')
+SAMPLE_SIZE = 5
+
+
+def _sample(values: pd.Series) -> List:
+    """Return a short JSON-safe sample of offending values."""
+    return [v.item() if hasattr(v, 'item') else str(v) for v in values.head(SAMPLE_SIZE)]
+
+
+def _id_values(series: pd.Series) -> np.ndarray:
+    """Return the distinct non-null integer ids of a column."""
+    values = pd.to_numeric(series, errors='coerce').dropna()
+    return np.unique(values.to_numpy(dtype='int64'))
+
+
+def check_frame(df: pd.DataFrame, table_schema: Dict, key_column: Optional[str]) -> Dict:
+    """Run the vectorized checks on a mapped frame and return their findings."""
+    checks = {}
+
+    if key_column and key_column in df.columns:
+        duplicated = df[key_column].duplicated()
+        if duplicated.any():
+            checks['duplicate_keys'] = {
+                'column': key_column,
+                'count': int(duplicated.sum()),
+                'sample': _sample(df.loc[duplicated, key_column]),
+            }
+
+    columns = [col for col in table_schema if col in df.columns]
+
+    nulls = {}
+    for col in columns:
+        if not table_schema[col]['nullable']:
+            count = int(df[col].isna().sum())
+            if count:
+                nulls[col] = count
+    if nulls:
+        checks['nulls'] = nulls
+
+    overflow = {}
+    for col in columns:
+        max_length = table_schema[col].get('max_length')
+        if max_length is None:
+            continue
+        values = df[col]
+        too_long = values.notna() & (values.astype(str).str.len() > max_length)
+        if too_long.any():
+            overflow[col] = {
+                'max_length': max_length,
+                'count': int(too_long.sum()),
+                'sample': _sample(values[too_long].astype(str)),
+            }
+    if overflow:
+        checks['length_overflow'] = overflow
+
+    date_failures = {}
+    for col in columns:
+        if table_schema[col]['type'] not in DATE_TYPES or pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        values = df[col]
+        parsed = pd.to_datetime(values, errors='coerce')
+        failed = values.notna() & parsed.isna()
+        if failed.any():
+            date_failures[col] = {
+                'count': int(failed.sum()),
+                'sample': _sample(values[failed].astype(str)),
+            }
+    if date_failures:
+        checks['date_parse_failures'] = date_failures
+
+    return checks
+
+
+def check_workbook(importer_key: str, task_name: str, method_name: str, file_path: str,
+                   schema: Dict) -> Dict:
+    """Parse, map and check one workbook. Runs in a worker process."""
+    importer = importer_class(importer_key)(dry_run=True)
+
+    name = method_name[len('import_'):]
+    table = TARGET_TABLES.get(task_name, task_name)
+    key_column = KEY_COLUMNS.get(table, 'id')
+    result = {
+        'importer': importer_key,
+        'task': task_name,
+        'table': table,
+        'file': file_path,
+        'errors': [],
+        'checks': {},
+    }
+    started = time.perf_counter()
+
+    try:
+        df = pd.read_excel(file_path)
+        result['source_rows'] = len(df)
+
+        pre_step = PRE_VALIDATION_STEPS.get(method_name)
+        if pre_step:
+            df = getattr(importer, pre_step)(df)
+
+        is_valid, errors = importer.validate_data(df, name)
+        result['errors'].extend(errors)
+        if is_valid:
+            df_mapped = getattr(importer, f'prepare_{name}')(df)
+            result['mapped_rows'] = len(df_mapped)
+            result['checks'] = check_frame(df_mapped, schema.get(table, {}), key_column)
+            if key_column and key_column in df_mapped.columns:
+                result['keys'] = _id_values(df_mapped[key_column])
+            result['references'] = {
+                column: _id_values(df_mapped[column])
+                for child, column, _ in FOREIGN_KEYS
+                if child == table and column in df_mapped.columns
+            }
+    except DatetimeParseError as e:
+        result['checks'] = {'date_parse_failures': e.failures}
+        result['errors'].append(f"{type(e).__name__}: {e}")
+    except Exception as e:
+        result['errors'].append(f"{type(e).__name__}: {e}")
+
+    result['would_import'] = not result['errors']
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def check_foreign_keys(results: List[Dict]) -> List[Dict]:
+    """Check every reference column against the ids of the parsed parent workbooks."""
+    parent_keys = {}
+    for result in results:
+        if 'keys' in result:
+            parent_keys.setdefault(result['table'], []).append(result['keys'])
+
+    findings = []
+    for result in results:
+        for column, values in result.get('references', {}).items():
+            for child, fk_column, parent in FOREIGN_KEYS:
+                if child != result['table'] or fk_column != column:
+                    continue
+                finding = {'table': child, 'column': column, 'parent': parent, 'file': result['file']}
+                if parent not in parent_keys:
+                    finding['status'] = 'skipped'
+                else:
+                    known = np.concatenate(parent_keys[parent])
+                    missing = np.setdiff1d(values[values != 0], known, assume_unique=True)
+                    finding['status'] = 'missing' if missing.size else 'ok'
+                    finding['missing_count'] = int(missing.size)
+                    finding['sample'] = missing[:SAMPLE_SIZE].tolist()
+                findings.append(finding)
+    return findings
+
+
+def run_dry_run(folders: Dict[str, str], workers: Optional[int] = None) -> Dict:
+    """Dry-run the given importers, keyed like IMPORTERS, against their data folders."""
+    started = time.perf_counter()
+    schema = load_schema_snapshot()
+
+    jobs = []
+    missing_files = []
+    for importer_key, data_folder in folders.items():
+        for task_name, excel_file, method_name in importer_class(importer_key).IMPORT_TASKS:
+            file_path = os.path.join(data_folder, excel_file)
+            if os.path.exists(file_path):
+                jobs.append((importer_key, task_name, method_name, file_path, schema))
+            else:
+                missing_files.append(file_path)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(check_workbook, *job) for job in jobs]
+        results = [future.result() for future in futures]
+
+    foreign_keys = check_foreign_keys(results)
+    for result in results:
+        result.pop('keys', None)
+        result.pop('references', None)
+
+    ok = (
+        all(result['would_import'] and not result['checks'] for result in results)
+        and all(finding['status'] != 'missing' for finding in foreign_keys)
+    )
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'duration_seconds': round(time.perf_counter() - started, 3),
+        'ok': ok,
+        'files': results,
+        'missing_files': missing_files,
+        'foreign_keys': foreign_keys,
+    }
+
+
+def save_report(report: Dict, report_file: Optional[str] = None) -> str:
+    """Write the dry-run report as JSON and return its path."""
+    report_file = report_file or f'dry_run_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report_file
+
+
+def print_report(report: Dict):
+    """Print a one-line status per workbook and foreign key problem."""
+    for result in report['files']:
+        status = 'OK' if result['would_import'] and not result['checks'] else 'FAILED'
+        print(f"[{status}] {result['task']}: {result['file']} ({result.get('source_rows', 0)} rows, {result['seconds']}s)")
+        for error in result['errors']:
+            print(f"    error: {error}")
+        for check, finding in result['checks'].items():
+            print(f"    {check}: {json.dumps(finding, ensure_ascii=False)}")
+    for finding in report['foreign_keys']:
+        if finding['status'] == 'missing':
+            print(f"[FAILED] {finding['table']}.{finding['column']} -> {finding['parent']}: "
+                  f"{finding['missing_count']} unknown ids, e.g. {finding['sample']}")
+    for file_path in report['missing_files']:
+        print(f"[SKIPPED] Excel file not found: {file_path}")
+
+
+def main():
+    """Main function to dry-run all import scripts."""
+    parser = argparse.ArgumentParser(description="Validate all JanssenCRM import workbooks without a database")
+    parser.add_argument('--data-root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'),
+                        help="Folder containing the per-importer data folders")
+    parser.add_argument('--importers', nargs='+', choices=sorted(IMPORTERS), default=list(IMPORTERS),
+                        help="Importers to check (default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--report', default=None, help="Path of the JSON report")
+    args = parser.parse_args()
+
+    folders = {key: os.path.join(args.data_root, IMPORTERS[key][2]) for key in args.importers}
+    report = run_dry_run(folders, args.workers)
+    print_report(report)
+    print(f"Dry-run report saved to: {save_report(report, args.report)}")
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
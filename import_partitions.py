@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Call Table Partitioning
+customercall and ticketcall only grow, and the call reports filter them by
+created_at. This script converts them to monthly RANGE partitions on
+created_at and keeps partitions ready for the months ahead; the importers
+then load past months through EXCHANGE PARTITION (partition_exchange).
+Features:
+- status: partitions of each table with their row estimates
+- convert: primary key (id, created_at) and one partition per month from the
+  oldest row to the months ahead, plus a catch-all pfuture partition
+- extend: split the months ahead out of pfuture (cheap while pfuture is empty;
+  run it from cron)
+- Statements are printed and only run with --apply
+Partitioned tables cannot have foreign keys or unique keys without
+created_at: the primary key becomes (id, created_at), so an upsert of a known
+id with a different created_at adds a row instead of updating it.
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import mysql.connector
+from mysql.connector import Error
+
+from import_common import PARTITIONED_TABLES, importer_class
+
+FUTURE_PARTITION = 'pfuture'
+
+
+def to_days(value) -> int:
+    """MySQL TO_DAYS() of a date or datetime."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal() + 365
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_partition(month: date) -> str:
+    """Definition of the partition holding ``month``, e.g. p202401."""
+    return f"PARTITION p{month.strftime('%Y%m')} VALUES LESS THAN ({to_days(next_month(month))})"
+
+
+def month_partitions(first: date, last: date) -> List[str]:
+    """Partition definitions for every month from ``first`` to ``last``, inclusive."""
+    month, definitions = first.replace(day=1), []
+    while month <= last:
+        definitions.append(month_partition(month))
+        month = next_month(month)
+    return definitions
+
+
+def table_partitions(cursor, database: str, table_name: str) -> List[Tuple[str, Optional[int], int]]:
+    """(name, upper bound in TO_DAYS, estimated rows) of a table's RANGE partitions, in order.
+
+    The bound of the MAXVALUE partition is None; an unpartitioned table has none.
+    """
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND PARTITION_METHOD = 'RANGE'
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (database, table_name)
+    )
+    return [
+        (name, None if description == 'MAXVALUE' else int(description), rows or 0)
+        for name, description, rows in cursor.fetchall()
+    ]
+
+
+class PartitionManager:
+    def __init__(self, config: Dict = None, months_ahead: int = 3):
+        """Initialize the manager; ``months_ahead`` months after the current one get partitions."""
+        self.config = config or importer_class('call')(dry_run=True).config
+        self.months_ahead = months_ahead
+        self.connection = None
+        self.cursor = None
+
+    def connect(self):
+        """Open the database connection."""
+        self.connection = mysql.connector.connect(**self.config)
+        self.cursor = self.connection.cursor()
+
+    def disconnect(self):
+        """Close the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.connection:
+            self.connection.close()
+
+    def last_month(self) -> date:
+        month = date.today().replace(day=1)
+        for _ in range(self.months_ahead):
+            month = next_month(month)
+        return month
+
+    def convert_statements(self, table_name: str) -> List[str]:
+        """Statements partitioning an unpartitioned table by month of its date column."""
+        if table_partitions(self.cursor, self.config['database'], table_name):
+            raise ValueError(f"{table_name} is already partitioned")
+        column = PARTITIONED_TABLES[table_name]
+        self.cursor.execute(f"SELECT MIN({column}), SUM({column} IS NULL) FROM {table_name}")
+        oldest, missing = self.cursor.fetchone()
+        if missing:
+            raise ValueError(f"{table_name} has {int(missing)} rows without {column}; "
+                             f"set it before partitioning, it becomes part of the primary key")
+        definitions = month_partitions((oldest or datetime.now()).date(), self.last_month())
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        return [
+            f"ALTER TABLE {table_name} MODIFY {column} DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+            f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})",
+            f"ALTER TABLE {table_name} PARTITION BY RANGE (TO_DAYS({column})) (\n    "
+            + ',\n    '.join(definitions) + "\n)",
+        ]
+
+    def extend_statements(self, table_name: str) -> List[str]:
+        """Statements splitting the months up to ``months_ahead`` out of pfuture."""
+        partitions = table_partitions(self.cursor, self.config['database'], table_name)
+        if not partitions or partitions[-1][0] != FUTURE_PARTITION:
+            raise ValueError(f"{table_name} is not partitioned by month (no {FUTURE_PARTITION} partition)")
+        if partitions[-1][2]:
+            print(f"Warning: {table_name} {FUTURE_PARTITION} holds about {partitions[-1][2]} rows, "
+                  f"reorganizing it copies them")
+        last_bound = max((bound for _, bound, _ in partitions if bound is not None), default=None)
+        first = date.fromordinal(last_bound - 365) if last_bound else date.today().replace(day=1)
+        definitions = month_partitions(first, self.last_month())
+        if not definitions:
+            return []
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        return [f"ALTER TABLE {table_name} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n    "
+                + ',\n    '.join(definitions) + "\n)"]
+
+    def run(self, action: str, tables: List[str], apply: bool = False) -> bool:
+        """Print, and with ``apply`` run, the statements of ``action`` for each table."""
+        try:
+            self.connect()
+        except Error as e:
+            print(f"Error: could not connect to the database: {e}")
+            return False
+        ok = True
+        try:
+            for table_name in tables:
+                if action == 'status':
+                    partitions = table_partitions(self.cursor, self.config['database'], table_name)
+                    print(f"{table_name}: {len(partitions) or 'not'} partitions")
+                    for name, bound, rows in partitions:
+                        upper = date.fromordinal(bound - 365).isoformat() if bound else 'MAXVALUE'
+                        print(f"    {name}: before {upper}, ~{rows} rows")
+                    continue
+                try:
+                    statements = getattr(self, f'{action}_statements')(table_name)
+                except ValueError as e:
+                    print(f"[SKIPPED] {table_name}: {e}")
+                    ok = False
+                    continue
+                if not statements:
+                    print(f"[OK] {table_name}: partitions already reach {self.last_month().strftime('%Y-%m')}")
+                for statement in statements:
+                    print(f"{statement};")
+                    if apply:
+                        self.cursor.execute(statement)
+                if apply and statements:
+                    print(f"[APPLIED] {table_name}")
+        except Error as e:
+            print(f"Error: {e}")
+            ok = False
+        finally:
+            self.disconnect()
+        if not apply and action != 'status':
+            print("Dry run: nothing changed, re-run with --apply")
+        return ok
+
+
+def main():
+    """Main function to manage the monthly partitions of the call tables."""
+    parser = argparse.ArgumentParser(description="Monthly RANGE partitions for customercall and ticketcall")
+    parser.add_argument('action', choices=['status', 'convert', 'extend'])
+    parser.add_argument('--tables', nargs='+', choices=sorted(PARTITIONED_TABLES), default=sorted(PARTITIONED_TABLES))
+    parser.add_argument('--months-ahead', type=int, default=3,
+                        help="Months after the current one that get their own partition (default: 3)")
+    parser.add_argument('--apply', action='store_true', help="Run the statements instead of printing them only")
+    args = parser.parse_args()
+
+    manager = PartitionManager(months_ahead=args.months_ahead)
+    sys.exit(0 if manager.run(args.action, args.tables, args.apply) else 1)
+
+
+if __name__ == "__main__":
+    main()
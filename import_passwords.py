@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Initial passwords for imported users.
+The backend hashes passwords with the Dart bcrypt package
+(backend/lib/hash_password.dart: BCrypt.hashpw with BCrypt.gensalt(), i.e.
+``$2a$`` hashes at cost 10), so with ``hash_passwords`` on the users import
+generates a random password per user and stores its bcrypt hash with the same
+prefix and cost. It stays off until the backend login verifies bcrypt hashes.
+bcrypt is slow by design, so the hashes are computed across a process pool.
+The plaintext passwords leave the import only through the credential report,
+a CSV readable by its owner alone.
+"""
+
+import csv
+import os
+import re
+import secrets
+import string
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+# Hash format of BCrypt.gensalt() in the Dart bcrypt package
+BCRYPT_PREFIX = b'2a'
+BCRYPT_ROUNDS = 10
+
+PASSWORD_LENGTH = 16
+
+# No look-alikes (0/O, 1/l/I): the passwords are typed in from the report
+PASSWORD_ALPHABET = ''.join(c for c in string.ascii_letters + string.digits if c not in '0O1lI')
+
+# A stored bcrypt hash, whatever its prefix and cost
+BCRYPT_HASH_PATTERN = re.compile(r'^\$2[abxy]?\$\d{2}\$[./A-Za-z0-9]{53}$')
+
+# Passwords handed to a pool worker at a time, per worker
+CHUNKS_PER_WORKER = 4
+
+
+def _bcrypt():
+    try:
+        import bcrypt
+    except ImportError:
+        raise ImportError("Password hashing requires bcrypt (pip install bcrypt)")
+    return bcrypt
+
+
+def generate_password(length: int = PASSWORD_LENGTH) -> str:
+    """A random password of ``length`` characters from PASSWORD_ALPHABET."""
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+
+
+def is_password_hash(value) -> bool:
+    """Whether a stored password is a bcrypt hash rather than plaintext."""
+    return isinstance(value, str) and BCRYPT_HASH_PATTERN.match(value) is not None
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """bcrypt hash of ``password`` in the backend's format."""
+    bcrypt = _bcrypt()
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds, BCRYPT_PREFIX)).decode('ascii')
+
+
+def hash_passwords(passwords: List[str], rounds: int = BCRYPT_ROUNDS,
+                   workers: Optional[int] = None) -> List[str]:
+    """Hash ``passwords`` across ``workers`` processes (default: CPU count), keeping their order."""
+    _bcrypt()
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1:
+        return [hash_password(password, rounds) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords, [rounds] * len(passwords), chunksize=chunksize))
+
+
+def write_credential_report(folder: str, credentials: Iterable[Tuple]) -> str:
+    """Write (id, name, username, password) rows to a new CSV in ``folder`` and return its path.
+
+    The file is created with owner-only permissions and never overwrites an
+    existing report.
+    """
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    stem = os.path.join(folder, f'user_credentials_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
+    path, suffix = f'{stem}.csv', 0
+    while True:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            break
+        except FileExistsError:
+            suffix += 1
+            path = f'{stem}_{suffix}.csv'
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'username', 'password'])
+        writer.writerows(credentials)
+    return path
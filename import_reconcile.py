@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Import Reconciliation
+This script proves that the database matches the import workbooks without
+shipping rows over the network: both sides are reduced to per-key-range
+checksums and only mismatching ranges are drilled into.
+Features:
+- Per-row CRC32 over canonical column text, aggregated per primary key range
+- Source side computed column-wise in pandas, database side with BIT_XOR(CRC32(CONCAT_WS(...)))
+  plus SUM(CRC32(...)): CRC32 is linear, so identical changes to an even number of
+  rows in one range cancel out of the XOR alone
+- Recursive drill-down into mismatching ranges down to individual rows
+- Machine-readable JSON report
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+from import_common import IMPORTERS, KEY_COLUMNS, PRE_VALIDATION_STEPS, TARGET_TABLES, importer_class
+
+SEPARATOR = '|'
+NULL_TOKEN = '<null>'
+INTEGER_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint', 'year')
+FLOAT_TYPES = ('float', 'double', 'decimal')
+SAMPLE_SIZE = 20
+
+
+def canonical_sql(column: str, data_type: str) -> str:
+    """SQL expression rendering a column the way canonical_source renders it."""
+    if data_type in FLOAT_TYPES:
+        expr = f"CAST({column} + 0E0 AS CHAR)"
+    elif data_type in ('datetime', 'timestamp'):
+        expr = f"DATE_FORMAT({column}, '%Y-%m-%d %H:%i:%s')"
+    elif data_type == 'date':
+        expr = f"DATE_FORMAT({column}, '%Y-%m-%d')"
+    else:
+        expr = f"CAST({column} AS CHAR)"
+    return f"COALESCE({expr}, '{NULL_TOKEN}')"
+
+
+def canonical_source(values: pd.Series, data_type: str) -> pd.Series:
+    """Render a mapped source column as the text MySQL returns for the stored value."""
+    if data_type in INTEGER_TYPES:
+        text = pd.to_numeric(values, errors='coerce').round().astype('Int64').astype('string')
+    elif data_type in FLOAT_TYPES:
+        numbers = pd.to_numeric(values, errors='coerce')
+        text = numbers.map(lambda v: None if pd.isna(v) else repr(float(v)).removesuffix('.0')).astype('string')
+    elif data_type in ('datetime', 'timestamp'):
+        # DATETIME without fractional seconds rounds to the nearest second
+        text = pd.to_datetime(values, errors='coerce').dt.round('s').dt.strftime('%Y-%m-%d %H:%M:%S').astype('string')
+    elif data_type == 'date':
+        text = pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d').astype('string')
+    else:
+        text = values.astype('string')
+    return text.fillna(NULL_TOKEN)
+
+
+def row_checksums(frame: pd.DataFrame, column_types: Dict[str, str]) -> np.ndarray:
+    """CRC32 of each row's canonical text, matching CRC32(CONCAT_WS(...)) in MySQL."""
+    columns = list(column_types)
+    rendered = [canonical_source(frame[col], column_types[col]) for col in columns]
+    joined = rendered[0].str.cat(rendered[1:], sep=SEPARATOR) if len(rendered) > 1 else rendered[0]
+    return np.fromiter((zlib.crc32(text.encode('utf-8')) for text in joined), dtype=np.int64, count=len(joined))
+
+
+def range_signatures(keys: np.ndarray, checksums: np.ndarray, lower: int,
+                     width: int) -> Dict[int, Tuple[int, int, int]]:
+    """(row count, XOR, sum of checksums) per key range of ``width`` starting at ``lower``."""
+    buckets = (keys - lower) // width
+    frame = pd.DataFrame({'bucket': buckets, 'crc': checksums})
+    grouped = frame.groupby('bucket')['crc']
+    counts = grouped.size()
+    xors = grouped.agg(np.bitwise_xor.reduce)
+    sums = grouped.sum()
+    return {int(bucket): (int(counts[bucket]), int(xors[bucket]), int(sums[bucket])) for bucket in counts.index}
+
+
+class ImportReconciler:
+    def __init__(self, config: Dict = None, range_size: int = 10000, leaf_size: int = 100, fanout: int = 16):
+        """Initialize the reconciler. Ranges narrow by ``fanout`` until ``leaf_size`` keys."""
+        self.config = config
+        self.range_size = range_size
+        self.leaf_size = leaf_size
+        self.fanout = fanout
+        self.connection = None
+        self.cursor = None
+
+    def connect(self):
+        """Open the database connection (the first importer's config when none was given)."""
+        self.connection = mysql.connector.connect(**self.config)
+        self.cursor = self.connection.cursor()
+
+    def disconnect(self):
+        """Close the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.connection:
+            self.connection.close()
+
+    def table_column_types(self, table_name: str) -> Dict[str, str]:
+        """Return DATA_TYPE for every column of a table."""
+        self.cursor.execute(
+            """
+            SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+            """,
+            (self.config['database'], table_name)
+        )
+        return {name: data_type for name, data_type in self.cursor.fetchall()}
+
+    def load_source(self, importer, task_name: str, method_name: str, file_path: str,
+                    key_column: Optional[str]) -> Tuple[pd.DataFrame, List[str]]:
+        """Read and map a workbook the way its importer does.
+
+        Returns the mapped frame (last row wins per key, as with the upserts)
+        and the columns that come from the workbook rather than from defaults.
+        """
+        name = method_name[len('import_'):]
+        df = pd.read_excel(file_path)
+        pre_step = PRE_VALIDATION_STEPS.get(method_name)
+        if pre_step:
+            df = getattr(importer, pre_step)(df)
+        from_source = set(df.rename(columns=importer.COLUMN_MAPPINGS.get(name, {})).columns)
+
+        mapped = getattr(importer, f'prepare_{name}')(df)
+        if key_column:
+            mapped = mapped.drop_duplicates(subset=[key_column], keep='last')
+        return mapped, [col for col in mapped.columns if col in from_source]
+
+    def _db_signatures(self, table_name: str, key_column: str, row_expr: str,
+                       lower: int, upper: Optional[int], width: int) -> Dict[int, Tuple[int, int, int]]:
+        """Database-side (count, BIT_XOR, SUM) per key range of ``width`` within [lower, upper)."""
+        # Bounds are integers computed here, so they are inlined: row_expr
+        # carries DATE_FORMAT patterns that must not meet parameter substitution.
+        where = f"WHERE {key_column} >= {int(lower)}"
+        if upper is not None:
+            where += f" AND {key_column} < {int(upper)}"
+        self.cursor.execute(
+            f"""
+            SELECT FLOOR(({key_column} - {int(lower)}) / {int(width)}) AS bucket,
+                   COUNT(*), BIT_XOR(CRC32({row_expr})), SUM(CRC32({row_expr}))
+            FROM {table_name} {where}
+            GROUP BY bucket
+            """
+        )
+        return {
+            int(bucket): (int(count), int(xor), int(total))
+            for bucket, count, xor, total in self.cursor.fetchall()
+        }
+
+    def _compare_rows(self, table_name: str, key_column: str, row_expr: str, keys: np.ndarray,
+                      checksums: np.ndarray, lower: int, upper: int, differences: Dict[str, List]):
+        """Fetch per-row checksums of one leaf range and classify every differing key."""
+        self.cursor.execute(
+            f"SELECT {key_column}, CRC32({row_expr}) FROM {table_name} "
+            f"WHERE {key_column} >= {int(lower)} AND {key_column} < {int(upper)}"
+        )
+        db_rows = {int(key): int(crc) for key, crc in self.cursor.fetchall()}
+        start, end = np.searchsorted(keys, [lower, upper])
+        source_rows = dict(zip(keys[start:end].tolist(), checksums[start:end].tolist()))
+
+        for key, crc in source_rows.items():
+            if key not in db_rows:
+                differences['missing_in_db'].append(key)
+            elif db_rows[key] != crc:
+                differences['changed'].append(key)
+        differences['extra_in_db'].extend(key for key in db_rows if key not in source_rows)
+
+    def _drill_down(self, table_name: str, key_column: str, row_expr: str, keys: np.ndarray,
+                    checksums: np.ndarray, lower: int, upper: int, differences: Dict[str, List]) -> int:
+        """Narrow one mismatching key range [lower, upper); returns the queries issued."""
+        width = upper - lower
+        if width <= self.leaf_size:
+            self._compare_rows(table_name, key_column, row_expr, keys, checksums, lower, upper, differences)
+            return 1
+
+        sub_width = max(self.leaf_size, -(-width // self.fanout))
+        start, end = np.searchsorted(keys, [lower, upper])
+        source = range_signatures(keys[start:end], checksums[start:end], lower, sub_width)
+        database = self._db_signatures(table_name, key_column, row_expr, lower, upper, sub_width)
+
+        queries = 1
+        for bucket in sorted(set(source) | set(database)):
+            if source.get(bucket) != database.get(bucket):
+                sub_lower = lower + bucket * sub_width
+                queries += self._drill_down(table_name, key_column, row_expr, keys, checksums,
+                                            sub_lower, min(sub_lower + sub_width, upper), differences)
+        return queries
+
+    def reconcile_task(self, importer, task_name: str, method_name: str, file_path: str) -> Dict:
+        """Reconcile one workbook against its table."""
+        started = time.perf_counter()
+        table_name = TARGET_TABLES.get(task_name, task_name)
+        key_column = KEY_COLUMNS.get(table_name, 'id')
+        result = {'task': task_name, 'table': table_name, 'file': file_path}
+
+        mapped, source_columns = self.load_source(importer, task_name, method_name, file_path, key_column)
+        db_types = self.table_column_types(table_name)
+        column_types = {col: db_types[col] for col in source_columns if col in db_types and col != key_column}
+        result['columns'] = list(column_types)
+        result['source_rows'] = len(mapped)
+        row_expr = f"CONCAT_WS('{SEPARATOR}', {', '.join(canonical_sql(col, t) for col, t in column_types.items())})"
+
+        checksums = row_checksums(mapped, column_types)
+        if not key_column:
+            # No natural key: compare whole-table signatures only
+            self.cursor.execute(
+                f"SELECT COUNT(*), BIT_XOR(CRC32({row_expr})), SUM(CRC32({row_expr})) FROM {table_name}"
+            )
+            db_count, db_xor, db_sum = self.cursor.fetchone()
+            source_signature = (len(mapped), int(np.bitwise_xor.reduce(checksums, initial=0)), int(checksums.sum()))
+            result['db_rows'] = int(db_count)
+            result['match'] = source_signature == (int(db_count), int(db_xor or 0), int(db_sum or 0))
+            result['seconds'] = round(time.perf_counter() - started, 3)
+            return result
+
+        keys = pd.to_numeric(mapped[key_column], errors='coerce').to_numpy(dtype='int64')
+        order = np.argsort(keys, kind='stable')
+        keys, checksums = keys[order], checksums[order]
+
+        source = range_signatures(keys, checksums, 0, self.range_size)
+        database = self._db_signatures(table_name, key_column, row_expr, 0, None, self.range_size)
+        mismatched = sorted(bucket for bucket in set(source) | set(database) if source.get(bucket) != database.get(bucket))
+
+        differences = {'missing_in_db': [], 'extra_in_db': [], 'changed': []}
+        queries = 1
+        for bucket in mismatched:
+            queries += self._drill_down(table_name, key_column, row_expr, keys, checksums,
+                                        bucket * self.range_size, (bucket + 1) * self.range_size, differences)
+
+        result['db_rows'] = sum(signature[0] for signature in database.values())
+        result['ranges'] = len(set(source) | set(database))
+        result['mismatched_ranges'] = len(mismatched)
+        result['queries'] = queries
+        result['match'] = not mismatched
+        result['differences'] = {
+            kind: {'count': len(found), 'sample': sorted(found)[:SAMPLE_SIZE]} for kind, found in differences.items()
+        }
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def run(self, folders: Dict[str, str], task_names: Optional[List[str]] = None) -> Dict:
+        """Reconcile the given importers, keyed like IMPORTERS, against their data folders."""
+        started = time.perf_counter()
+        results = []
+        for importer_key, data_folder in folders.items():
+            cls = importer_class(importer_key)
+            importer = cls(dry_run=True)
+            if self.config is None:
+                self.config = importer.config
+            if self.connection is None:
+                self.connect()
+            for task_name, excel_file, method_name in cls.IMPORT_TASKS:
+                if task_names and task_name not in task_names:
+                    continue
+                file_path = os.path.join(data_folder, excel_file)
+                if not os.path.exists(file_path):
+                    results.append({'task': task_name, 'file': file_path, 'match': None, 'error': 'file not found'})
+                    continue
+                try:
+                    results.append(self.reconcile_task(importer, task_name, method_name, file_path))
+                except (mysql.connector.Error, ValueError, KeyError) as e:
+                    results.append({'task': task_name, 'file': file_path, 'match': False, 'error': str(e)})
+        self.disconnect()
+
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'duration_seconds': round(time.perf_counter() - started, 3),
+            'ok': all(result['match'] is not False for result in results),
+            'tables': results,
+        }
+
+
+def main():
+    """Main function to reconcile the import workbooks with the database."""
+    parser = argparse.ArgumentParser(description="Checksum-compare JanssenCRM import workbooks with the database")
+    parser.add_argument('--data-root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'),
+                        help="Folder containing the per-importer data folders")
+    parser.add_argument('--importers', nargs='+', choices=sorted(IMPORTERS), default=list(IMPORTERS),
+                        help="Importers to reconcile (default: all)")
+    parser.add_argument('--tables', nargs='+', default=None, help="Only these import tasks, e.g. calls tickets")
+    parser.add_argument('--range-size', type=int, default=10000, help="Keys per top-level checksum range")
+    parser.add_argument('--leaf-size', type=int, default=100, help="Range width compared row by row")
+    parser.add_argument('--report', default=None, help="Path of the JSON report")
+    args = parser.parse_args()
+
+    folders = {key: os.path.join(args.data_root, IMPORTERS[key][2]) for key in args.importers}
+    reconciler = ImportReconciler(range_size=args.range_size, leaf_size=args.leaf_size)
+    report = reconciler.run(folders, args.tables)
+
+    for result in report['tables']:
+        status = {True: 'MATCH', False: 'DIFF', None: 'SKIPPED'}[result['match']]
+        print(f"[{status}] {result['task']}: {result.get('source_rows', 0)} source rows, "
+              f"{result.get('db_rows', 0)} database rows ({result.get('seconds', 0)}s)")
+        if 'error' in result:
+            print(f"    error: {result['error']}")
+        for kind, found in result.get('differences', {}).items():
+            if found['count']:
+                print(f"    {kind}: {found['count']} keys, e.g. {found['sample'][:5]}")
+
+    report_file = args.report or f'reconcile_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Reconciliation report saved to: {report_file}")
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
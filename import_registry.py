@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Registry of the JanssenCRM import scripts.
+Standard library only, so the command line and cron status checks can list
+importers and tables without loading pandas or mysql.connector.
+"""
+
+import importlib
+import json
+import os
+
+# Table and column snapshot of the database, used wherever no server is at hand
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_snapshot.json')
+
+# Importer module, importer class and default data subfolder of each import script
+IMPORTERS = {
+    'customer': ('customer_data_import', 'EnhancedJanssenCRMDataImporter', 'cutomer'),
+    'call': ('call_data_import', 'EnhancedCallDataImporter', 'call'),
+    'ticket': ('ticket_data_import', 'EnhancedTicketDataImporter', 'tickets'),
+    'requests': ('requests_data_import', 'EnhancedRequestsDataImporter', 'requests'),
+}
+
+# Database table written by an import task, where it differs from the task name
+TARGET_TABLES = {
+    'calls': 'customercall',
+    'ticket_calls': 'ticketcall',
+}
+
+# Primary key of each table, where it is not 'id' (None: no natural key)
+KEY_COLUMNS = {
+    'customer_phones': None,
+    'ticket_item_maintenance': 'ticket_item_id',
+    'ticket_item_change_same': 'ticket_item_id',
+    'ticket_item_change_another': 'ticket_item_id',
+}
+
+# Steps an import method applies before validate_data, keyed by import method
+PRE_VALIDATION_STEPS = {
+    'import_ticket_calls': 'drop_duplicate_ticket_calls',
+}
+
+# Tables that can be RANGE partitioned by month, and their date column (import_partitions.py)
+PARTITIONED_TABLES = {
+    'customercall': 'created_at',
+    'ticketcall': 'created_at',
+}
+
+# (child table, column, parent table). 0 is the importers' default for an
+# unknown reference and is not checked.
+FOREIGN_KEYS = [
+    ('cities', 'governorate_id', 'governorates'),
+    ('customers', 'governomate_id', 'governorates'),
+    ('customers', 'city_id', 'cities'),
+    ('customer_phones', 'customer_id', 'customers'),
+    ('customercall', 'customer_id', 'customers'),
+    ('customercall', 'call_type', 'call_types'),
+    ('customercall', 'category_id', 'call_categories'),
+    ('customercall', 'created_by', 'users'),
+    ('tickets', 'customer_id', 'customers'),
+    ('tickets', 'ticket_cat_id', 'ticket_categories'),
+    ('ticketcall', 'ticket_id', 'tickets'),
+    ('ticketcall', 'call_cat_id', 'call_categories'),
+    ('ticketcall', 'created_by', 'users'),
+    ('ticket_items', 'ticket_id', 'tickets'),
+    ('ticket_items', 'product_id', 'product_info'),
+    ('ticket_items', 'request_reason_id', 'request_reasons'),
+    ('ticket_item_maintenance', 'ticket_item_id', 'ticket_items'),
+    ('ticket_item_change_same', 'ticket_item_id', 'ticket_items'),
+    ('ticket_item_change_same', 'product_id', 'product_info'),
+    ('ticket_item_change_another', 'ticket_item_id', 'ticket_items'),
+    ('ticket_item_change_another', 'product_id', 'product_info'),
+]
+
+# Commit strategies of the write path (``transaction_strategy`` /
+# ``transaction_strategies``): batch commits after every batch, table commits
+# each table once, savepoint commits once with a savepoint every ``savepoint_rows`` rows
+TRANSACTION_STRATEGIES = ('batch', 'table', 'savepoint')
+
+
+def importer_class(importer_key: str) -> type:
+    """Import and return the importer class registered under ``importer_key``."""
+    module_name, class_name, _ = IMPORTERS[importer_key]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def load_schema_snapshot(path: str = SNAPSHOT_FILE) -> dict:
+    """Load the bundled table/column snapshot used in place of INFORMATION_SCHEMA."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['tables']
+
+
+def parse_transaction_strategies(spec: str) -> tuple:
+    """Parse a --transactions value such as 'savepoint' or 'batch,governorates=table'.
+
+    A bare strategy is the default for every table; ``table=strategy`` pairs
+    override it for one table. Returns the default (None when not given)
+    and the per-table strategies.
+    """
+    default, per_table = None, {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        table_name, _, strategy = item.rpartition('=')
+        if strategy not in TRANSACTION_STRATEGIES:
+            raise ValueError(f"Unknown transaction strategy '{strategy}', "
+                             f"expected one of {', '.join(TRANSACTION_STRATEGIES)}")
+        if table_name:
+            per_table[table_name] = strategy
+        else:
+            default = strategy
+    return default, per_table
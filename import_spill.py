@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Out-of-core reading of workbooks larger than the memory budget.
+With the ``memory_limit_mb`` setting on, BatchWriterMixin hands a workbook
+that would not fit to SpilledWorkbook instead of pd.read_excel: the first
+sheet is streamed with openpyxl in read-only mode, spilled to Parquet in
+chunks sized from the budget and read back as key-range partitions.
+All rows of one id land in the same partition, in workbook order, so the
+duplicate checks of the import methods still see every copy of an id, and
+the partitions come back in key order for ``sort_by_key``.
+"""
+
+import itertools
+import math
+import os
+import shutil
+import tempfile
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Rows parsed before the in-memory size of a row is known; also the smallest partition
+PROBE_ROWS = 1000
+
+# In-memory bytes of a parsed DataFrame per byte of .xlsx file
+WORKBOOK_EXPANSION = 3
+
+# Peak bytes of validate, map and write per byte of parsed DataFrame: the
+# mapped copy, the bound row tuples and the batch in flight
+WORKING_SET_FACTOR = 10
+
+# Keys sampled from each chunk to place the partition boundaries
+SAMPLE_PER_CHUNK = 1000
+
+
+def fits_in_memory(file_path: str, memory_limit: int) -> bool:
+    """Whether importing ``file_path`` in one piece should stay under ``memory_limit`` bytes."""
+    return os.path.getsize(file_path) * WORKBOOK_EXPANSION * WORKING_SET_FACTOR <= memory_limit
+
+
+def spill_frame(df: pd.DataFrame, stem: str) -> str:
+    """Write ``df`` to ``stem``.parquet and return the path.
+
+    Columns mixing types Arrow cannot hold in one array (and installs
+    without pyarrow) fall back to a pickle, which keeps every value as parsed.
+    """
+    path = f'{stem}.parquet'
+    try:
+        df.to_parquet(path, index=False)
+        return path
+    except (ImportError, ValueError, TypeError):
+        if os.path.exists(path):
+            os.remove(path)
+    path = f'{stem}.pkl'
+    df.to_pickle(path)
+    return path
+
+
+def read_spilled_frame(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_pickle(path)
+
+
+def _sheet_rows(sheet) -> Iterator[tuple]:
+    """Yield the rows of a read-only sheet, dropping trailing empty rows as pd.read_excel does."""
+    blank = []
+    for row in sheet.iter_rows(values_only=True):
+        if all(value is None for value in row):
+            blank.append(row)
+            continue
+        yield from blank
+        blank.clear()
+        yield row
+
+
+class SpilledWorkbook:
+    """The first sheet of a workbook, spilled to ``folder`` in chunks and read back in partitions.
+
+    ``memory_limit`` (bytes) sets the partition size: the rows whose parsed
+    frame, times WORKING_SET_FACTOR, fits the budget. Use as a context
+    manager; the spill folder is removed on exit.
+    """
+
+    def __init__(self, file_path: str, memory_limit: int, folder: Optional[str] = None,
+                 key_column: str = 'id'):
+        self.file_path = file_path
+        self.memory_limit = memory_limit
+        self.key_column = key_column
+        self.folder = tempfile.mkdtemp(prefix='import_spill_', dir=folder)
+        self.chunks: List[str] = []
+        self.partition_files: Optional[List[List[str]]] = None
+        self.rows = 0
+        self.partition_rows = PROBE_ROWS
+        self.keyed = False
+        self.ordered = True
+        self.last_key = None
+        self.samples: List[np.ndarray] = []
+
+    def __enter__(self) -> 'SpilledWorkbook':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def spill(self) -> 'SpilledWorkbook':
+        """Stream the sheet into spilled chunks, sampling the keys on the way."""
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = _sheet_rows(workbook.worksheets[0])
+            header = next(rows, None)
+            if header is None:
+                return self
+            columns = [f'Unnamed: {i}' if name is None else name for i, name in enumerate(header)]
+            self.keyed = self.key_column in columns
+            chunk_rows = PROBE_ROWS
+            while True:
+                # Row tuples take several times the memory of the frame, so build it a block at a time
+                blocks = []
+                for _ in range(0, chunk_rows, PROBE_ROWS):
+                    block = [row[:len(columns)] for row in itertools.islice(rows, PROBE_ROWS)]
+                    if not block:
+                        break
+                    blocks.append(pd.DataFrame(block, columns=columns))
+                if not blocks:
+                    break
+                frame = pd.concat(blocks, ignore_index=True) if len(blocks) > 1 else blocks[0]
+                del blocks
+                if not self.chunks:
+                    row_bytes = frame.memory_usage(deep=True).sum() / len(frame)
+                    self.partition_rows = max(PROBE_ROWS,
+                                              int(self.memory_limit // (row_bytes * WORKING_SET_FACTOR)))
+                    chunk_rows = self.partition_rows
+                self._add_chunk(frame)
+        finally:
+            workbook.close()
+        return self
+
+    def _keys(self, frame: pd.DataFrame) -> np.ndarray:
+        return pd.to_numeric(frame[self.key_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+    def _add_chunk(self, frame: pd.DataFrame) -> None:
+        if self.keyed:
+            keys = self._keys(frame)
+            valid = keys[~np.isnan(keys)]
+            self.samples.append(valid[::max(1, len(valid) // SAMPLE_PER_CHUNK)])
+            # Exports sorted by unique id are already range partitioned chunk by chunk
+            if self.ordered:
+                self.ordered = (len(valid) == len(keys) and bool(np.all(np.diff(keys) > 0))
+                                and (self.last_key is None or keys[0] > self.last_key))
+                self.last_key = keys[-1]
+        self.chunks.append(spill_frame(frame, os.path.join(self.folder, f'chunk_{len(self.chunks):06d}')))
+        self.rows += len(frame)
+
+    def _repartition(self) -> None:
+        """Split every chunk by key range into partition files; rows of one key share a partition.
+
+        The boundaries are quantiles of the sampled keys, so partitions come
+        out about ``partition_rows`` long whatever the id distribution.
+        Missing or non-numeric ids sort into the last partition.
+        """
+        count = math.ceil(self.rows / self.partition_rows)
+        sample = np.concatenate(self.samples)
+        bounds = (np.unique(np.quantile(sample, np.linspace(0, 1, count + 1)[1:-1]))
+                  if len(sample) else np.empty(0))
+        self.partition_files = [[] for _ in range(len(bounds) + 1)]
+        for index, path in enumerate(self.chunks):
+            frame = read_spilled_frame(path)
+            slots = np.searchsorted(bounds, self._keys(frame), side='right')
+            for slot, part in frame.groupby(slots, sort=True):
+                stem = os.path.join(self.folder, f'part_{slot:06d}_{index:06d}')
+                self.partition_files[slot].append(spill_frame(part, stem))
+            os.remove(path)
+        self.chunks = []
+
+    def partitions(self) -> Iterator[pd.DataFrame]:
+        """Yield the rows as DataFrames in ascending key ranges, each within the budget.
+
+        Without an id column the chunks come back as they were spilled.
+        The partition files are kept, so the partitions can be read again.
+        """
+        if self.partition_files is None:
+            if self.keyed and not self.ordered and len(self.chunks) > 1:
+                self._repartition()
+            else:
+                self.partition_files = [[path] for path in self.chunks]
+        for paths in self.partition_files:
+            if paths:
+                yield pd.concat([read_spilled_frame(path) for path in paths], ignore_index=True)
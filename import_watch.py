@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+JanssenCRM Watch-Folder Import Daemon
+This script watches the importer data folders and imports a workbook as soon
+as operations staff drop a new or refreshed copy into its folder.
+Features:
+- inotify on Linux (through ctypes, no extra package), polling elsewhere
+- Debouncing: a file is only picked up once it has stopped changing and is a
+  complete xlsx archive, so half-copied files are never read
+- The changed file name selects the import task; only that task runs, plus
+  dependent tasks whose last run failed (e.g. on a missing parent row)
+- Bounded worker pool; tasks run in parallel only when no foreign key
+  connects them, sharing one connection pool and schema cache
+- Processed file signatures persist, so changes made while the daemon was
+  down are picked up at the next start
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import signal
+import struct
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from import_cli import load_state, save_state
+from import_registry import FOREIGN_KEYS, IMPORTERS, TARGET_TABLES, importer_class
+
+# Import configuration
+try:
+    from config import WATCH_SETTINGS  # type: ignore
+except ImportError:
+    WATCH_SETTINGS = {
+        'settle_seconds': 10,
+        'poll_interval': 2,
+        'workers': 2,
+        'retry_seconds': 300,
+        'log_level': 'INFO'
+    }
+
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+STATE_FILE = 'watch_state.json'
+
+# inotify(7) event mask and struct inotify_event header
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Changed paths in a set of folders, from Linux inotify."""
+
+    def __init__(self, folders: List[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}
+        for folder in folders:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(folder),
+                                        IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+            self.folders[wd] = folder
+
+    def wait(self, timeout: float) -> List[str]:
+        """Block up to ``timeout`` seconds and return the paths that saw events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name and wd in self.folders:
+                paths.append(os.path.join(self.folders[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: every watched path is a candidate each tick."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+
+    def wait(self, timeout: float) -> List[str]:
+        time.sleep(timeout)
+        return self.paths
+
+    def close(self):
+        pass
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return (size, mtime in ns) of ``path``, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def table_ancestors() -> Dict[str, Set[str]]:
+    """Return every table's transitive parents along FOREIGN_KEYS."""
+    parents = {}
+    for child, _, parent in FOREIGN_KEYS:
+        parents.setdefault(child, set()).add(parent)
+
+    ancestors = {}
+
+    def collect(table: str) -> Set[str]:
+        if table not in ancestors:
+            ancestors[table] = set()
+            for parent in parents.get(table, ()):
+                ancestors[table] |= {parent} | collect(parent)
+        return ancestors[table]
+
+    for table in parents:
+        collect(table)
+    return ancestors
+
+
+class ImportWatcher:
+    def __init__(self, data_root: str, workers: Optional[int] = None, state_file: str = STATE_FILE):
+        """Initialize the watch-folder daemon over the data folders under ``data_root``."""
+        self.workers = workers or WATCH_SETTINGS.get('workers', 2)
+        self.settle_seconds = WATCH_SETTINGS.get('settle_seconds', 10)
+        self.poll_interval = WATCH_SETTINGS.get('poll_interval', 2)
+        self.retry_seconds = WATCH_SETTINGS.get('retry_seconds', 300)
+        self.state_file = state_file
+        self.stopping = False
+
+        # (importer, task) of each watched workbook, and their tables
+        self.tasks_by_path = {}
+        self.task_tables = {}
+        self.task_order = {}
+        self.folders = {}
+        for importer_key, (_, _, subfolder) in IMPORTERS.items():
+            self.folders[importer_key] = os.path.join(data_root, subfolder)
+            for task_name, excel_file, _ in importer_class(importer_key).IMPORT_TASKS:
+                task = (importer_key, task_name)
+                self.tasks_by_path[os.path.join(self.folders[importer_key], excel_file)] = task
+                self.task_tables[task] = TARGET_TABLES.get(task_name, task_name)
+                self.task_order[task] = len(self.task_order)
+        self.ancestors = table_ancestors()
+
+        state = load_state(self.state_file) or {}
+        self.processed = {path: tuple(signature) for path, signature in state.get('processed', {}).items()}
+        self.task_status = state.get('tasks', {})
+        if not self.processed:
+            # First start: take the folders as they are, import only what changes from now on
+            self.processed = {path: file_signature(path) for path in self.tasks_by_path if file_signature(path)}
+
+        self.changes = {}        # path -> (signature, monotonic time it was last seen changing)
+        self.retry_after = {}    # path -> monotonic time before which a failed task is not retried
+        self.queue = []          # (task, path or None, signature or None)
+        self.running = {}        # future -> (task, path, signature)
+        self.pool = None
+        self.pool_retry_at = 0
+        self.schema_cache = None
+
+        self._setup_logging()
+
+    def _setup_logging(self):
+        """Setup logging configuration."""
+        logging.basicConfig(
+            level=getattr(logging, WATCH_SETTINGS.get('log_level', 'INFO')),
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(f'import_watch_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log', encoding='utf-8'),
+                logging.StreamHandler(sys.stdout)
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def _make_watcher(self):
+        folders = [folder for folder in self.folders.values() if os.path.isdir(folder)]
+        try:
+            watcher = InotifyWatcher(folders)
+            self.logger.info(f"Watching {len(folders)} folders with inotify")
+            return watcher
+        except (OSError, AttributeError, TypeError) as e:
+            self.logger.info(f"inotify unavailable ({e}); polling every {self.poll_interval}s")
+            return PollingWatcher(list(self.tasks_by_path))
+
+    def _save_state(self):
+        save_state({
+            'processed': {path: list(signature) for path, signature in self.processed.items()},
+            'tasks': self.task_status,
+        }, self.state_file)
+
+    def _note_changes(self, paths: List[str]):
+        """Record new signatures of watched workbooks that differ from the last import."""
+        now = time.monotonic()
+        for path in paths:
+            if path not in self.tasks_by_path:
+                continue
+            signature = file_signature(path)
+            if signature is None or signature == self.processed.get(path):
+                continue
+            if self.changes.get(path, (None,))[0] != signature:
+                self.changes[path] = (signature, now)
+
+    def _settled_changes(self) -> List[Tuple[str, Tuple[int, int]]]:
+        """Return the changed workbooks that stopped changing ``settle_seconds`` ago and are complete."""
+        now = time.monotonic()
+        busy = {item[0] for item in self.queue} | {item[0] for item in self.running.values()}
+        settled = []
+        for path, (signature, seen_at) in list(self.changes.items()):
+            if (now - seen_at < self.settle_seconds or self.retry_after.get(path, 0) > now
+                    or self.tasks_by_path[path] in busy):
+                continue
+            if file_signature(path) != signature:
+                continue
+            if not zipfile.is_zipfile(path):
+                # Still being copied (or not a workbook at all); wait for the next change
+                self.changes[path] = (signature, now)
+                continue
+            del self.changes[path]
+            settled.append((path, signature))
+        return settled
+
+    def _enqueue(self, task: Tuple[str, str], path: Optional[str] = None, signature=None):
+        if any(item[0] == task for item in self.queue) or any(item[0] == task for item in self.running.values()):
+            return
+        self.queue.append((task, path, signature))
+        self.queue.sort(key=lambda item: self.task_order[item[0]])
+        self.logger.info(f"Queued {task[0]}.{task[1]}" + (f" ({os.path.basename(path)} changed)" if path else ""))
+
+    def _enqueue_failed_dependents(self, task: Tuple[str, str]):
+        """Queue the tasks downstream of ``task`` whose last run failed."""
+        table = self.task_tables[task]
+        for dependent, dependent_table in self.task_tables.items():
+            if (table in self.ancestors.get(dependent_table, ())
+                    and self.task_status.get(f'{dependent[0]}.{dependent[1]}') == 'failed'):
+                self._enqueue(dependent)
+
+    def _blocked(self, task: Tuple[str, str]) -> bool:
+        """A task waits while a task on the same table or on one of its parents runs or is queued ahead of it."""
+        table = self.task_tables[task]
+        blocking = {table} | self.ancestors.get(table, set())
+        ahead = [item[0] for item in self.queue[:[item[0] for item in self.queue].index(task)]]
+        others = ahead + [item[0] for item in self.running.values()]
+        return any(self.task_tables[other] in blocking for other in others)
+
+    def _run_task(self, importer, data_folder: str, task_name: str) -> bool:
+        """Import one task. Runs in a worker thread."""
+        importer.run_import(data_folder, [task_name])
+        return bool(importer.task_results.get(task_name))
+
+    def _start_jobs(self, executor: ThreadPoolExecutor):
+        from mysql.connector import Error
+
+        from import_common import SchemaCache, create_connection_pool
+
+        for item in list(self.queue):
+            if len(self.running) >= self.workers:
+                break
+            task, path, _ = item
+            if self._blocked(task):
+                continue
+            importer_key, task_name = task
+            importer = importer_class(importer_key)()
+            if self.pool is None:
+                if time.monotonic() < self.pool_retry_at:
+                    return
+                try:
+                    self.pool = create_connection_pool(
+                        importer.config, max(importer.async_writers, getattr(importer, 'shard_writers', 0)), self.workers
+                    )
+                except Error as e:
+                    self.logger.error(f"Could not open the connection pool: {e}; retrying in {self.retry_seconds}s")
+                    self.pool_retry_at = time.monotonic() + self.retry_seconds
+                    return
+                self.schema_cache = SchemaCache(importer.config['database'])
+            importer.connection_pool = self.pool
+            importer.schema_cache = self.schema_cache
+
+            self.queue.remove(item)
+            future = executor.submit(self._run_task, importer, self.folders[importer_key], task_name)
+            self.running[future] = item
+            self.logger.info(f"Started {importer_key}.{task_name}")
+
+    def _finish_jobs(self, timeout: float):
+        if not self.running:
+            return
+        done, _ = wait(list(self.running), timeout=timeout)
+        for future in done:
+            task, path, signature = self.running.pop(future)
+            try:
+                ok = future.result()
+            except Exception as e:
+                self.logger.error(f"Import of {task[0]}.{task[1]} raised: {e}")
+                ok = False
+
+            self.task_status[f'{task[0]}.{task[1]}'] = 'done' if ok else 'failed'
+            if ok:
+                if path:
+                    self.processed[path] = signature
+                    self.retry_after.pop(path, None)
+                self.logger.info(f"Imported {task[0]}.{task[1]}")
+                self._enqueue_failed_dependents(task)
+            else:
+                if path:
+                    self.retry_after[path] = time.monotonic() + self.retry_seconds
+                self.logger.error(f"Import of {task[0]}.{task[1]} failed; retrying in {self.retry_seconds}s if the file is unchanged")
+            self._save_state()
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        """Watch until stopped (SIGINT/SIGTERM), then let running imports finish."""
+        signal.signal(signal.SIGTERM, self.stop)
+        watcher = self._make_watcher()
+        self._save_state()
+        # Pick up anything changed while the daemon was down
+        self._note_changes(list(self.tasks_by_path))
+        tick = min(self.poll_interval, self.settle_seconds)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                while not self.stopping:
+                    self._note_changes(watcher.wait(tick) + list(self.changes))
+                    for path, signature in self._settled_changes():
+                        self._enqueue(self.tasks_by_path[path], path, signature)
+                    self._start_jobs(executor)
+                    self._finish_jobs(timeout=0)
+            except KeyboardInterrupt:
+                pass
+            self.logger.info(f"Stopping; waiting for {len(self.running)} running imports")
+            self._finish_jobs(timeout=None)
+        watcher.close()
+
+
+def main():
+    """Main function to run the watch-folder daemon."""
+    parser = argparse.ArgumentParser(description="Import JanssenCRM workbooks as they change in the data folders")
+    parser.add_argument('--data-root', default=DATA_ROOT, help="Folder containing the per-importer data folders")
+    parser.add_argument('--workers', type=int, default=None, help="Imports running at once (default: 2)")
+    parser.add_argument('--state', default=STATE_FILE, help="Watch state file")
+    args = parser.parse_args()
+
+    ImportWatcher(os.path.abspath(args.data_root), args.workers, args.state).run()
+
+
+if __name__ == "__main__":
+    main()
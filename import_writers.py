@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Writer backends for the JanssenCRM import scripts.
+BatchWriterMixin talks to the database only through DB-API connections from
+``_new_connection``; a writer is the factory of those connections, so the
+same import run can target MySQL, a local stand-in or no database at all.
+Writers (``writer`` setting / --writer):
+- mysql             multi-row INSERTs through executemany (the default)
+- mysql-statement   one INSERT per row, to measure what batching saves
+- null              counts statements and rows, writes nothing
+- recording[:path]  keeps every committed statement with its parameters,
+                    in memory or appended to a JSONL file
+- sqlite[:path]     a SQLite database with the tables of schema_snapshot.json
+- sqldump[:path]    a gzip-compressed .sql bundle of multi-row upserts, for
+                    hosts the importer cannot reach (gunzip -c | mysql)
+Writers other than MySQL answer the importers' schema checks from
+schema_snapshot.json; SQLite skips the importers' DDL, the bundle keeps it.
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+import pandas as pd
+from mysql.connector import errors
+
+from import_common import KEY_COLUMNS, SchemaCache, load_schema_snapshot
+
+WRITERS = ('mysql', 'mysql-statement', 'null', 'recording', 'sqlite', 'sqldump')
+
+DEFAULT_SQLITE_FILE = 'janssencrm_import.sqlite'
+
+ON_DUPLICATE_PATTERN = re.compile(r'\s+ON\s+DUPLICATE\s+KEY\s+UPDATE\s.*$', re.IGNORECASE | re.DOTALL)
+INSERT_IGNORE_PATTERN = re.compile(r'^\s*INSERT\s+IGNORE\s+INTO', re.IGNORECASE)
+INSERT_PATTERN = re.compile(r'^\s*INSERT\s+INTO', re.IGNORECASE)
+VALUES_PATTERN = re.compile(r'\bVALUES\s*\(\s*%s(?:\s*,\s*%s)*\s*\)', re.IGNORECASE)
+COMPOUND_PATTERN = re.compile(r'\bBEGIN\b.*\bEND\s*$', re.IGNORECASE | re.DOTALL)
+CREATE_TRIGGER_PATTERN = re.compile(r'\bCREATE\s+TRIGGER\s+(\w+)', re.IGNORECASE)
+SAVEPOINT_PATTERN = re.compile(r'^\s*(SAVEPOINT|ROLLBACK\s+TO\s+(?:SAVEPOINT\s+)?|RELEASE\s+SAVEPOINT)\s*(\w+)\s*$',
+                               re.IGNORECASE)
+
+# Largest multi-row INSERT in a bundle; the server's max_allowed_packet must be larger
+MAX_STATEMENT_BYTES = 1 << 20
+
+SQL_ESCAPES = str.maketrans({'\\': '\\\\', "'": "\\'", '\0': '\\0', '\n': '\\n', '\r': '\\r', '\x1a': '\\Z'})
+
+BUNDLE_HEADER = """-- JanssenCRM import bundle, generated {generated_at}
+-- Load on the database host with: gunzip -c {name} | mysql {database}
+/*!40101 SET NAMES utf8mb4 */;
+SET @OLD_UNIQUE_CHECKS=@@UNIQUE_CHECKS, UNIQUE_CHECKS=0;
+SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0;
+SET @OLD_SQL_MODE=@@SQL_MODE, SQL_MODE=CONCAT_WS(',', NULLIF(@@SQL_MODE, ''), 'NO_AUTO_VALUE_ON_ZERO');
+SET @OLD_AUTOCOMMIT=@@AUTOCOMMIT, AUTOCOMMIT=0;
+
+"""
+
+BUNDLE_FOOTER = """
+SET SQL_MODE=@OLD_SQL_MODE;
+SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;
+SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;
+SET AUTOCOMMIT=@OLD_AUTOCOMMIT;
+-- Bundle complete: {statements} statements, {rows} rows
+"""
+
+SQLITE_TYPES = {
+    'tinyint': 'INTEGER', 'smallint': 'INTEGER', 'mediumint': 'INTEGER', 'int': 'INTEGER', 'bigint': 'INTEGER',
+    'float': 'REAL', 'double': 'REAL', 'decimal': 'REAL',
+}
+
+
+class WriterCounters:
+    """Statement, row, commit and rollback counts, shared by a writer's connections."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {'statements': 0, 'rows': 0, 'commits': 0, 'rollbacks': 0, 'skipped': 0}
+
+    def add(self, **counts) -> None:
+        with self.lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+
+
+class SnapshotSchemaCache(SchemaCache):
+    """SchemaCache answered from schema_snapshot.json instead of INFORMATION_SCHEMA."""
+
+    def __init__(self, tables: Optional[Dict] = None):
+        super().__init__(database='snapshot')
+        self.snapshot = tables or load_schema_snapshot()
+
+    def _load(self, cursor) -> None:
+        self.tables = {
+            table_name: {
+                column_name: {
+                    'column_name': column_name,
+                    'data_type': info['type'],
+                    'max_length': info.get('max_length'),
+                    'is_nullable': 'YES' if info['nullable'] else 'NO',
+                    'default_value': None
+                }
+                for column_name, info in columns.items()
+            }
+            for table_name, columns in self.snapshot.items()
+        }
+
+
+class NullCursor:
+    """Cursor that counts what it is given and returns no rows."""
+
+    rowcount = 0
+
+    def __init__(self, counters: WriterCounters):
+        self.counters = counters
+
+    def execute(self, query: str, params: Sequence = ()) -> None:
+        self.rowcount = 1 if INSERT_PATTERN.match(query) or INSERT_IGNORE_PATTERN.match(query) else 0
+        self.counters.add(statements=1, rows=self.rowcount)
+
+    def executemany(self, query: str, rows: Sequence[Tuple]) -> None:
+        self.rowcount = len(rows)
+        self.counters.add(statements=1, rows=len(rows))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self) -> List:
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+class NullConnection:
+    def __init__(self, counters: WriterCounters):
+        self.counters = counters
+
+    def cursor(self, *args, **kwargs):
+        return NullCursor(self.counters)
+
+    def commit(self) -> None:
+        self.counters.add(commits=1)
+
+    def rollback(self) -> None:
+        self.counters.add(rollbacks=1)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingCursor(NullCursor):
+    def __init__(self, connection: 'RecordingConnection'):
+        super().__init__(connection.counters)
+        self.connection = connection
+
+    def execute(self, query: str, params: Sequence = ()) -> None:
+        super().execute(query, params)
+        savepoint = SAVEPOINT_PATTERN.match(query)
+        if savepoint:
+            self.connection.savepoint(savepoint.group(1), savepoint.group(2))
+            return
+        self.connection.pending.append((query, [tuple(params)]))
+        if not (self.rowcount or query.lstrip().upper().startswith('SELECT')):
+            # DDL commits implicitly in MySQL, taking the pending inserts with it
+            self.connection.writer.record(self.connection.pending)
+            self.connection.pending = []
+
+    def executemany(self, query: str, rows: Sequence[Tuple]) -> None:
+        super().executemany(query, rows)
+        self.connection.pending.append((query, [tuple(row) for row in rows]))
+
+
+class RecordingConnection(NullConnection):
+    """Keeps statements until commit hands them to the writer; rollback drops them.
+
+    Savepoints mark a position in the pending statements, and ROLLBACK TO
+    SAVEPOINT drops what came after it.
+    """
+
+    def __init__(self, writer: 'RecordingWriter'):
+        super().__init__(writer.counters)
+        self.writer = writer
+        self.pending = []
+        self.savepoints = {}
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self)
+
+    def savepoint(self, command: str, name: str) -> None:
+        command = command.split()[0].upper()
+        if command == 'SAVEPOINT':
+            self.savepoints[name] = len(self.pending)
+        elif name not in self.savepoints:
+            raise errors.DatabaseError(msg=f"SAVEPOINT {name} does not exist", errno=1305)
+        elif command == 'ROLLBACK':
+            del self.pending[self.savepoints[name]:]
+            self.savepoints = {key: mark for key, mark in self.savepoints.items() if mark <= len(self.pending)}
+        else:
+            del self.savepoints[name]
+
+    def commit(self) -> None:
+        super().commit()
+        self.writer.record(self.pending)
+        self.pending = []
+        self.savepoints = {}
+
+    def rollback(self) -> None:
+        super().rollback()
+        self.pending = []
+        self.savepoints = {}
+
+
+class StatementCursor:
+    """Wraps a MySQL cursor so executemany sends one INSERT per row."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def executemany(self, query: str, rows: Sequence[Tuple]) -> None:
+        for row in rows:
+            self.cursor.execute(query, row)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class StatementConnection:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return StatementCursor(self.connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+def _sqlite_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'item'):
+        # NumPy scalars
+        return value.item()
+    return value
+
+
+def sql_literal(value) -> str:
+    """Render a bound value as a MySQL literal, the way mysql.connector would send it.
+
+    MySQL has no literal for infinite floats; like NaN they become NULL.
+    """
+    if hasattr(value, 'item'):
+        # NumPy scalars, before the float branch: np.float64 is a float
+        return sql_literal(value.item())
+    if value is None or value is pd.NA or (isinstance(value, (float, datetime)) and value != value):
+        # None, NA, NaN and NaT
+        return 'NULL'
+    if isinstance(value, datetime):
+        return value.strftime("'%Y-%m-%d %H:%M:%S.%f'" if value.microsecond else "'%Y-%m-%d %H:%M:%S'")
+    if isinstance(value, date):
+        return f"'{value.isoformat()}'"
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else 'NULL'
+    if isinstance(value, (bytes, bytearray)):
+        return f"X'{bytes(value).hex()}'"
+    return "'" + str(value).translate(SQL_ESCAPES) + "'"
+
+
+def sqlite_query(query: str) -> Optional[str]:
+    """Translate an importer statement to SQLite, or None for statements SQLite skips.
+
+    Upserts become INSERT OR REPLACE, which rewrites the whole row where
+    MySQL updates the listed columns; the stand-in only needs the final rows.
+    """
+    if INSERT_IGNORE_PATTERN.match(query):
+        query = INSERT_IGNORE_PATTERN.sub('INSERT OR IGNORE INTO', query)
+    elif INSERT_PATTERN.match(query):
+        if ON_DUPLICATE_PATTERN.search(query):
+            query = INSERT_PATTERN.sub('INSERT OR REPLACE INTO', ON_DUPLICATE_PATTERN.sub('', query))
+    elif not query.lstrip().upper().startswith('SELECT'):
+        # DDL, triggers, ANALYZE TABLE: the schema comes from the snapshot
+        return None
+    return query.replace('%s', '?')
+
+
+class SQLiteCursor:
+    """Runs reads at once and queues writes on the connection until commit."""
+
+    def __init__(self, connection: 'SQLiteConnection'):
+        self.connection = connection
+        self.cursor = connection.connection.cursor()
+        self.rowcount = 0
+
+    def _run(self, query: str, rows: List[Tuple]) -> None:
+        translated = sqlite_query(query)
+        if translated is None:
+            self.connection.counters.add(skipped=1)
+            return
+        try:
+            rows = [tuple(_sqlite_value(value) for value in row) for row in rows]
+        except (TypeError, ValueError) as e:
+            raise errors.DataError(msg=str(e), errno=1366) from e
+        if translated.startswith('SELECT'):
+            self.connection.run(self.cursor, translated, rows)
+            self.rowcount = self.cursor.rowcount
+        elif self.connection.locked:
+            self.connection.run(self.cursor, translated, rows)
+            self.connection.counters.add(statements=1, rows=len(rows))
+            self.rowcount = len(rows)
+        else:
+            self.connection.pending.append((translated, rows))
+            self.rowcount = len(rows)
+
+    def execute(self, query: str, params: Sequence = ()) -> None:
+        if SAVEPOINT_PATTERN.match(query):
+            self.connection.savepoint(query)
+            return
+        self._run(query, [tuple(params)])
+
+    def executemany(self, query: str, rows: Sequence[Tuple]) -> None:
+        self._run(query, list(rows))
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self) -> List:
+        return self.cursor.fetchall()
+
+    def close(self) -> None:
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    """A SQLite connection whose writes are applied at commit, under the writer's lock.
+
+    SQLite locks the whole database for the length of a write transaction,
+    so the importers' concurrent writers, which keep a batch open until its
+    predecessors commit, would block each other; MySQL only locks the rows.
+    Errors are raised as mysql.connector errors so the retry and bisection
+    logic applies; data errors in queued rows surface at commit.
+
+    The first SAVEPOINT takes the writer's lock until commit or rollback and
+    applies the queued writes; from then on writes run at once, so their
+    errors surface at the statement, as in MySQL.
+    """
+
+    def __init__(self, writer: 'SQLiteWriter'):
+        # Writer threads open and use connections on different threads
+        self.connection = sqlite3.connect(writer.path, timeout=30, check_same_thread=False)
+        self.writer = writer
+        self.counters = writer.counters
+        self.pending = []
+        self.locked = False
+
+    @staticmethod
+    def run(cursor, query: str, rows: List[Tuple]) -> None:
+        try:
+            if len(rows) == 1:
+                cursor.execute(query, rows[0])
+            else:
+                cursor.executemany(query, rows)
+        except sqlite3.IntegrityError as e:
+            raise errors.IntegrityError(msg=str(e), errno=1062) from e
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e):
+                raise errors.DatabaseError(msg=str(e), errno=1205) from e
+            raise errors.ProgrammingError(msg=str(e), errno=1064) from e
+        except (sqlite3.InterfaceError, sqlite3.DataError, OverflowError) as e:
+            raise errors.DataError(msg=str(e), errno=1366) from e
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self)
+
+    def _apply_pending(self) -> None:
+        cursor = self.connection.cursor()
+        try:
+            for query, rows in self.pending:
+                self.run(cursor, query, rows)
+        finally:
+            cursor.close()
+        self.counters.add(statements=len(self.pending), rows=sum(len(rows) for _, rows in self.pending))
+        self.pending = []
+
+    def _unlock(self) -> None:
+        if self.locked:
+            self.locked = False
+            self.writer.lock.release()
+
+    def savepoint(self, statement: str) -> None:
+        if not self.locked:
+            self.writer.lock.acquire()
+            self.locked = True
+            self._apply_pending()
+        cursor = self.connection.cursor()
+        try:
+            self.run(cursor, statement, [()])
+        finally:
+            cursor.close()
+
+    def commit(self) -> None:
+        if self.pending or self.locked:
+            if not self.locked:
+                self.writer.lock.acquire()
+                self.locked = True
+            try:
+                self._apply_pending()
+                self.connection.commit()
+            except errors.Error:
+                self.connection.rollback()
+                raise
+            finally:
+                self._unlock()
+        self.counters.add(commits=1)
+
+    def rollback(self) -> None:
+        self.pending = []
+        self.connection.rollback()
+        self._unlock()
+        self.counters.add(rollbacks=1)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class MySQLWriter:
+    """The production writer: connections from the shared pool or the server."""
+
+    uses_snapshot = False
+
+    def __init__(self, config: Dict, pool=None, bulk: bool = True):
+        self.config = config
+        self.pool = pool
+        self.bulk = bulk
+        self.counters = WriterCounters()
+
+    def connect(self):
+        connection = self.pool.get_connection() if self.pool is not None else mysql.connector.connect(**self.config)
+        return connection if self.bulk else StatementConnection(connection)
+
+    def close(self) -> None:
+        pass
+
+
+class NullWriter:
+    """Accepts everything and keeps only counts: the cost of the Python side alone."""
+
+    uses_snapshot = True
+
+    def __init__(self):
+        self.counters = WriterCounters()
+
+    def connect(self):
+        return NullConnection(self.counters)
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingWriter:
+    """Keeps every committed statement with its parameters, for tests and diffs between runs."""
+
+    uses_snapshot = True
+
+    def __init__(self, path: Optional[str] = None):
+        self.counters = WriterCounters()
+        self.path = path
+        self.statements: List[Tuple[str, List[Tuple]]] = []
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8') if path else None
+
+    def connect(self):
+        return RecordingConnection(self)
+
+    def record(self, statements: List[Tuple[str, List[Tuple]]]) -> None:
+        with self.lock:
+            if self.file is None:
+                self.statements.extend(statements)
+                return
+            for query, rows in statements:
+                self.file.write(json.dumps({'query': ' '.join(query.split()), 'rows': rows},
+                                           ensure_ascii=False, default=str) + '\n')
+            self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class SQLiteWriter:
+    """A local SQLite database standing in for MySQL, created from schema_snapshot.json."""
+
+    uses_snapshot = True
+
+    def __init__(self, path: str = DEFAULT_SQLITE_FILE):
+        self.path = path
+        self.counters = WriterCounters()
+        self.lock = threading.Lock()
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        connection = sqlite3.connect(self.path)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            for table_name, columns in load_schema_snapshot().items():
+                key_column = KEY_COLUMNS.get(table_name, 'id')
+                definitions = [
+                    f"{column} {SQLITE_TYPES.get(info['type'], 'TEXT')}"
+                    + (' PRIMARY KEY' if column == key_column else '')
+                    for column, info in columns.items()
+                ]
+                connection.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(definitions)})")
+            connection.commit()
+        finally:
+            connection.close()
+
+    def connect(self):
+        return SQLiteConnection(self)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLDumpWriter:
+    """Streams committed statements into a gzip-compressed .sql bundle.
+
+    Consecutive batches of the same INSERT are merged into multi-row
+    statements of up to ``max_statement_bytes``, each followed by COMMIT,
+    so the mysql client loads the bundle at its own speed. DDL (tables,
+    triggers, ANALYZE TABLE) is kept in order; trigger bodies are wrapped
+    in DELIMITER and each CREATE TRIGGER is preceded by its DROP TRIGGER
+    IF EXISTS. Only the statement being built is held in memory.
+    """
+
+    uses_snapshot = True
+
+    def __init__(self, path: Optional[str] = None, database: str = '',
+                 max_statement_bytes: int = MAX_STATEMENT_BYTES):
+        self.path = path or f'janssencrm_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.sql.gz'
+        self.max_statement_bytes = max_statement_bytes
+        self.counters = WriterCounters()
+        self.lock = threading.Lock()
+        self.insert = None
+        self.values = []
+        self.size = 0
+        self.file = gzip.open(self.path, 'wt', encoding='utf-8', compresslevel=6)
+        self.file.write(BUNDLE_HEADER.format(generated_at=datetime.now().isoformat(timespec='seconds'),
+                                             name=os.path.basename(self.path), database=database))
+
+    def connect(self):
+        return RecordingConnection(self)
+
+    def record(self, statements: List[Tuple[str, List[Tuple]]]) -> None:
+        with self.lock:
+            for query, rows in statements:
+                match = VALUES_PATTERN.search(query)
+                if match is None:
+                    self._flush()
+                    self._write_statement(query, rows)
+                    continue
+                insert = (' '.join(query[:match.start()].split()), ' '.join(query[match.end():].split()))
+                if insert != self.insert:
+                    self._flush()
+                    self.insert = insert
+                for row in rows:
+                    values = '(' + ','.join(sql_literal(value) for value in row) + ')'
+                    size = len(values.encode('utf-8')) + 2
+                    if self.values and self.size + size > self.max_statement_bytes:
+                        self._flush()
+                        self.insert = insert
+                    self.values.append(values)
+                    self.size += size
+
+    def _flush(self) -> None:
+        """Write the multi-row INSERT being built."""
+        if self.values:
+            prefix, suffix = self.insert
+            self.file.write(f"{prefix} VALUES\n" + ',\n'.join(self.values)
+                            + (f"\n{suffix}" if suffix else '') + ";\nCOMMIT;\n")
+        self.insert = None
+        self.values = []
+        self.size = 0
+
+    def _write_statement(self, query: str, rows: List[Tuple]) -> None:
+        if query.lstrip().upper().startswith('SELECT'):
+            return
+        for row in rows or [()]:
+            statement = query.strip().rstrip(';')
+            if row:
+                statement = statement % tuple(sql_literal(value) for value in row)
+            trigger = CREATE_TRIGGER_PATTERN.search(statement)
+            if trigger:
+                # The mysql client stops at the first error; an existing trigger must not be one
+                self.file.write(f"DROP TRIGGER IF EXISTS {trigger.group(1)};\n")
+            if COMPOUND_PATTERN.search(statement):
+                self.file.write(f"DELIMITER ;;\n{statement};;\nDELIMITER ;\n")
+            else:
+                self.file.write(f"{statement};\n")
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file is None:
+                return
+            self._flush()
+            self.file.write(BUNDLE_FOOTER.format(**self.counters.counts))
+            self.file.close()
+            self.file = None
+
+
+def create_writer(spec: str, config: Dict, pool=None):
+    """Return the writer for a ``writer`` setting such as 'null' or 'sqlite:/tmp/crm.sqlite'."""
+    name, _, argument = spec.partition(':')
+    if name == 'mysql':
+        return MySQLWriter(config, pool)
+    if name == 'mysql-statement':
+        return MySQLWriter(config, pool, bulk=False)
+    if name == 'null':
+        return NullWriter()
+    if name == 'recording':
+        return RecordingWriter(argument or None)
+    if name == 'sqlite':
+        return SQLiteWriter(argument or DEFAULT_SQLITE_FILE)
+    if name == 'sqldump':
+        return SQLDumpWriter(argument or None, config.get('database', ''))
+    raise ValueError(f"Unknown writer '{spec}', expected one of {', '.join(WRITERS)}")
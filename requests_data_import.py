@@ -9,10 +9,11 @@ Features:
 - Data validation before import
 - Progress tracking
 - Request-specific data handling
+- ticket_items and its three child workbooks parsed concurrently and loaded
+  in one pass, child rows checked against the ticket item ids
 """
 
 import pandas as pd
-import mysql.connector
 from mysql.connector import Error
 import os
 import sys
@@ -21,6 +22,11 @@ import logging
 import time
 from typing import Dict, List, Tuple, Optional
 import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from import_common import (INSERT_COLUMNS_PATTERN, BatchWriterMixin, convert_datetimes, parse_transaction_strategies,
+                           server_now)
 
 # Import configuration
 try:
@@ -39,7 +45,26 @@ except ImportError:
     IMPORT_SETTINGS = {
         'batch_size': 1000,
         'max_retries': 3,
-        'log_level': 'INFO'
+        'log_level': 'INFO',
+        'async_writers': 0,
+        'reject_folder': 'rejects',
+        'reject_format': 'csv',
+        'analyze_after_import': True,
+        'update_histograms': False,
+        'histogram_columns': ['status', 'company_id', 'created_at'],
+        'histogram_buckets': 100,
+        'server_timezone': 'Africa/Cairo',
+        'source_timezone': None,
+        'progress_events': None,
+        'progress_log_seconds': 5,
+        'writer': 'mysql',
+        'sort_by_key': False,
+        'spill_folder': None,
+        'memory_limit_mb': None,
+        'transaction_strategy': 'batch',
+        'transaction_strategies': {},
+        'savepoint_rows': 50000,
+        'combined_ticket_items': True
     }
     DEFAULT_VALUES = {
         'company_id': 0,
@@ -56,16 +81,196 @@ except ImportError:
         'request_priority': 0
     }
 
-class EnhancedRequestsDataImporter:
-    def __init__(self, config: Dict = None):
+class EnhancedRequestsDataImporter(BatchWriterMixin):
+    # Import order (respecting foreign key constraints): (table name, Excel file, import method)
+    IMPORT_TASKS = [
+        ('request_reasons', 'reqreqson.xlsx', 'import_request_reasons'),
+        ('product_info', 'ProductName.xlsx', 'import_product_info'),
+        ('ticket_items', 'ticket_items.xlsx', 'import_ticket_items'),
+        ('ticket_item_maintenance', 'TI_Maintenance.xlsx', 'import_ticket_item_maintenance'),
+        ('ticket_item_change_same', 'TI_Change_Same.xlsx', 'import_ticket_item_change_same'),
+        ('ticket_item_change_another', 'TI_Change_Another.xlsx', 'import_ticket_item_change_another')
+    ]
+    
+    # Excel header -> database column renames applied by each prepare_* method;
+    # data_export.py applies them in reverse
+    COLUMN_MAPPINGS = {
+        'request_reasons': {'reqreqson': 'name'},
+        'product_info': {'pfodcut.ProductName': 'product_name'},
+        'ticket_item_maintenance': {
+            'id': 'ticket_item_id',
+            'maintanancedescription': 'maintenance_steps',
+            'cost3': 'maintenance_cost',
+            'choice4Accetp': 'client_approval',
+            'choice4refusereason': 'refusal_reason',
+            'pulled3': 'pulled',
+            'pulledDate3': 'pull_date',
+            'deleverd3': 'delivered',
+            'deleverdDate3': 'delivery_date',
+            'create_by': 'created_by',
+            'create_at': 'created_at',
+            'update_at': 'updated_at'
+        },
+        'ticket_item_change_same': {
+            'id': 'ticket_item_id',
+            'cost1': 'cost',
+            'choice2Accetp': 'client_approval',
+            'choice2refusereason': 'refusal_reason',
+            'pulled1': 'pulled',
+            'pulledDate1': 'pull_date',
+            'deleverd1': 'delivered',
+            'deleverdDate1': 'delivery_date',
+            'create_by': 'created_by',
+            'create_at': 'created_at',
+            'update_at': 'updated_at'
+        },
+        'ticket_item_change_another': {
+            'id': 'ticket_item_id',
+            'cost2': 'cost',
+            'choice3Accetp': 'client_approval',
+            'choice3refusereason': 'refusal_reason',
+            'pulled2': 'pulled',
+            'pulledDate2': 'pull_date',
+            'deleverd2': 'delivered',
+            'deleverdDate2': 'delivery_date',
+            'create_by': 'created_by',
+            'create_at': 'created_at',
+            'update_at': 'updated_at'
+        },
+        'ticket_items': {
+            'ticket_ID': 'ticket_id',
+            'inspected_date': 'inspection_date',
+            'inspected_result': 'inspection_result',
+            'create_by': 'created_by',
+            'create_at': 'created_at',
+            'update_at': 'updated_at'
+        }
+    }
+    
+    # Child workbooks keyed by ticket_items.id, loaded with their parent by import_ticket_item_family
+    TICKET_ITEM_CHILDREN = ['ticket_item_maintenance', 'ticket_item_change_same', 'ticket_item_change_another']
+    
+    UPSERT_QUERIES = {
+        'ticket_items': """
+            INSERT INTO ticket_items (
+                id, company_id, ticket_id, product_id, product_size, quantity,
+                purchase_date, purchase_location, request_reason_id, request_reason_detail,
+                inspected, inspection_date, inspection_result, client_approval,
+                created_by, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                company_id = VALUES(company_id),
+                ticket_id = VALUES(ticket_id),
+                product_id = VALUES(product_id),
+                product_size = VALUES(product_size),
+                quantity = VALUES(quantity),
+                purchase_date = VALUES(purchase_date),
+                purchase_location = VALUES(purchase_location),
+                request_reason_id = VALUES(request_reason_id),
+                request_reason_detail = VALUES(request_reason_detail),
+                inspected = VALUES(inspected),
+                inspection_date = VALUES(inspection_date),
+                inspection_result = VALUES(inspection_result),
+                client_approval = VALUES(client_approval),
+                created_by = VALUES(created_by),
+                updated_at = VALUES(updated_at)
+        """,
+        'ticket_item_maintenance': """
+            INSERT INTO ticket_item_maintenance (
+                ticket_item_id, maintenance_steps, maintenance_cost, client_approval,
+                refusal_reason, pulled, pull_date, delivered, delivery_date,
+                created_by, company_id, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                maintenance_steps = VALUES(maintenance_steps),
+                maintenance_cost = VALUES(maintenance_cost),
+                client_approval = VALUES(client_approval),
+                refusal_reason = VALUES(refusal_reason),
+                pulled = VALUES(pulled),
+                pull_date = VALUES(pull_date),
+                delivered = VALUES(delivered),
+                delivery_date = VALUES(delivery_date),
+                updated_at = VALUES(updated_at)
+        """,
+        'ticket_item_change_same': """
+            INSERT INTO ticket_item_change_same (
+                ticket_item_id, product_id, product_size, cost, client_approval,
+                refusal_reason, pulled, pull_date, delivered, delivery_date,
+                created_by, company_id, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                product_id = VALUES(product_id),
+                product_size = VALUES(product_size),
+                cost = VALUES(cost),
+                client_approval = VALUES(client_approval),
+                refusal_reason = VALUES(refusal_reason),
+                pulled = VALUES(pulled),
+                pull_date = VALUES(pull_date),
+                delivered = VALUES(delivered),
+                delivery_date = VALUES(delivery_date),
+                updated_at = VALUES(updated_at)
+        """,
+        'ticket_item_change_another': """
+            INSERT INTO ticket_item_change_another (
+                ticket_item_id, product_id, product_size, cost, client_approval,
+                refusal_reason, pulled, pull_date, delivered, delivery_date,
+                created_by, company_id, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                product_id = VALUES(product_id),
+                product_size = VALUES(product_size),
+                cost = VALUES(cost),
+                client_approval = VALUES(client_approval),
+                refusal_reason = VALUES(refusal_reason),
+                pulled = VALUES(pulled),
+                pull_date = VALUES(pull_date),
+                delivered = VALUES(delivered),
+                delivery_date = VALUES(delivery_date),
+                updated_at = VALUES(updated_at)
+        """,
+    }
+    
+    # How bound_rows coerces the values of UPSERT_QUERIES: str (safe_str), float
+    # (safe_float) or None (bound as prepared); any other column is safe_int
+    VALUE_TYPES = {
+        'ticket_items': {
+            'product_size': str, 'purchase_date': None, 'purchase_location': str, 'request_reason_detail': str,
+            'inspection_date': None, 'inspection_result': str, 'created_at': None, 'updated_at': None
+        },
+        'ticket_item_maintenance': {
+            'maintenance_steps': str, 'maintenance_cost': float, 'refusal_reason': str, 'pull_date': None,
+            'delivery_date': None, 'created_at': None, 'updated_at': None
+        },
+        'ticket_item_change_same': {
+            'product_size': str, 'cost': float, 'refusal_reason': str, 'pull_date': None,
+            'delivery_date': None, 'created_at': None, 'updated_at': None
+        },
+        'ticket_item_change_another': {
+            'product_size': str, 'cost': float, 'refusal_reason': str, 'pull_date': None,
+            'delivery_date': None, 'created_at': None, 'updated_at': None
+        }
+    }
+    
+    def __init__(self, config: Dict = None, async_writers: Optional[int] = None, dry_run: bool = False):
         """Initialize the enhanced requests data importer."""
         self.config = config or DATABASE_CONFIG
         self.connection = None
         self.cursor = None
+        self.import_settings = IMPORT_SETTINGS
+        self.dry_run = dry_run
+        self.async_writers = async_writers if async_writers is not None else IMPORT_SETTINGS.get('async_writers', 0)
+        self.changed_tables = set()
+        self.task_results = {}
+        self.write_progress = {}
         self.stats = {
             'total_records': 0,
             'successful_imports': 0,
             'failed_imports': 0,
+            'rejected_rows': 0,
+            'lock_retries': 0,
+            'reconnects': 0,
+            'analyze_seconds': {},
+            'tables': {},
             'start_time': None,
             'end_time': None
         }
@@ -77,13 +282,16 @@ class EnhancedRequestsDataImporter:
         """Setup logging configuration."""
         log_level = getattr(logging, IMPORT_SETTINGS['log_level'])
         
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if not self.dry_run and not logging.getLogger().handlers:
+            # Dry runs touch no database, so they leave no log file behind either;
+            # under import_cli.py the log file is already open
+            handlers.insert(0, logging.FileHandler(f'requests_data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'))
+        
         logging.basicConfig(
             level=log_level,
             format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'requests_data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'),
-                logging.StreamHandler(sys.stdout)
-            ]
+            handlers=handlers
         )
         self.logger = logging.getLogger(__name__)
         
@@ -91,7 +299,7 @@ class EnhancedRequestsDataImporter:
         """Establish database connection with retry logic."""
         for attempt in range(IMPORT_SETTINGS['max_retries']):
             try:
-                self.connection = mysql.connector.connect(**self.config)
+                self.connection = self._new_connection()
                 self.cursor = self.connection.cursor()
                 self.logger.info("Successfully connected to database")
                 return True
@@ -110,11 +318,14 @@ class EnhancedRequestsDataImporter:
             self.cursor.close()
         if self.connection:
             self.connection.close()
+        self._close_writer()
         self.logger.info("Database connection closed")
     
     def check_table_exists(self, table_name: str) -> bool:
         """Check if a table exists in the database."""
         try:
+            if self.schema_cache is not None:
+                return self.schema_cache.table_exists(self.cursor, table_name)
             query = "SHOW TABLES LIKE %s"
             self.cursor.execute(query, (table_name,))
             result = self.cursor.fetchone()
@@ -155,7 +366,36 @@ class EnhancedRequestsDataImporter:
         except (ValueError, TypeError):
             return default
     
-
+    def safe_int_column(self, values: pd.Series, default=0) -> list:
+        """safe_int over a whole column at once."""
+        numbers = pd.to_numeric(values, errors='coerce').astype('float64')
+        # NaN and infinity fail the comparison too; int64 truncates like int()
+        return numbers.where(numbers.abs() < 2 ** 63, default).astype('int64').tolist()
+    
+    def safe_float_column(self, values: pd.Series, default=0.0) -> list:
+        """safe_float over a whole column at once."""
+        return pd.to_numeric(values, errors='coerce').fillna(default).astype('float64').tolist()
+    
+    def safe_str_column(self, values: pd.Series, default='') -> list:
+        """safe_str over a whole column at once."""
+        return values.astype(str).where(values.notna(), default).tolist()
+    
+    def bound_rows(self, table_name: str, df: pd.DataFrame) -> List[Tuple]:
+        """Parameter rows of UPSERT_QUERIES[table_name] from a prepared frame, coerced a column at a time."""
+        df = self._in_key_order(table_name, df)
+        columns = INSERT_COLUMNS_PATTERN.search(self.UPSERT_QUERIES[table_name]).group(1).split(',')
+        values = []
+        for column in (col.strip() for col in columns):
+            value_type = self.VALUE_TYPES[table_name].get(column, int)
+            if value_type is None:
+                values.append(df[column].tolist())
+            elif value_type is str:
+                values.append(self.safe_str_column(df[column]))
+            elif value_type is float:
+                values.append(self.safe_float_column(df[column]))
+            else:
+                values.append(self.safe_int_column(df[column], DEFAULT_VALUES.get(column, 0)))
+        return list(zip(*values))
     
     def validate_data(self, df: pd.DataFrame, table_name: str) -> Tuple[bool, List[str]]:
         """Validate data before import."""
@@ -218,11 +458,32 @@ class EnhancedRequestsDataImporter:
         
         return len(errors) == 0, errors
     
+    def prepare_request_reasons(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce request reasons data (reqreqson.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['reqreqson', 'id']
+        # Database expects: ['id', 'name', 'created_by', 'company_id', 'created_at', 'updated_at']
+        
+        # Rename columns to match database structure
+        df = df.rename(columns=self.COLUMN_MAPPINGS['request_reasons'])
+        
+        # Add missing columns with default values
+        df['created_by'] = DEFAULT_VALUES['created_by']
+        df['company_id'] = DEFAULT_VALUES['company_id']
+        now = server_now(self.import_settings)
+        df['created_at'] = now
+        df['updated_at'] = now
+        
+        # Fill missing values
+        df['name'] = df['name'].fillna('Unknown')
+        
+        return df
+    
     def import_request_reasons(self, excel_file: str) -> bool:
         """Import request reasons data from Excel file (reqreqson.xlsx)."""
         try:
             self.logger.info(f"Importing request reasons from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'request_reasons')
@@ -231,46 +492,28 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['reqreqson', 'id']
-            # Database expects: ['id', 'name', 'created_by', 'company_id', 'created_at', 'updated_at']
-            
-            # Rename columns to match database structure
-            df = df.rename(columns={'reqreqson': 'name'})
-            
-            # Add missing columns with default values
-            df['created_by'] = DEFAULT_VALUES['created_by']
-            df['company_id'] = DEFAULT_VALUES['company_id']
-            df['created_at'] = datetime.now()
-            df['updated_at'] = datetime.now()
-            
-            # Fill missing values
-            df['name'] = df['name'].fillna('Unknown')
+            df = self.prepare_request_reasons(df)
             
             # Process in batches
             total_records = int(len(df))
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO request_reasons (id, name, created_by, company_id, created_at, updated_at) 
-                    VALUES (%s, %s, %s, %s, %s, %s) 
-                    ON DUPLICATE KEY UPDATE 
-                        name = VALUES(name),
-                        created_by = VALUES(created_by),
-                        company_id = VALUES(company_id),
-                        updated_at = VALUES(updated_at)
-                    """
-                    self.cursor.execute(query, (int(row['id']), str(row['name']), 
-                                               int(row['created_by']), int(row['company_id']), row['created_at'], row['updated_at']))
-                
-                self.connection.commit()
-                batch_num = i//IMPORT_SETTINGS['batch_size'] + 1
-                total_batches = (total_records-1)//IMPORT_SETTINGS['batch_size'] + 1
-                self.logger.info(f"Processed batch {batch_num}/{total_batches}")
+            query = """
+            INSERT INTO request_reasons (id, name, created_by, company_id, created_at, updated_at) 
+            VALUES (%s, %s, %s, %s, %s, %s) 
+            ON DUPLICATE KEY UPDATE 
+                name = VALUES(name),
+                created_by = VALUES(created_by),
+                company_id = VALUES(company_id),
+                updated_at = VALUES(updated_at)
+            """
+            df = self._in_key_order('request_reasons', df)
+            rows = []
+            for _, row in df.iterrows():
+                rows.append((int(row['id']), str(row['name']), 
+                             int(row['created_by']), int(row['company_id']), row['created_at'], row['updated_at']))
+
+            self._write_rows('request_reasons', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} request reasons")
@@ -283,11 +526,32 @@ class EnhancedRequestsDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_product_info(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce product info data (ProductName.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['pfodcut.ProductName', 'id']
+        # Database expects: ['id', 'company_id', 'product_name', 'created_by', 'created_at', 'updated_at']
+        
+        # Rename columns to match database structure
+        df = df.rename(columns=self.COLUMN_MAPPINGS['product_info'])
+        
+        # Add missing columns with default values
+        df['company_id'] = DEFAULT_VALUES['company_id']
+        df['created_by'] = DEFAULT_VALUES['created_by']
+        now = server_now(self.import_settings)
+        df['created_at'] = now
+        df['updated_at'] = now
+        
+        # Fill missing values
+        df['product_name'] = df['product_name'].fillna('Unknown Product')
+        
+        return df
+    
     def import_product_info(self, excel_file: str) -> bool:
         """Import product info data from Excel file (ProductName.xlsx)."""
         try:
             self.logger.info(f"Importing product info from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'product_info')
@@ -296,46 +560,28 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['pfodcut.ProductName', 'id']
-            # Database expects: ['id', 'company_id', 'product_name', 'created_by', 'created_at', 'updated_at']
-            
-            # Rename columns to match database structure
-            df = df.rename(columns={'pfodcut.ProductName': 'product_name'})
-            
-            # Add missing columns with default values
-            df['company_id'] = DEFAULT_VALUES['company_id']
-            df['created_by'] = DEFAULT_VALUES['created_by']
-            df['created_at'] = datetime.now()
-            df['updated_at'] = datetime.now()
-            
-            # Fill missing values
-            df['product_name'] = df['product_name'].fillna('Unknown Product')
+            df = self.prepare_product_info(df)
             
             # Process in batches
             total_records = int(len(df))
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO product_info (id, company_id, product_name, created_by, created_at, updated_at) 
-                    VALUES (%s, %s, %s, %s, %s, %s) 
-                    ON DUPLICATE KEY UPDATE 
-                        company_id = VALUES(company_id),
-                        product_name = VALUES(product_name),
-                        created_by = VALUES(created_by),
-                        updated_at = VALUES(updated_at)
-                    """
-                    self.cursor.execute(query, (int(row['id']), int(row['company_id']), str(row['product_name']),
-                                               int(row['created_by']), row['created_at'], row['updated_at']))
-                
-                self.connection.commit()
-                batch_num = i//IMPORT_SETTINGS['batch_size'] + 1
-                total_batches = (total_records-1)//IMPORT_SETTINGS['batch_size'] + 1
-                self.logger.info(f"Processed batch {batch_num}/{total_batches}")
+            query = """
+            INSERT INTO product_info (id, company_id, product_name, created_by, created_at, updated_at) 
+            VALUES (%s, %s, %s, %s, %s, %s) 
+            ON DUPLICATE KEY UPDATE 
+                company_id = VALUES(company_id),
+                product_name = VALUES(product_name),
+                created_by = VALUES(created_by),
+                updated_at = VALUES(updated_at)
+            """
+            df = self._in_key_order('product_info', df)
+            rows = []
+            for _, row in df.iterrows():
+                rows.append((int(row['id']), int(row['company_id']), str(row['product_name']),
+                             int(row['created_by']), row['created_at'], row['updated_at']))
+
+            self._write_rows('product_info', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} product info records")
@@ -348,11 +594,47 @@ class EnhancedRequestsDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_ticket_item_maintenance(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce ticket item maintenance data (TI_Maintenance.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'product_id', 'product_size', 'pfodcut.ProdcutType', 'maintainace', 'maintanancedescription', 'cost3', 'choice4Accetp', 'choice4refuse', 'choice4refusereason', 'pulled3', 'pulledDate3', 'deleverd3', 'deleverdDate3', 'finalDicition', 'colsedMantananceReq', 'colsedMantananceReqreason', 'create_at', 'update_at', 'create_by']
+        # Database expects: ['ticket_item_id', 'maintenance_steps', 'maintenance_cost', 'client_approval', 'refusal_reason', 'pulled', 'pull_date', 'delivered', 'delivery_date', 'created_by', 'company_id']
+        
+        # Map Excel columns to database columns
+        # Handle duplicate column names by dropping the original ticket_item_id column
+        if 'ticket_item_id' in df.columns and 'id' in df.columns:
+            df = df.drop('ticket_item_id', axis=1)  # Drop original ticket_item_id column
+        
+        df = df.rename(columns=self.COLUMN_MAPPINGS['ticket_item_maintenance'])
+        
+        # Add missing columns with default values
+        # Handle all-NaN columns properly
+        if df['company_id'].isna().all():
+            df['company_id'] = DEFAULT_VALUES['company_id']
+        else:
+            df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
+        
+        # Fill missing values
+        df['maintenance_cost'] = df['maintenance_cost'].fillna(0.0)
+        df['maintenance_steps'] = df['maintenance_steps'].fillna('')
+        df['client_approval'] = df['client_approval'].fillna(0)
+        df['refusal_reason'] = df['refusal_reason'].fillna('')
+        df['pulled'] = df['pulled'].fillna(0)
+        df['delivered'] = df['delivered'].fillna(0)
+        df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+        
+        # Parse datetime columns once, in server time; missing audit dates default to now
+        convert_datetimes(df, ['pull_date', 'delivery_date'], self.import_settings)
+        convert_datetimes(df, ['created_at', 'updated_at'], self.import_settings,
+                          default=server_now(self.import_settings))
+        
+        return df
+    
     def import_ticket_item_maintenance(self, excel_file: str) -> bool:
         """Import ticket item maintenance data from Excel file (TI_Maintenance.xlsx)."""
         try:
             self.logger.info(f"Importing ticket item maintenance from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'ticket_item_maintenance')
@@ -361,106 +643,14 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'product_id', 'product_size', 'pfodcut.ProdcutType', 'maintainace', 'maintanancedescription', 'cost3', 'choice4Accetp', 'choice4refuse', 'choice4refusereason', 'pulled3', 'pulledDate3', 'deleverd3', 'deleverdDate3', 'finalDicition', 'colsedMantananceReq', 'colsedMantananceReqreason', 'create_at', 'update_at', 'create_by']
-            # Database expects: ['ticket_item_id', 'maintenance_steps', 'maintenance_cost', 'client_approval', 'refusal_reason', 'pulled', 'pull_date', 'delivered', 'delivery_date', 'created_by', 'company_id']
-            
-            # Map Excel columns to database columns
-            # Handle duplicate column names by dropping the original ticket_item_id column
-            if 'ticket_item_id' in df.columns and 'id' in df.columns:
-                df = df.drop('ticket_item_id', axis=1)  # Drop original ticket_item_id column
-            
-            df = df.rename(columns={
-                'id': 'ticket_item_id',
-                'maintanancedescription': 'maintenance_steps',
-                'cost3': 'maintenance_cost',
-                'choice4Accetp': 'client_approval',
-                'choice4refusereason': 'refusal_reason',
-                'pulled3': 'pulled',
-                'pulledDate3': 'pull_date',
-                'deleverd3': 'delivered',
-                'deleverdDate3': 'delivery_date',
-                'create_by': 'created_by'
-            })
-            
-            # Add missing columns with default values
-            # Handle all-NaN columns properly
-            if df['company_id'].isna().all():
-                df['company_id'] = DEFAULT_VALUES['company_id']
-            else:
-                df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
-            
-            df['created_at'] = df['create_at']
-            df['updated_at'] = df['update_at']
-            
-            # Fill missing values
-            df['maintenance_cost'] = df['maintenance_cost'].fillna(0.0)
-            df['maintenance_steps'] = df['maintenance_steps'].fillna('')
-            df['client_approval'] = df['client_approval'].fillna(0)
-            df['refusal_reason'] = df['refusal_reason'].fillna('')
-            df['pulled'] = df['pulled'].fillna(0)
-            df['pull_date'] = df['pull_date'].fillna(pd.NaT)
-            df['delivered'] = df['delivered'].fillna(0)
-            df['delivery_date'] = df['delivery_date'].fillna(pd.NaT)
-            df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+            df = self.prepare_ticket_item_maintenance(df)
             
             # Process in batches
             total_records = int(len(df))
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO ticket_item_maintenance (
-                        ticket_item_id, maintenance_steps, maintenance_cost, client_approval, 
-                        refusal_reason, pulled, pull_date, delivered, delivery_date, 
-                        created_by, company_id, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        maintenance_steps = VALUES(maintenance_steps),
-                        maintenance_cost = VALUES(maintenance_cost),
-                        client_approval = VALUES(client_approval),
-                        refusal_reason = VALUES(refusal_reason),
-                        pulled = VALUES(pulled),
-                        pull_date = VALUES(pull_date),
-                        delivered = VALUES(delivered),
-                        delivery_date = VALUES(delivery_date),
-                        updated_at = VALUES(updated_at)
-                    """
-                    # Convert dates to proper format
-                    pull_date = row['pull_date'] if not pd.isna(row['pull_date']) else None
-                    delivery_date = row['delivery_date'] if not pd.isna(row['delivery_date']) else None
-                    created_at = row['created_at'] if not pd.isna(row['created_at']) else pd.Timestamp.now()
-                    updated_at = row['updated_at'] if not pd.isna(row['updated_at']) else pd.Timestamp.now()
-                    
-                    # Convert problematic values using safe conversion functions
-                    ticket_item_id = self.safe_int(row['ticket_item_id'])
-                    maintenance_steps = self.safe_str(row['maintenance_steps'])
-                    maintenance_cost = self.safe_float(row['maintenance_cost'])
-                    client_approval = self.safe_int(row['client_approval'])
-                    refusal_reason = self.safe_str(row['refusal_reason'])
-                    pulled = self.safe_int(row['pulled'])
-                    delivered = self.safe_int(row['delivered'])
-                    created_by = self.safe_int(row['created_by'], DEFAULT_VALUES['created_by'])
-                    company_id = self.safe_int(row['company_id'], DEFAULT_VALUES['company_id'])
-                    
-                    params = (ticket_item_id, maintenance_steps, maintenance_cost, client_approval,
-                             refusal_reason, pulled, pull_date, delivered, delivery_date,
-                             created_by, company_id, created_at, updated_at)
-                    
-                    try:
-                        self.cursor.execute(query, params)
-                    except Exception as e:
-                        self.logger.error(f"Error executing query for row {row['ticket_item_id']}: {e}")
-                        self.logger.error(f"Converted params: {params}")
-                        raise
-                
-                self.connection.commit()
-                batch_num = i//IMPORT_SETTINGS['batch_size'] + 1
-                total_batches = (total_records-1)//IMPORT_SETTINGS['batch_size'] + 1
-                self.logger.info(f"Processed batch {batch_num}/{total_batches}")
+            self._write_rows('ticket_item_maintenance', self.UPSERT_QUERIES['ticket_item_maintenance'],
+                             self.bound_rows('ticket_item_maintenance', df))
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} ticket item maintenance records")
@@ -473,11 +663,46 @@ class EnhancedRequestsDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_ticket_item_change_same(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce ticket item change same data (TI_Change_Same.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'product_id', 'product_size', 'pfodcut.ProdcutType', 'replaceToSameModel', 'cost1', 'choice2Accetp', 'choice2refuse', 'create_at', 'update_at', 'create_by', 'choice2refusereason', 'pulled1', 'pulledDate1', 'deleverd1', 'deleverdDate1', 'pfodcut_replace_size2']
+        # Database expects: ['ticket_item_id', 'product_id', 'product_size', 'cost', 'client_approval', 'refusal_reason', 'pulled', 'pull_date', 'delivered', 'delivery_date', 'created_by', 'company_id']
+        
+        # Map Excel columns to database columns
+        # Handle duplicate column names by dropping the original ticket_item_id column
+        if 'ticket_item_id' in df.columns and 'id' in df.columns:
+            df = df.drop('ticket_item_id', axis=1)  # Drop original ticket_item_id column
+        
+        df = df.rename(columns=self.COLUMN_MAPPINGS['ticket_item_change_same'])
+        
+        # Add missing columns with default values
+        # Handle all-NaN columns properly
+        if df['company_id'].isna().all():
+            df['company_id'] = DEFAULT_VALUES['company_id']
+        else:
+            df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
+        
+        # Fill missing values
+        df['cost'] = df['cost'].fillna(0.0)
+        df['client_approval'] = df['client_approval'].fillna(0)
+        df['refusal_reason'] = df['refusal_reason'].fillna('')
+        df['pulled'] = df['pulled'].fillna(0)
+        df['delivered'] = df['delivered'].fillna(0)
+        df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+        
+        # Parse datetime columns once, in server time; missing audit dates default to now
+        convert_datetimes(df, ['pull_date', 'delivery_date'], self.import_settings)
+        convert_datetimes(df, ['created_at', 'updated_at'], self.import_settings,
+                          default=server_now(self.import_settings))
+        
+        return df
+    
     def import_ticket_item_change_same(self, excel_file: str) -> bool:
         """Import ticket item change same data from Excel file (TI_Change_Same.xlsx)."""
         try:
             self.logger.info(f"Importing ticket item change same from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'ticket_item_change_same')
@@ -486,106 +711,14 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'product_id', 'product_size', 'pfodcut.ProdcutType', 'replaceToSameModel', 'cost1', 'choice2Accetp', 'choice2refuse', 'create_at', 'update_at', 'create_by', 'choice2refusereason', 'pulled1', 'pulledDate1', 'deleverd1', 'deleverdDate1', 'pfodcut_replace_size2']
-            # Database expects: ['ticket_item_id', 'product_id', 'product_size', 'cost', 'client_approval', 'refusal_reason', 'pulled', 'pull_date', 'delivered', 'delivery_date', 'created_by', 'company_id']
-            
-            # Map Excel columns to database columns
-            # Handle duplicate column names by dropping the original ticket_item_id column
-            if 'ticket_item_id' in df.columns and 'id' in df.columns:
-                df = df.drop('ticket_item_id', axis=1)  # Drop original ticket_item_id column
-            
-            df = df.rename(columns={
-                'id': 'ticket_item_id',
-                'product_id': 'product_id',
-                'product_size': 'product_size',
-                'cost1': 'cost',
-                'choice2Accetp': 'client_approval',
-                'choice2refusereason': 'refusal_reason',
-                'pulled1': 'pulled',
-                'pulledDate1': 'pull_date',
-                'deleverd1': 'delivered',
-                'deleverdDate1': 'delivery_date',
-                'create_by': 'created_by'
-            })
-            
-            # Add missing columns with default values
-            # Handle all-NaN columns properly
-            if df['company_id'].isna().all():
-                df['company_id'] = DEFAULT_VALUES['company_id']
-            else:
-                df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
-            
-            df['created_at'] = df['create_at']
-            df['updated_at'] = df['update_at']
-            
-            # Fill missing values
-            df['cost'] = df['cost'].fillna(0.0)
-            df['client_approval'] = df['client_approval'].fillna(0)
-            df['refusal_reason'] = df['refusal_reason'].fillna('')
-            df['pulled'] = df['pulled'].fillna(0)
-            df['pull_date'] = df['pull_date'].fillna(pd.NaT)
-            df['delivered'] = df['delivered'].fillna(0)
-            df['delivery_date'] = df['delivery_date'].fillna(pd.NaT)
-            df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+            df = self.prepare_ticket_item_change_same(df)
             
             # Process in batches
             total_records = int(len(df))
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO ticket_item_change_same (
-                        ticket_item_id, product_id, product_size, cost, client_approval, 
-                        refusal_reason, pulled, pull_date, delivered, delivery_date, 
-                        created_by, company_id, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        product_id = VALUES(product_id),
-                        product_size = VALUES(product_size),
-                        cost = VALUES(cost),
-                        client_approval = VALUES(client_approval),
-                        refusal_reason = VALUES(refusal_reason),
-                        pulled = VALUES(pulled),
-                        pull_date = VALUES(pull_date),
-                        delivered = VALUES(delivered),
-                        delivery_date = VALUES(delivery_date),
-                        updated_at = VALUES(updated_at)
-                    """
-                    # Convert problematic values using safe conversion functions
-                    ticket_item_id = self.safe_int(row['ticket_item_id'])
-                    product_id = self.safe_int(row['product_id'])
-                    product_size = self.safe_str(row['product_size'])
-                    cost = self.safe_float(row['cost'])
-                    client_approval = self.safe_int(row['client_approval'])
-                    refusal_reason = self.safe_str(row['refusal_reason'])
-                    pulled = self.safe_int(row['pulled'])
-                    pull_date = row['pull_date'] if not pd.isna(row['pull_date']) else None
-                    delivered = self.safe_int(row['delivered'])
-                    delivery_date = row['delivery_date'] if not pd.isna(row['delivery_date']) else None
-                    created_by = self.safe_int(row['created_by'], DEFAULT_VALUES['created_by'])
-                    company_id = self.safe_int(row['company_id'], DEFAULT_VALUES['company_id'])
-                    created_at = row['created_at'] if not pd.isna(row['created_at']) else pd.Timestamp.now()
-                    updated_at = row['updated_at'] if not pd.isna(row['updated_at']) else pd.Timestamp.now()
-
-                    params = (ticket_item_id, product_id, product_size, cost, client_approval,
-                             refusal_reason, pulled, pull_date, delivered, delivery_date,
-                             created_by, company_id, created_at, updated_at)
-
-                    try:
-                        self.cursor.execute(query, params)
-                    except Exception as e:
-                        self.logger.error(f"Error executing query for row {row['ticket_item_id']}: {e}")
-                        self.logger.error(f"Converted params: {params}")
-                        raise
-                
-                self.connection.commit()
-                batch_num = i//IMPORT_SETTINGS['batch_size'] + 1
-                total_batches = (total_records-1)//IMPORT_SETTINGS['batch_size'] + 1
-                self.logger.info(f"Processed batch {batch_num}/{total_batches}")
+            self._write_rows('ticket_item_change_same', self.UPSERT_QUERIES['ticket_item_change_same'],
+                             self.bound_rows('ticket_item_change_same', df))
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} ticket item change same records")
@@ -598,11 +731,48 @@ class EnhancedRequestsDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_ticket_item_change_another(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce ticket item change another data (TI_Change_Another.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'product_id', 'pfodcut.ProdcutType', 'replaceTosnotherModel', 'replaceToBrandName', 'replaceToProdcutName', 'cost2', 'choice3Accetp', 'choice3refuse', 'choice3refusereason', 'pulled2', 'pulledDate2', 'deleverd2', 'deleverdDate2', 'create_at', 'update_at', 'create_by']
+        # Database expects: ['ticket_item_id', 'product_id', 'product_size', 'cost', 'client_approval', 'refusal_reason', 'pulled', 'pull_date', 'delivered', 'delivery_date', 'created_by', 'company_id']
+        
+        # Map Excel columns to database columns
+        # Handle duplicate column names by dropping the original ticket_item_id column
+        if 'ticket_item_id' in df.columns and 'id' in df.columns:
+            df = df.drop('ticket_item_id', axis=1)  # Drop original ticket_item_id column
+        
+        df = df.rename(columns=self.COLUMN_MAPPINGS['ticket_item_change_another'])
+        
+        # Add missing columns with default values
+        # Handle all-NaN columns properly
+        if df['company_id'].isna().all():
+            df['company_id'] = DEFAULT_VALUES['company_id']
+        else:
+            df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
+        
+        df['product_size'] = 'Standard'  # Default size since not in Excel
+        
+        # Fill missing values
+        df['cost'] = df['cost'].fillna(0.0)
+        df['client_approval'] = df['client_approval'].fillna(0)
+        df['refusal_reason'] = df['refusal_reason'].fillna('')
+        df['pulled'] = df['pulled'].fillna(0)
+        df['delivered'] = df['delivered'].fillna(0)
+        df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+        
+        # Parse datetime columns once, in server time; missing audit dates default to now
+        convert_datetimes(df, ['pull_date', 'delivery_date'], self.import_settings)
+        convert_datetimes(df, ['created_at', 'updated_at'], self.import_settings,
+                          default=server_now(self.import_settings))
+        
+        return df
+    
     def import_ticket_item_change_another(self, excel_file: str) -> bool:
         """Import ticket item change another data from Excel file (TI_Change_Another.xlsx)."""
         try:
             self.logger.info(f"Importing ticket item change another from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'ticket_item_change_another')
@@ -611,106 +781,14 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'product_id', 'pfodcut.ProdcutType', 'replaceTosnotherModel', 'replaceToBrandName', 'replaceToProdcutName', 'cost2', 'choice3Accetp', 'choice3refuse', 'choice3refusereason', 'pulled2', 'pulledDate2', 'deleverd2', 'deleverdDate2', 'create_at', 'update_at', 'create_by']
-            # Database expects: ['ticket_item_id', 'product_id', 'product_size', 'cost', 'client_approval', 'refusal_reason', 'pulled', 'pull_date', 'delivered', 'delivery_date', 'created_by', 'company_id']
-            
-            # Map Excel columns to database columns
-            # Handle duplicate column names by dropping the original ticket_item_id column
-            if 'ticket_item_id' in df.columns and 'id' in df.columns:
-                df = df.drop('ticket_item_id', axis=1)  # Drop original ticket_item_id column
-            
-            df = df.rename(columns={
-                'id': 'ticket_item_id',
-                'product_id': 'product_id',
-                'cost2': 'cost',
-                'choice3Accetp': 'client_approval',
-                'choice3refusereason': 'refusal_reason',
-                'pulled2': 'pulled',
-                'pulledDate2': 'pull_date',
-                'deleverd2': 'delivered',
-                'deleverdDate2': 'delivery_date',
-                'create_by': 'created_by'
-            })
-            
-            # Add missing columns with default values
-            # Handle all-NaN columns properly
-            if df['company_id'].isna().all():
-                df['company_id'] = DEFAULT_VALUES['company_id']
-            else:
-                df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
-            
-            df['product_size'] = 'Standard'  # Default size since not in Excel
-            df['created_at'] = df['create_at']
-            df['updated_at'] = df['update_at']
-            
-            # Fill missing values
-            df['cost'] = df['cost'].fillna(0.0)
-            df['client_approval'] = df['client_approval'].fillna(0)
-            df['refusal_reason'] = df['refusal_reason'].fillna('')
-            df['pulled'] = df['pulled'].fillna(0)
-            df['pull_date'] = df['pull_date'].fillna(pd.NaT)
-            df['delivered'] = df['delivered'].fillna(0)
-            df['delivery_date'] = df['delivery_date'].fillna(pd.NaT)
-            df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+            df = self.prepare_ticket_item_change_another(df)
             
             # Process in batches
             total_records = int(len(df))
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO ticket_item_change_another (
-                        ticket_item_id, product_id, product_size, cost, client_approval, 
-                        refusal_reason, pulled, pull_date, delivered, delivery_date, 
-                        created_by, company_id, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        product_id = VALUES(product_id),
-                        product_size = VALUES(product_size),
-                        cost = VALUES(cost),
-                        client_approval = VALUES(client_approval),
-                        refusal_reason = VALUES(refusal_reason),
-                        pulled = VALUES(pulled),
-                        pull_date = VALUES(pull_date),
-                        delivered = VALUES(delivered),
-                        delivery_date = VALUES(delivery_date),
-                        updated_at = VALUES(updated_at)
-                    """
-                    # Convert problematic values using safe conversion functions
-                    ticket_item_id = self.safe_int(row['ticket_item_id'])
-                    product_id = self.safe_int(row['product_id'])
-                    product_size = self.safe_str(row['product_size'])
-                    cost = self.safe_float(row['cost'])
-                    client_approval = self.safe_int(row['client_approval'])
-                    refusal_reason = self.safe_str(row['refusal_reason'])
-                    pulled = self.safe_int(row['pulled'])
-                    pull_date = row['pull_date'] if not pd.isna(row['pull_date']) else None
-                    delivered = self.safe_int(row['delivered'])
-                    delivery_date = row['delivery_date'] if not pd.isna(row['delivery_date']) else None
-                    created_by = self.safe_int(row['created_by'], DEFAULT_VALUES['created_by'])
-                    company_id = self.safe_int(row['company_id'], DEFAULT_VALUES['company_id'])
-                    created_at = row['created_at'] if not pd.isna(row['created_at']) else pd.Timestamp.now()
-                    updated_at = row['updated_at'] if not pd.isna(row['updated_at']) else pd.Timestamp.now()
-
-                    params = (ticket_item_id, product_id, product_size, cost, client_approval,
-                             refusal_reason, pulled, pull_date, delivered, delivery_date,
-                             created_by, company_id, created_at, updated_at)
-
-                    try:
-                        self.cursor.execute(query, params)
-                    except Exception as e:
-                        self.logger.error(f"Error executing query for row {row['ticket_item_id']}: {e}")
-                        self.logger.error(f"Converted params: {params}")
-                        raise
-                
-                self.connection.commit()
-                batch_num = i//IMPORT_SETTINGS['batch_size'] + 1
-                total_batches = (total_records-1)//IMPORT_SETTINGS['batch_size'] + 1
-                self.logger.info(f"Processed batch {batch_num}/{total_batches}")
+            self._write_rows('ticket_item_change_another', self.UPSERT_QUERIES['ticket_item_change_another'],
+                             self.bound_rows('ticket_item_change_another', df))
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} ticket item change another records")
@@ -723,11 +801,37 @@ class EnhancedRequestsDataImporter:
                 self.connection.rollback()
             return False
 
+    def prepare_ticket_items(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce ticket items data (ticket_items.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'ticket_ID', 'prductuionManagerdecision', 'product_id', 'pfodcut.ProdcutType', 'product_size', 'quantity', 'purchase_date', 'purchase_location', 'request_reason_id', 'request_reason_detail', 'inspected', 'inspected_date', 'inspected_result', 'client_approval', 'create_by', 'create_at', 'update_at']
+        # Database has: ['id', 'company_id', 'ticket_id', 'product_id', 'product_size', 'quantity', 'purchase_date', 'purchase_location', 'request_reason_id', 'request_reason_detail', 'inspected', 'inspection_date', 'inspection_result', 'client_approval', 'created_by', 'created_at', 'updated_at']
+
+        # Map Excel columns to database columns (only the ones that exist in DB)
+        df = df.rename(columns=self.COLUMN_MAPPINGS['ticket_items'])
+
+        # Add missing columns with default values
+        df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
+        df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
+
+        # Fill missing values
+        df['product_size'] = df['product_size'].fillna('')
+        df['purchase_location'] = df['purchase_location'].fillna('')
+        df['request_reason_detail'] = df['request_reason_detail'].fillna('')
+        df['inspection_result'] = df['inspection_result'].fillna('')
+        
+        # Parse datetime columns once, in server time; missing audit dates default to now
+        convert_datetimes(df, ['purchase_date', 'inspection_date'], self.import_settings)
+        convert_datetimes(df, ['created_at', 'updated_at'], self.import_settings,
+                          default=server_now(self.import_settings))
+        
+        return df
+    
     def import_ticket_items(self, excel_file: str) -> bool:
         """Import ticket items data from Excel file (ticket_items.xlsx)."""
         try:
             self.logger.info(f"Importing ticket items from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
 
             # Validate data
             is_valid, errors = self.validate_data(df, 'ticket_items')
@@ -736,97 +840,14 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
 
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'ticket_ID', 'prductuionManagerdecision', 'product_id', 'pfodcut.ProdcutType', 'product_size', 'quantity', 'purchase_date', 'purchase_location', 'request_reason_id', 'request_reason_detail', 'inspected', 'inspected_date', 'inspected_result', 'client_approval', 'create_by', 'create_at', 'update_at']
-            # Database has: ['id', 'company_id', 'ticket_id', 'product_id', 'product_size', 'quantity', 'purchase_date', 'purchase_location', 'request_reason_id', 'request_reason_detail', 'inspected', 'inspection_date', 'inspection_result', 'client_approval', 'created_by', 'created_at', 'updated_at']
-
-            # Map Excel columns to database columns (only the ones that exist in DB)
-            df = df.rename(columns={
-                'ticket_ID': 'ticket_id',
-                'inspected_date': 'inspection_date',
-                'inspected_result': 'inspection_result',
-                'create_by': 'created_by',
-                'create_at': 'created_at',
-                'update_at': 'updated_at'
-            })
-
-            # Add missing columns with default values
-            df['company_id'] = df['company_id'].fillna(DEFAULT_VALUES['company_id'])
-            df['created_by'] = df['created_by'].fillna(DEFAULT_VALUES['created_by'])
-
-            # Fill missing values
-            df['product_size'] = df['product_size'].fillna('')
-            df['purchase_location'] = df['purchase_location'].fillna('')
-            df['request_reason_detail'] = df['request_reason_detail'].fillna('')
-            df['inspection_result'] = df['inspection_result'].fillna('')
-
+            df = self.prepare_ticket_items(df)
+            
             # Process in batches
             total_records = int(len(df))
             self.stats['total_records'] += total_records
 
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO ticket_items (
-                        id, company_id, ticket_id, product_id, product_size, quantity,
-                        purchase_date, purchase_location, request_reason_id, request_reason_detail,
-                        inspected, inspection_date, inspection_result, client_approval,
-                        created_by, created_at, updated_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        company_id = VALUES(company_id),
-                        ticket_id = VALUES(ticket_id),
-                        product_id = VALUES(product_id),
-                        product_size = VALUES(product_size),
-                        quantity = VALUES(quantity),
-                        purchase_date = VALUES(purchase_date),
-                        purchase_location = VALUES(purchase_location),
-                        request_reason_id = VALUES(request_reason_id),
-                        request_reason_detail = VALUES(request_reason_detail),
-                        inspected = VALUES(inspected),
-                        inspection_date = VALUES(inspection_date),
-                        inspection_result = VALUES(inspection_result),
-                        client_approval = VALUES(client_approval),
-                        created_by = VALUES(created_by),
-                        updated_at = VALUES(updated_at)
-                    """
-                    # Convert problematic values using safe conversion functions
-                    ticket_item_id = self.safe_int(row['id'])
-                    company_id = self.safe_int(row['company_id'], DEFAULT_VALUES['company_id'])
-                    ticket_id = self.safe_int(row['ticket_id'])
-                    product_id = self.safe_int(row['product_id'])
-                    product_size = self.safe_str(row['product_size'])
-                    quantity = self.safe_int(row['quantity'])
-                    purchase_date = row['purchase_date'] if not pd.isna(row['purchase_date']) else None
-                    purchase_location = self.safe_str(row['purchase_location'])
-                    request_reason_id = self.safe_int(row['request_reason_id'])
-                    request_reason_detail = self.safe_str(row['request_reason_detail'])
-                    inspected = self.safe_int(row['inspected'])
-                    inspection_date = row['inspection_date'] if not pd.isna(row['inspection_date']) else None
-                    inspection_result = self.safe_str(row['inspection_result'])
-                    client_approval = self.safe_int(row['client_approval'])
-                    created_by = self.safe_int(row['created_by'], DEFAULT_VALUES['created_by'])
-                    created_at = row['created_at'] if not pd.isna(row['created_at']) else pd.Timestamp.now()
-                    updated_at = row['updated_at'] if not pd.isna(row['updated_at']) else pd.Timestamp.now()
-
-                    params = (ticket_item_id, company_id, ticket_id, product_id, product_size,
-                             quantity, purchase_date, purchase_location, request_reason_id,
-                             request_reason_detail, inspected, inspection_date, inspection_result,
-                             client_approval, created_by, created_at, updated_at)
-
-                    try:
-                        self.cursor.execute(query, params)
-                    except Exception as e:
-                        self.logger.error(f"Error executing query for row {row['id']}: {e}")
-                        self.logger.error(f"Converted params: {params}")
-                        raise
-
-                self.connection.commit()
-                batch_num = i//IMPORT_SETTINGS['batch_size'] + 1
-                total_batches = (total_records-1)//IMPORT_SETTINGS['batch_size'] + 1
-                self.logger.info(f"Processed batch {batch_num}/{total_batches}")
+            self._write_rows('ticket_items', self.UPSERT_QUERIES['ticket_items'],
+                             self.bound_rows('ticket_items', df))
 
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} ticket items")
@@ -839,8 +860,131 @@ class EnhancedRequestsDataImporter:
                 self.connection.rollback()
             return False
 
-    def run_import(self, data_folder: str) -> bool:
-        """Run the complete requests data import process."""
+    def _read_workbooks(self, files: Dict[str, str]) -> Dict[str, object]:
+        """Parse several workbooks at once; maps each name to its DataFrame or the exception raised.
+
+        Staged copies from the parse workers are used when there are any;
+        otherwise each workbook is parsed in its own process, CPUs permitting.
+        """
+        frames = {}
+        workers = min(len(files), os.cpu_count() or 1)
+        if self.staged_workbooks or workers < 2:
+            for name, excel_file in files.items():
+                try:
+                    frames[name] = self._read_workbook(excel_file)
+                except Exception as e:
+                    frames[name] = e
+            return frames
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(pd.read_excel, excel_file) for name, excel_file in files.items()}
+            for name, future in futures.items():
+                try:
+                    frames[name] = future.result()
+                except Exception as e:
+                    frames[name] = e
+        return frames
+    
+    def _existing_ticket_items(self, ids: List[int]) -> set:
+        """The ids among ``ids`` that ticket_items already holds.
+
+        Without a database to ask (snapshot writers) every id is taken as
+        existing and left to the writer.
+        """
+        if self.writer is not None and self.writer.uses_snapshot:
+            return set(ids)
+        batch_size = self.import_settings['batch_size']
+        existing = set()
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            self.cursor.execute(f"SELECT id FROM ticket_items WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+            existing.update(row[0] for row in self.cursor.fetchall())
+        return existing
+    
+    def import_ticket_item_family(self, data_folder: str, table_names: List[str]) -> Dict[str, Optional[bool]]:
+        """Import ticket_items and its child workbooks together; returns the outcome of each table.
+
+        The workbooks are parsed concurrently and validated and prepared up
+        front. ticket_items is written first; each child row is then matched
+        to the ticket item ids just written, and ids not among them are looked
+        up in the database once for all children. Child rows whose ticket item
+        exists in neither are rejected before any statement is sent (they
+        would fail the foreign key) and the rest are written table by table.
+        """
+        results, files = {}, {}
+        for table_name, excel_file, _ in self.IMPORT_TASKS:
+            if table_name in table_names:
+                files[table_name] = os.path.join(data_folder, excel_file)
+                if not os.path.exists(files[table_name]):
+                    self.logger.warning(f"Excel file not found: {files.pop(table_name)}")
+                    results[table_name] = None
+        
+        self.logger.info(f"Importing {', '.join(files)} together from {data_folder}")
+        prepared = {}
+        for table_name, df in self._read_workbooks(files).items():
+            try:
+                if isinstance(df, Exception):
+                    raise df
+                is_valid, errors = self.validate_data(df, table_name)
+                if not is_valid:
+                    for error in errors:
+                        self.logger.error(f"Validation error: {error}")
+                    continue
+                prepared[table_name] = getattr(self, f'prepare_{table_name}')(df)
+            except Exception as e:
+                self.logger.error(f"Error reading {table_name}: {e}")
+        
+        written, resolved = pd.Index([], dtype='int64'), False
+        for table_name in files:
+            if table_name != 'ticket_items' and not resolved:
+                # One lookup for every child id the parent workbook did not provide
+                unknown = pd.Index([], dtype='int64')
+                for child_name, child in prepared.items():
+                    if child_name != 'ticket_items':
+                        unknown = unknown.union(pd.Index(self.safe_int_column(child['ticket_item_id'])).difference(written))
+                written, resolved = written.union(sorted(self._existing_ticket_items(unknown.tolist()))), True
+            
+            self.logger.info(f"Starting import for {table_name}...")
+            self._table_started(table_name, files[table_name])
+            success = table_name in prepared
+            if success:
+                df, query = prepared.pop(table_name), self.UPSERT_QUERIES[table_name]
+                try:
+                    if table_name == 'ticket_items':
+                        rows = self.bound_rows(table_name, df)
+                        rejected = self._write_rows(table_name, query, rows)
+                        written = pd.Index([row[0] for row in rows]).difference([row[0] for row, _ in rejected])
+                    else:
+                        known = pd.Index(self.safe_int_column(df['ticket_item_id'])).isin(written)
+                        orphans = [
+                            (row, "ticket_item_id not found in ticket_items.xlsx or the database")
+                            for row in self.bound_rows(table_name, df[~known])
+                        ] if not known.all() else []
+                        df = df[known]
+                        self._write_rows(table_name, query, self.bound_rows(table_name, df), rejects=orphans)
+                    self.stats['total_records'] += len(df)
+                    self.stats['successful_imports'] += 1
+                    self.logger.info(f"Successfully imported {len(df)} {table_name.replace('_', ' ')} records")
+                except Exception as e:
+                    self.logger.error(f"Error importing {table_name.replace('_', ' ')}: {e}")
+                    if self.connection:
+                        self.connection.rollback()
+                    success = False
+            if not success:
+                self.stats['failed_imports'] += 1
+            self._table_finished(table_name, success)
+            results[table_name] = success
+            if success:
+                self.logger.info(f"SUCCESS: Successfully imported {table_name}")
+            else:
+                self.logger.error(f"FAILED: Failed to import {table_name}")
+        return results
+    
+    def run_import(self, data_folder: str, task_names: Optional[List[str]] = None) -> bool:
+        """Run the complete requests data import process.
+
+        ``task_names`` limits the run to those tables of IMPORT_TASKS; the
+        outcome of each task is recorded in ``task_results``.
+        """
         self.stats['start_time'] = datetime.now()
         
         try:
@@ -854,32 +998,43 @@ class EnhancedRequestsDataImporter:
                     self.logger.error(f"Required table {table} does not exist")
                     return False
             
-            # Define import order (respecting foreign key constraints)
-            import_tasks = [
-                ('request_reasons', 'reqreqson.xlsx', self.import_request_reasons),
-                ('product_info', 'ProductName.xlsx', self.import_product_info),
-                ('ticket_items', 'ticket_items.xlsx', self.import_ticket_items),
-                ('ticket_item_maintenance', 'TI_Maintenance.xlsx', self.import_ticket_item_maintenance),
-                ('ticket_item_change_same', 'TI_Change_Same.xlsx', self.import_ticket_item_change_same),
-                ('ticket_item_change_another', 'TI_Change_Another.xlsx', self.import_ticket_item_change_another)
-            ]
+            tasks = [task for task in self.IMPORT_TASKS if not task_names or task[0] in task_names]
+            total_tasks = len(tasks)
+            # ticket_items and its children go through import_ticket_item_family together,
+            # unless a memory budget asks for the workbooks to be read one at a time
+            family = [task[0] for task in tasks if task[0] == 'ticket_items' or task[0] in self.TICKET_ITEM_CHILDREN]
+            if not (self.import_settings.get('combined_ticket_items', True) and 'ticket_items' in family
+                    and len(family) > 1 and not self.import_settings.get('memory_limit_mb')):
+                family = []
             
-            success_count = 0
-            total_tasks = len(import_tasks)
-            
-            for table_name, excel_file, import_func in import_tasks:
+            for table_name, excel_file, method_name in tasks:
+                if table_name in family:
+                    if table_name == 'ticket_items':
+                        self.task_results.update(self.import_ticket_item_family(data_folder, family))
+                    continue
+                
                 file_path = os.path.join(data_folder, excel_file)
+                import_func = getattr(self, method_name)
                 
                 if not os.path.exists(file_path):
                     self.logger.warning(f"Excel file not found: {file_path}")
+                    self.task_results[table_name] = None
                     continue
                 
                 self.logger.info(f"Starting import for {table_name}...")
-                if import_func(file_path):
-                    success_count += 1
+                self._table_started(table_name, file_path)
+                success = self._run_import_task(file_path, import_func)
+                self._table_finished(table_name, success)
+                if success:
+                    self.task_results[table_name] = True
                     self.logger.info(f"SUCCESS: Successfully imported {table_name}")
                 else:
+                    self.task_results[table_name] = False
                     self.logger.error(f"FAILED: Failed to import {table_name}")
+            success_count = sum(1 for task in tasks if self.task_results.get(task[0]))
+            
+            if IMPORT_SETTINGS.get('analyze_after_import', True) and self.changed_tables:
+                self.analyze_changed_tables()
             
             self.stats['end_time'] = datetime.now()
             self._print_summary(success_count, total_tasks)
@@ -903,6 +1058,10 @@ class EnhancedRequestsDataImporter:
         self.logger.info(f"Successful imports: {success_count}")
         self.logger.info(f"Failed imports: {total_tasks - success_count}")
         self.logger.info(f"Total records processed: {self.stats['total_records']}")
+        self.logger.info(f"Rejected rows: {self.stats['rejected_rows']}")
+        self.logger.info(f"Lock conflict retries: {self.stats['lock_retries']}")
+        self.logger.info(f"Reconnects: {self.stats['reconnects']}")
+        self.logger.info(f"Statistics refresh: {len(self.stats['analyze_seconds'])} tables in {sum(self.stats['analyze_seconds'].values()):.2f}s")
         self.logger.info(f"Total time: {duration}")
         self.logger.info(f"Average time per record: {duration / max(self.stats['total_records'], 1)}")
         self.logger.info("=" * 60)
@@ -911,9 +1070,16 @@ class EnhancedRequestsDataImporter:
         stats_file = f'requests_import_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
         with open(stats_file, 'w', encoding='utf-8') as f:
             json.dump({
+                'importer': type(self).__module__,
+                'writer': self.import_settings.get('writer', 'mysql'),
                 'success_count': success_count,
                 'total_tasks': total_tasks,
                 'total_records': self.stats['total_records'],
+                'rejected_rows': self.stats['rejected_rows'],
+                'lock_retries': self.stats['lock_retries'],
+                'reconnects': self.stats['reconnects'],
+                'analyze_seconds': self.stats['analyze_seconds'],
+                'tables': self.stats['tables'],
                 'start_time': self.stats['start_time'].isoformat(),
                 'end_time': self.stats['end_time'].isoformat(),
                 'duration_seconds': duration.total_seconds()
@@ -923,6 +1089,47 @@ class EnhancedRequestsDataImporter:
 
 def main():
     """Main function to run the enhanced requests data import."""
+    parser = argparse.ArgumentParser(description="Import requests data from Excel into JanssenCRM")
+    parser.add_argument('--async-writers', type=int, default=None,
+                        help="Number of concurrent batch writers (0 or 1 writes sequentially)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Parse, map and validate the Excel files without connecting to the database")
+    parser.add_argument('--update-histograms', action='store_true',
+                        help="Also refresh histograms on status, company_id and created_at after the import")
+    parser.add_argument('--progress-events', default=None,
+                        help="Write JSON progress events to a file, tcp://host:port or unix:///path")
+    parser.add_argument('--writer', default=None,
+                        help="Writer backend: mysql, mysql-statement, null, recording[:file], sqlite[:file] or sqldump[:file.sql.gz]")
+    parser.add_argument('--sort-by-key', action='store_true',
+                        help="Write every table in primary-key order")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="Memory budget in MB; larger workbooks are spilled to disk and imported in partitions")
+    parser.add_argument('--transactions', type=parse_transaction_strategies, default=None,
+                        help="Commit strategy: batch, table or savepoint, for all tables or per table "
+                             "(e.g. 'batch,governorates=table')")
+    parser.add_argument('--savepoint-rows', type=int, default=None,
+                        help="Rows between savepoints with the savepoint strategy")
+    args = parser.parse_args()
+    
+    if args.update_histograms:
+        IMPORT_SETTINGS['update_histograms'] = True
+    if args.progress_events:
+        IMPORT_SETTINGS['progress_events'] = args.progress_events
+    if args.writer:
+        IMPORT_SETTINGS['writer'] = args.writer
+    if args.sort_by_key:
+        IMPORT_SETTINGS['sort_by_key'] = True
+    if args.memory_limit:
+        IMPORT_SETTINGS['memory_limit_mb'] = args.memory_limit
+    if args.transactions:
+        default_strategy, table_strategies = args.transactions
+        if default_strategy:
+            IMPORT_SETTINGS['transaction_strategy'] = default_strategy
+        IMPORT_SETTINGS['transaction_strategies'] = {**IMPORT_SETTINGS.get('transaction_strategies', {}),
+                                                     **table_strategies}
+    if args.savepoint_rows:
+        IMPORT_SETTINGS['savepoint_rows'] = args.savepoint_rows
+    
     # Data folder path
     data_folder = os.path.join(os.path.dirname(__file__), 'data', 'requests')
     
@@ -931,8 +1138,15 @@ def main():
         print(f"Error: Data folder not found: {data_folder}")
         sys.exit(1)
     
+    if args.dry_run:
+        from import_dry_run import print_report, run_dry_run, save_report
+        report = run_dry_run({'requests': data_folder})
+        print_report(report)
+        print(f"Dry-run report saved to: {save_report(report)}")
+        sys.exit(0 if report['ok'] else 1)
+    
     # Create importer instance
-    importer = EnhancedRequestsDataImporter()
+    importer = EnhancedRequestsDataImporter(async_writers=args.async_writers)
     
     # Run import
     print("Starting Enhanced JanssenCRM Requests Data import process...")
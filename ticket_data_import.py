@@ -14,15 +14,18 @@ Features:
 
 
 import pandas as pd
-import mysql.connector
 from mysql.connector import Error
 import os
+import re
 import sys
 from datetime import datetime
 import logging
 import time
 from typing import Dict, List, Tuple, Optional
 import json
+import argparse
+
+from import_common import BatchWriterMixin, convert_datetimes, parse_transaction_strategies, server_now
 
 # Import configuration
 try:
@@ -41,7 +44,31 @@ except ImportError:
     IMPORT_SETTINGS = {
         'batch_size': 1000,
         'max_retries': 3,
-        'log_level': 'INFO'
+        'log_level': 'INFO',
+        'async_writers': 0,
+        'shard_writers': 0,
+        'shard_mode': 'range',
+        'reject_folder': 'rejects',
+        'reject_format': 'csv',
+        'analyze_after_import': True,
+        'update_histograms': False,
+        'histogram_columns': ['status', 'company_id', 'created_at'],
+        'histogram_buckets': 100,
+        'server_timezone': 'Africa/Cairo',
+        'source_timezone': None,
+        'progress_events': None,
+        'progress_log_seconds': 5,
+        'writer': 'mysql',
+        'sort_by_key': False,
+        'spill_folder': None,
+        'memory_limit_mb': None,
+        'transaction_strategy': 'batch',
+        'transaction_strategies': {},
+        'savepoint_rows': 50000,
+        'partition_exchange': False,
+        'exchange_min_rows': 100000,
+        'key_index': None,
+        'key_conflicts': 'report'
     }
     DEFAULT_VALUES = {
         'company_id': 0,
@@ -56,16 +83,60 @@ except ImportError:
         'ticket_priority': 0
     }
 
-class EnhancedTicketDataImporter:
-    def __init__(self, config: Dict = None):
+class EnhancedTicketDataImporter(BatchWriterMixin):
+    # Import order (respecting foreign key constraints): (table name, Excel file, import method)
+    IMPORT_TASKS = [
+        ('call_categories', 'callReason_tickets.xlsx', 'import_call_categories'),
+        ('ticket_categories', 'TicketType.xlsx', 'import_ticket_categories'),
+        ('tickets', 'tickets.xlsx', 'import_tickets'),
+        ('ticket_calls', 'ticket_calls.xlsx', 'import_ticket_calls')
+    ]
+    
+    # Excel header -> database column renames applied by each prepare_* method;
+    # data_export.py applies them in reverse
+    COLUMN_MAPPINGS = {
+        'call_categories': {
+            'callReason': 'name',
+            'callReason_id': 'id'
+        },
+        'ticket_categories': {
+            'TicketType': 'name',
+            'TicketType_ID': 'id'
+        },
+        'tickets': {'Customer_ID': 'customer_id'},
+        'ticket_calls': {
+            'ticket_ID': 'ticket_id',
+            'calltype_id': 'call_type',
+            'callReason_id': 'call_cat_id',
+            'callresult': 'description',
+            'datetime': 'created_at',
+            'callRecipient_id': 'created_by',
+            'notes': 'call_notes'
+        }
+    }
+    
+    def __init__(self, config: Dict = None, async_writers: Optional[int] = None, dry_run: bool = False,
+                 shard_writers: Optional[int] = None):
         """Initialize the enhanced ticket data importer."""
         self.config = config or DATABASE_CONFIG
         self.connection = None
         self.cursor = None
+        self.import_settings = IMPORT_SETTINGS
+        self.dry_run = dry_run
+        self.async_writers = async_writers if async_writers is not None else IMPORT_SETTINGS.get('async_writers', 0)
+        self.shard_writers = shard_writers if shard_writers is not None else IMPORT_SETTINGS.get('shard_writers', 0)
+        self.changed_tables = set()
+        self.task_results = {}
+        self.write_progress = {}
         self.stats = {
             'total_records': 0,
             'successful_imports': 0,
             'failed_imports': 0,
+            'rejected_rows': 0,
+            'lock_retries': 0,
+            'reconnects': 0,
+            'analyze_seconds': {},
+            'tables': {},
             'start_time': None,
             'end_time': None
         }
@@ -77,13 +148,16 @@ class EnhancedTicketDataImporter:
         """Setup logging configuration."""
         log_level = getattr(logging, IMPORT_SETTINGS['log_level'])
         
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if not self.dry_run and not logging.getLogger().handlers:
+            # Dry runs touch no database, so they leave no log file behind either;
+            # under import_cli.py the log file is already open
+            handlers.insert(0, logging.FileHandler(f'ticket_data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'))
+        
         logging.basicConfig(
             level=log_level,
             format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'ticket_data_import_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'),
-                logging.StreamHandler(sys.stdout)
-            ]
+            handlers=handlers
         )
         self.logger = logging.getLogger(__name__)
         
@@ -91,7 +165,7 @@ class EnhancedTicketDataImporter:
         """Establish database connection with retry logic."""
         for attempt in range(IMPORT_SETTINGS['max_retries']):
             try:
-                self.connection = mysql.connector.connect(**self.config)
+                self.connection = self._new_connection()
                 self.cursor = self.connection.cursor()
                 self.logger.info("Successfully connected to database")
                 return True
@@ -110,6 +184,7 @@ class EnhancedTicketDataImporter:
             self.cursor.close()
         if self.connection:
             self.connection.close()
+        self._close_writer()
         self.logger.info("Database connection closed")
     
     def disable_audit_triggers(self):
@@ -198,8 +273,8 @@ class EnhancedTicketDataImporter:
             END;
             """
             
-            # Execute each trigger creation separately
-            trigger_statements = audit_triggers_sql.split(';')
+            # Execute each trigger creation separately; the bodies contain ';' themselves
+            trigger_statements = re.split(r'(?<=\bEND);', audit_triggers_sql)
             for statement in trigger_statements:
                 statement = statement.strip()
                 if statement:
@@ -218,6 +293,8 @@ class EnhancedTicketDataImporter:
     def check_table_exists(self, table_name: str) -> bool:
         """Check if a table exists in the database."""
         try:
+            if self.schema_cache is not None:
+                return self.schema_cache.table_exists(self.cursor, table_name)
             query = "SHOW TABLES LIKE %s"
             self.cursor.execute(query, (table_name,))
             result = self.cursor.fetchone()
@@ -388,11 +465,31 @@ class EnhancedTicketDataImporter:
         
         return len(errors) == 0, errors
     
+    def prepare_call_categories(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce call categories data (callReason_tickets.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['callReason', 'callReason_id']
+        # Database expects: ['id', 'name', 'created_by', 'company_id']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['call_categories'])
+        
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in call reason names. Please check the Excel file.")
+        
+        # Add missing columns with default values
+        df_mapped['created_by'] = DEFAULT_VALUES['created_by']
+        df_mapped['company_id'] = DEFAULT_VALUES['company_id']
+        now = server_now(self.import_settings)
+        df_mapped['created_at'] = now
+        df_mapped['updated_at'] = now
+        
+        return df_mapped
+    
     def import_call_categories(self, excel_file: str) -> bool:
         """Import call categories data from Excel file (callReason_tickets.xlsx)."""
         try:
             self.logger.info(f"Importing call categories from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'call_categories')
@@ -401,47 +498,28 @@ class EnhancedTicketDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['callReason', 'callReason_id']
-            # Database expects: ['id', 'name', 'created_by', 'company_id']
-            df_mapped = df.rename(columns={
-                'callReason': 'name',
-                'callReason_id': 'id'
-            })
-            
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in call reason names. Please check the Excel file.")
-                return False
-            
-            # Add missing columns with default values
-            df_mapped['created_by'] = DEFAULT_VALUES['created_by']
-            df_mapped['company_id'] = DEFAULT_VALUES['company_id']
-            df_mapped['created_at'] = datetime.now()
-            df_mapped['updated_at'] = datetime.now()
+            df_mapped = self.prepare_call_categories(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO call_categories (id, name, created_by, company_id, created_at, updated_at) 
-                    VALUES (%s, %s, %s, %s, %s, %s) 
-                    ON DUPLICATE KEY UPDATE 
-                        name = VALUES(name),
-                        created_by = VALUES(created_by),
-                        company_id = VALUES(company_id),
-                        updated_at = VALUES(updated_at)
-                    """
-                    self.cursor.execute(query, (row['id'], row['name'], row['created_by'], 
-                                               row['company_id'], row['created_at'], row['updated_at']))
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO call_categories (id, name, created_by, company_id, created_at, updated_at) 
+            VALUES (%s, %s, %s, %s, %s, %s) 
+            ON DUPLICATE KEY UPDATE 
+                name = VALUES(name),
+                created_by = VALUES(created_by),
+                company_id = VALUES(company_id),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._in_key_order('call_categories', df_mapped)
+            rows = [
+                (row['id'], row['name'], row['created_by'], 
+                 row['company_id'], row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            self._write_rows('call_categories', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} call categories")
@@ -454,11 +532,31 @@ class EnhancedTicketDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_ticket_categories(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce ticket categories data (TicketType.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['TicketType', 'TicketType_ID']
+        # Database expects: ['id', 'name', 'created_by', 'company_id']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['ticket_categories'])
+        
+        # Check for null values in name column
+        if df_mapped['name'].isnull().any():
+            raise ValueError("Found null values in ticket type names. Please check the Excel file.")
+        
+        # Add missing columns with default values
+        df_mapped['created_by'] = DEFAULT_VALUES['created_by']
+        df_mapped['company_id'] = DEFAULT_VALUES['company_id']
+        now = server_now(self.import_settings)
+        df_mapped['created_at'] = now
+        df_mapped['updated_at'] = now
+        
+        return df_mapped
+    
     def import_ticket_categories(self, excel_file: str) -> bool:
         """Import ticket categories data from Excel file (TicketType.xlsx)."""
         try:
             self.logger.info(f"Importing ticket categories from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'ticket_categories')
@@ -467,47 +565,28 @@ class EnhancedTicketDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['TicketType', 'TicketType_ID']
-            # Database expects: ['id', 'name', 'created_by', 'company_id']
-            df_mapped = df.rename(columns={
-                'TicketType': 'name',
-                'TicketType_ID': 'id'
-            })
-            
-            # Check for null values in name column
-            if df_mapped['name'].isnull().any():
-                self.logger.error("Found null values in ticket type names. Please check the Excel file.")
-                return False
-            
-            # Add missing columns with default values
-            df_mapped['created_by'] = DEFAULT_VALUES['created_by']
-            df_mapped['company_id'] = DEFAULT_VALUES['company_id']
-            df_mapped['created_at'] = datetime.now()
-            df_mapped['updated_at'] = datetime.now()
+            df_mapped = self.prepare_ticket_categories(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO ticket_categories (id, name, created_by, company_id, created_at, updated_at) 
-                    VALUES (%s, %s, %s, %s, %s, %s) 
-                    ON DUPLICATE KEY UPDATE 
-                        name = VALUES(name),
-                        created_by = VALUES(created_by),
-                        company_id = VALUES(company_id),
-                        updated_at = VALUES(updated_at)
-                    """
-                    self.cursor.execute(query, (row['id'], row['name'], row['created_by'], 
-                                               row['company_id'], row['created_at'], row['updated_at']))
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO ticket_categories (id, name, created_by, company_id, created_at, updated_at) 
+            VALUES (%s, %s, %s, %s, %s, %s) 
+            ON DUPLICATE KEY UPDATE 
+                name = VALUES(name),
+                created_by = VALUES(created_by),
+                company_id = VALUES(company_id),
+                updated_at = VALUES(updated_at)
+            """
+            df_mapped = self._in_key_order('ticket_categories', df_mapped)
+            rows = [
+                (row['id'], row['name'], row['created_by'], 
+                 row['company_id'], row['created_at'], row['updated_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            self._write_rows('ticket_categories', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} ticket categories")
@@ -520,11 +599,53 @@ class EnhancedTicketDataImporter:
                 self.connection.rollback()
             return False
     
+    def prepare_tickets(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce tickets data (tickets.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'company_id', 'Customer_ID', 'ticket_cat_id', 'description', 'status', 'Ticketresolved', 'notes', 'priority', 'created_by', 'created_at', 'closed_at', 'updated_at']
+        # Database expects: ['id', 'company_id', 'customer_id', 'ticket_cat_id', 'description', 'status', 'priority', 'created_by', 'created_at', 'closed_at', 'updated_at', 'closing_notes', 'closed_by']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['tickets'])
+        
+        # Check for null values in required columns
+        if df_mapped['customer_id'].isnull().any():
+            raise ValueError("Found null values in customer_id. Please check the Excel file.")
+        
+        if df_mapped['created_at'].isnull().any():
+            raise ValueError("Found null values in created_at. Please check the Excel file.")
+        
+        # Handle missing values and data types
+        df_mapped['company_id'] = df_mapped['company_id'].fillna(DEFAULT_VALUES['company_id']).astype('Int64')
+        df_mapped['ticket_cat_id'] = df_mapped['ticket_cat_id'].fillna(1).astype('Int64')  # Default to first category
+        df_mapped['status'] = df_mapped['status'].fillna(DEFAULT_VALUES['ticket_status']).astype('Int64')
+        df_mapped['priority'] = df_mapped['priority'].fillna(DEFAULT_VALUES['ticket_priority']).astype('Int64')
+        df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype('Int64')
+        
+        # Parse datetime columns once, in server time, with NULL for empty cells
+        convert_datetimes(df_mapped, ['created_at', 'closed_at', 'updated_at'], self.import_settings)
+        
+        # Fill missing description with empty string
+        df_mapped['description'] = df_mapped['description'].fillna('')
+        
+        # Fill missing closing_notes and closed_by with null
+        df_mapped['closing_notes'] = None
+        df_mapped['closed_by'] = None
+        
+        # Ensure all numeric columns are integers, handling NaN values properly
+        df_mapped['id'] = df_mapped['id'].astype('Int64')
+        df_mapped['company_id'] = df_mapped['company_id'].astype('Int64')
+        df_mapped['customer_id'] = df_mapped['customer_id'].astype('Int64')
+        df_mapped['ticket_cat_id'] = df_mapped['ticket_cat_id'].astype('Int64')
+        df_mapped['status'] = df_mapped['status'].astype('Int64')
+        df_mapped['priority'] = df_mapped['priority'].astype('Int64')
+        df_mapped['created_by'] = df_mapped['created_by'].astype('Int64')
+        
+        return df_mapped
+    
     def import_tickets(self, excel_file: str) -> bool:
         """Import tickets data from Excel file (tickets.xlsx)."""
         try:
             self.logger.info(f"Importing tickets from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'tickets')
@@ -533,97 +654,47 @@ class EnhancedTicketDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'company_id', 'Customer_ID', 'ticket_cat_id', 'description', 'status', 'Ticketresolved', 'notes', 'priority', 'created_by', 'created_at', 'closed_at', 'updated_at']
-            # Database expects: ['id', 'company_id', 'customer_id', 'ticket_cat_id', 'description', 'status', 'priority', 'created_by', 'created_at', 'closed_at', 'updated_at', 'closing_notes', 'closed_by']
-            df_mapped = df.rename(columns={
-                'Customer_ID': 'customer_id'
-            })
-            
-            # Check for null values in required columns
-            if df_mapped['customer_id'].isnull().any():
-                self.logger.error("Found null values in customer_id. Please check the Excel file.")
-                return False
-            
-            if df_mapped['created_at'].isnull().any():
-                self.logger.error("Found null values in created_at. Please check the Excel file.")
-                return False
-            
-            # Handle missing values and data types
-            df_mapped['company_id'] = df_mapped['company_id'].fillna(DEFAULT_VALUES['company_id']).astype('Int64')
-            df_mapped['ticket_cat_id'] = df_mapped['ticket_cat_id'].fillna(1).astype('Int64')  # Default to first category
-            df_mapped['status'] = df_mapped['status'].fillna(DEFAULT_VALUES['ticket_status']).astype('Int64')
-            df_mapped['priority'] = df_mapped['priority'].fillna(DEFAULT_VALUES['ticket_priority']).astype('Int64')
-            df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype('Int64')
-            
-            # Convert datetime columns
-            df_mapped['created_at'] = pd.to_datetime(df_mapped['created_at'])
-            df_mapped['updated_at'] = pd.to_datetime(df_mapped['updated_at'])
-            
-            # Fill missing description with empty string
-            df_mapped['description'] = df_mapped['description'].fillna('')
-            
-            # Fill missing closing_notes and closed_by with null
-            df_mapped['closing_notes'] = None
-            df_mapped['closed_by'] = None
-            
-            # Ensure all numeric columns are integers, handling NaN values properly
-            df_mapped['id'] = df_mapped['id'].astype('Int64')
-            df_mapped['company_id'] = df_mapped['company_id'].astype('Int64')
-            df_mapped['customer_id'] = df_mapped['customer_id'].astype('Int64')
-            df_mapped['ticket_cat_id'] = df_mapped['ticket_cat_id'].astype('Int64')
-            df_mapped['status'] = df_mapped['status'].astype('Int64')
-            df_mapped['priority'] = df_mapped['priority'].astype('Int64')
-            df_mapped['created_by'] = df_mapped['created_by'].astype('Int64')
+            df_mapped = self.prepare_tickets(df)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO tickets (
-                        id, company_id, customer_id, ticket_cat_id, description, 
-                        status, priority, created_by, created_at, 
-                        closed_at, updated_at, closing_notes, closed_by
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        company_id = VALUES(company_id),
-                        customer_id = VALUES(customer_id),
-                        ticket_cat_id = VALUES(ticket_cat_id),
-                        description = VALUES(description),
-                        status = VALUES(status),
-                        priority = VALUES(priority),
-                        closed_at = VALUES(closed_at),
-                        updated_at = VALUES(updated_at),
-                        closing_notes = VALUES(closing_notes),
-                        closed_by = VALUES(closed_by)
-                    """
-                    
-                    values = (
-                        int(row['id']), int(row['company_id']), int(row['customer_id']),
-                        int(row['ticket_cat_id']), str(row['description']), int(row['status']),
-                        int(row['priority']), int(row['created_by']), 
-                        row['created_at'].to_pydatetime() if pd.notna(row['created_at']) else None,
-                        row['closed_at'].to_pydatetime() if pd.notna(row['closed_at']) else None,
-                        row['updated_at'].to_pydatetime() if pd.notna(row['updated_at']) else None,
-                        str(row['closing_notes']) if pd.notna(row['closing_notes']) else None, 
-                        int(row['closed_by']) if pd.notna(row['closed_by']) else None
-                    )
-                    
-                    # Debug: Print first row values
-                    if _ == batch.index[0]:
-                        self.logger.info(f"Sample values for first row: {values}")
-                        self.logger.info(f"Number of placeholders: {query.count('%s')}")
-                        self.logger.info(f"Number of values: {len(values)}")
-                    
-                    self.cursor.execute(query, values)
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            query = """
+            INSERT INTO tickets (
+                id, company_id, customer_id, ticket_cat_id, description, 
+                status, priority, created_by, created_at, 
+                closed_at, updated_at, closing_notes, closed_by
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+                company_id = VALUES(company_id),
+                customer_id = VALUES(customer_id),
+                ticket_cat_id = VALUES(ticket_cat_id),
+                description = VALUES(description),
+                status = VALUES(status),
+                priority = VALUES(priority),
+                closed_at = VALUES(closed_at),
+                updated_at = VALUES(updated_at),
+                closing_notes = VALUES(closing_notes),
+                closed_by = VALUES(closed_by)
+            """
+            df_mapped = self._in_key_order('tickets', df_mapped)
+            rows = [
+                (
+                    int(row['id']), int(row['company_id']), int(row['customer_id']),
+                    int(row['ticket_cat_id']), str(row['description']), int(row['status']),
+                    int(row['priority']), int(row['created_by']), 
+                    row['created_at'], row['closed_at'], row['updated_at'],
+                    str(row['closing_notes']) if pd.notna(row['closing_notes']) else None, 
+                    int(row['closed_by']) if pd.notna(row['closed_by']) else None
+                )
+                for _, row in df_mapped.iterrows()
+            ]
+            
+            if rows:
+                self.logger.debug(f"Sample values for first row: {rows[0]}")
+            
+            self._write_rows('tickets', query, rows)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} tickets")
@@ -636,18 +707,54 @@ class EnhancedTicketDataImporter:
                 self.connection.rollback()
             return False
     
+    def drop_duplicate_ticket_calls(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Handle duplicate IDs by keeping only the first occurrence."""
+        if df['id'].duplicated().any():
+            duplicate_count = df['id'].duplicated().sum()
+            self.logger.warning(f"Found {duplicate_count} duplicate IDs. Keeping only the first occurrence of each.")
+            df = df.drop_duplicates(subset=['id'], keep='first')
+            self.logger.info(f"After removing duplicates: {len(df)} records remaining")
+        return df
+    
+    def prepare_ticket_calls(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Map and coerce ticket calls data (ticket_calls.xlsx) into database columns."""
+        # Map Excel columns to database columns
+        # Excel has: ['id', 'ticket_ID', 'Customer_ID', 'callRecipient_id', 'calltype_id', 'callReason_id', 'datetime', 'callresult', 'notes']
+        # Database expects: ['id', 'company_id', 'ticket_id', 'call_type', 'call_cat_id', 'description', 'call_notes', 'call_duration', 'created_by', 'created_at']
+        df_mapped = df.rename(columns=self.COLUMN_MAPPINGS['ticket_calls'])
+        
+        # Check for null values in required columns
+        if df_mapped['ticket_id'].isnull().any():
+            raise ValueError("Found null values in ticket_id. Please check the Excel file.")
+        
+        if df_mapped['created_at'].isnull().any():
+            raise ValueError("Found null values in created_at. Please check the Excel file.")
+        
+        # Handle missing values and data types
+        df_mapped['company_id'] = DEFAULT_VALUES['company_id']  # Default company_id
+        df_mapped['call_type'] = df_mapped['call_type'].fillna(0).astype(int)
+        df_mapped['call_cat_id'] = df_mapped['call_cat_id'].fillna(1).astype(int)
+        df_mapped['created_by'] = df_mapped['created_by'].fillna(DEFAULT_VALUES['created_by']).astype(int)
+        
+        # Parse datetime columns once, in server time, with NULL for empty cells
+        convert_datetimes(df_mapped, ['created_at'], self.import_settings)
+        
+        # Fill missing description and call_notes with empty string
+        df_mapped['description'] = df_mapped['description'].fillna('')
+        df_mapped['call_notes'] = df_mapped['call_notes'].fillna('')
+        
+        # Fill missing call_duration with 0
+        df_mapped['call_duration'] = 0
+        
+        return df_mapped
+    
     def import_ticket_calls(self, excel_file: str) -> bool:
         """Import ticket calls data from Excel file (ticket_calls.xlsx)."""
         try:
             self.logger.info(f"Importing ticket calls from {excel_file}")
-            df = pd.read_excel(excel_file)
+            df = self._read_workbook(excel_file)
             
-            # Handle duplicate IDs by keeping only the first occurrence
-            if df['id'].duplicated().any():
-                duplicate_count = df['id'].duplicated().sum()
-                self.logger.warning(f"Found {duplicate_count} duplicate IDs. Keeping only the first occurrence of each.")
-                df = df.drop_duplicates(subset=['id'], keep='first')
-                self.logger.info(f"After removing duplicates: {len(df)} records remaining")
+            df = self.drop_duplicate_ticket_calls(df)
             
             # Validate data
             is_valid, errors = self.validate_data(df, 'ticket_calls')
@@ -656,76 +763,38 @@ class EnhancedTicketDataImporter:
                     self.logger.error(f"Validation error: {error}")
                 return False
             
-            # Map Excel columns to database columns
-            # Excel has: ['id', 'ticket_ID', 'Customer_ID', 'callRecipient_id', 'calltype_id', 'callReason_id', 'datetime', 'callresult', 'notes']
-            # Database expects: ['id', 'company_id', 'ticket_id', 'call_type', 'call_cat_id', 'description', 'call_notes', 'call_duration', 'created_by', 'created_at']
-            df_mapped = df.rename(columns={
-                'ticket_ID': 'ticket_id',
-                'calltype_id': 'call_type',
-                'callReason_id': 'call_cat_id',
-                'callresult': 'description',
-                'datetime': 'created_at'
-            })
-            
-            # Check for null values in required columns
-            if df_mapped['ticket_id'].isnull().any():
-                self.logger.error("Found null values in ticket_id. Please check the Excel file.")
-                return False
-            
-            if df_mapped['created_at'].isnull().any():
-                self.logger.error("Found null values in created_at. Please check the Excel file.")
-                return False
-            
-            # Handle missing values and data types
-            df_mapped['company_id'] = DEFAULT_VALUES['company_id']  # Default company_id
-            df_mapped['call_type'] = df_mapped['call_type'].fillna(0).astype(int)
-            df_mapped['call_cat_id'] = df_mapped['call_cat_id'].fillna(1).astype(int)
-            df_mapped['created_by'] = df_mapped['callRecipient_id'].fillna(DEFAULT_VALUES['created_by']).astype(int)
+            df_mapped = self.prepare_ticket_calls(df)
             
-            # Convert datetime columns
-            df_mapped['created_at'] = pd.to_datetime(df_mapped['created_at'])
-            
-            # Fill missing description and call_notes with empty string
-            df_mapped['description'] = df_mapped['description'].fillna('')
-            df_mapped['call_notes'] = df_mapped['notes'].fillna('')
-            
-            # Fill missing call_duration with 0
-            df_mapped['call_duration'] = 0
+            query = """
+            INSERT INTO ticketcall (
+                id, company_id, ticket_id, call_type, call_cat_id, 
+                description, call_notes, call_duration, created_by, created_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE 
+                company_id = VALUES(company_id),
+                ticket_id = VALUES(ticket_id),
+                call_type = VALUES(call_type),
+                call_cat_id = VALUES(call_cat_id),
+                description = VALUES(description),
+                call_notes = VALUES(call_notes),
+                call_duration = VALUES(call_duration),
+                created_by = VALUES(created_by)
+            """
+            df_mapped = self._check_key_index('ticketcall', query, df_mapped)
             
             # Process in batches
             total_records = len(df_mapped)
             self.stats['total_records'] += total_records
             
-            for i in range(0, total_records, IMPORT_SETTINGS['batch_size']):
-                batch = df_mapped.iloc[i:i + IMPORT_SETTINGS['batch_size']]
-                
-                for _, row in batch.iterrows():
-                    query = """
-                    INSERT INTO ticketcall (
-                        id, company_id, ticket_id, call_type, call_cat_id, 
-                        description, call_notes, call_duration, created_by, created_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        company_id = VALUES(company_id),
-                        ticket_id = VALUES(ticket_id),
-                        call_type = VALUES(call_type),
-                        call_cat_id = VALUES(call_cat_id),
-                        description = VALUES(description),
-                        call_notes = VALUES(call_notes),
-                        call_duration = VALUES(call_duration),
-                        created_by = VALUES(created_by)
-                    """
-                    
-                    values = (
-                        row['id'], row['company_id'], row['ticket_id'],
-                        row['call_type'], row['call_cat_id'], row['description'],
-                        row['call_notes'], row['call_duration'], row['created_by'], row['created_at']
-                    )
-                    
-                    self.cursor.execute(query, values)
-                
-                self.connection.commit()
-                self.logger.info(f"Processed batch {i//IMPORT_SETTINGS['batch_size'] + 1}/{(total_records-1)//IMPORT_SETTINGS['batch_size'] + 1}")
+            df_mapped = self._in_key_order('ticketcall', df_mapped)
+            rows = [
+                (row['id'], row['company_id'], row['ticket_id'],
+                 row['call_type'], row['call_cat_id'], row['description'],
+                 row['call_notes'], row['call_duration'], row['created_by'], row['created_at'])
+                for _, row in df_mapped.iterrows()
+            ]
+            rejected = self._write_rows('ticketcall', query, rows, shard_column='ticket_id')
+            self._update_key_index('ticketcall', query, df_mapped, rejected)
             
             self.stats['successful_imports'] += 1
             self.logger.info(f"Successfully imported {total_records} ticket calls")
@@ -738,8 +807,12 @@ class EnhancedTicketDataImporter:
                 self.connection.rollback()
             return False
     
-    def run_import(self, data_folder: str) -> bool:
-        """Run the complete ticket data import process."""
+    def run_import(self, data_folder: str, task_names: Optional[List[str]] = None) -> bool:
+        """Run the complete ticket data import process.
+
+        ``task_names`` limits the run to those tables of IMPORT_TASKS; the
+        outcome of each task is recorded in ``task_results``.
+        """
         self.stats['start_time'] = datetime.now()
         
         try:
@@ -767,31 +840,34 @@ class EnhancedTicketDataImporter:
                     self.logger.error("Failed to create ticketcall table")
                     return False
             
-            # Define import order (respecting foreign key constraints)
-            import_tasks = [
-                ('call_categories', 'callReason_tickets.xlsx', self.import_call_categories),
-                ('ticket_categories', 'TicketType.xlsx', self.import_ticket_categories),
-                ('tickets', 'tickets.xlsx', self.import_tickets),
-                ('ticket_calls', 'ticket_calls.xlsx', self.import_ticket_calls)
-            ]
-            
             success_count = 0
-            total_tasks = len(import_tasks)
+            tasks = [task for task in self.IMPORT_TASKS if not task_names or task[0] in task_names]
+            total_tasks = len(tasks)
             
-            for table_name, excel_file, import_func in import_tasks:
+            for table_name, excel_file, method_name in tasks:
                 file_path = os.path.join(data_folder, excel_file)
+                import_func = getattr(self, method_name)
                 
                 if not os.path.exists(file_path):
                     self.logger.warning(f"Excel file not found: {file_path}")
+                    self.task_results[table_name] = None
                     continue
                 
                 self.logger.info(f"Starting import for {table_name}...")
-                if import_func(file_path):
+                self._table_started(table_name, file_path)
+                success = self._run_import_task(file_path, import_func)
+                self._table_finished(table_name, success)
+                if success:
                     success_count += 1
+                    self.task_results[table_name] = True
                     self.logger.info(f"✓ Successfully imported {table_name}")
                 else:
+                    self.task_results[table_name] = False
                     self.logger.error(f"✗ Failed to import {table_name}")
             
+            if IMPORT_SETTINGS.get('analyze_after_import', True) and self.changed_tables:
+                self.analyze_changed_tables()
+            
             self.stats['end_time'] = datetime.now()
             self._print_summary(success_count, total_tasks)
             
@@ -816,6 +892,10 @@ class EnhancedTicketDataImporter:
         self.logger.info(f"Successful imports: {success_count}")
         self.logger.info(f"Failed imports: {total_tasks - success_count}")
         self.logger.info(f"Total records processed: {self.stats['total_records']}")
+        self.logger.info(f"Rejected rows: {self.stats['rejected_rows']}")
+        self.logger.info(f"Lock conflict retries: {self.stats['lock_retries']}")
+        self.logger.info(f"Reconnects: {self.stats['reconnects']}")
+        self.logger.info(f"Statistics refresh: {len(self.stats['analyze_seconds'])} tables in {sum(self.stats['analyze_seconds'].values()):.2f}s")
         self.logger.info(f"Total time: {duration}")
         self.logger.info(f"Average time per record: {duration / max(self.stats['total_records'], 1)}")
         self.logger.info("=" * 60)
@@ -824,9 +904,16 @@ class EnhancedTicketDataImporter:
         stats_file = f'ticket_import_stats_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
         with open(stats_file, 'w', encoding='utf-8') as f:
             json.dump({
+                'importer': type(self).__module__,
+                'writer': self.import_settings.get('writer', 'mysql'),
                 'success_count': success_count,
                 'total_tasks': total_tasks,
                 'total_records': self.stats['total_records'],
+                'rejected_rows': self.stats['rejected_rows'],
+                'lock_retries': self.stats['lock_retries'],
+                'reconnects': self.stats['reconnects'],
+                'analyze_seconds': self.stats['analyze_seconds'],
+                'tables': self.stats['tables'],
                 'start_time': self.stats['start_time'].isoformat(),
                 'end_time': self.stats['end_time'].isoformat(),
                 'duration_seconds': duration.total_seconds()
@@ -836,6 +923,61 @@ class EnhancedTicketDataImporter:
 
 def main():
     """Main function to run the enhanced ticket data import."""
+    parser = argparse.ArgumentParser(description="Import ticket data from Excel into JanssenCRM")
+    parser.add_argument('--async-writers', type=int, default=None,
+                        help="Number of concurrent batch writers (0 or 1 writes sequentially)")
+    parser.add_argument('--shard-writers', type=int, default=None,
+                        help="Number of parallel shard writers for ticketcall (0 or 1 disables sharding)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Parse, map and validate the Excel files without connecting to the database")
+    parser.add_argument('--update-histograms', action='store_true',
+                        help="Also refresh histograms on status, company_id and created_at after the import")
+    parser.add_argument('--progress-events', default=None,
+                        help="Write JSON progress events to a file, tcp://host:port or unix:///path")
+    parser.add_argument('--writer', default=None,
+                        help="Writer backend: mysql, mysql-statement, null, recording[:file], sqlite[:file] or sqldump[:file.sql.gz]")
+    parser.add_argument('--sort-by-key', action='store_true',
+                        help="Write every table in primary-key order")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="Memory budget in MB; larger workbooks are spilled to disk and imported in partitions")
+    parser.add_argument('--transactions', type=parse_transaction_strategies, default=None,
+                        help="Commit strategy: batch, table or savepoint, for all tables or per table "
+                             "(e.g. 'batch,governorates=table')")
+    parser.add_argument('--savepoint-rows', type=int, default=None,
+                        help="Rows between savepoints with the savepoint strategy")
+    parser.add_argument('--partition-exchange', action='store_true',
+                        help="Load past months of the partitioned call table through EXCHANGE PARTITION")
+    parser.add_argument('--key-index', default=None,
+                        help="Folder of the persistent call id index; reports ids loaded by earlier files or runs")
+    parser.add_argument('--key-conflicts', default=None, choices=['report', 'skip', 'fail'],
+                        help="Ids loaded before with different content: write anyway (default), leave out, or fail")
+    args = parser.parse_args()
+    
+    if args.update_histograms:
+        IMPORT_SETTINGS['update_histograms'] = True
+    if args.progress_events:
+        IMPORT_SETTINGS['progress_events'] = args.progress_events
+    if args.writer:
+        IMPORT_SETTINGS['writer'] = args.writer
+    if args.sort_by_key:
+        IMPORT_SETTINGS['sort_by_key'] = True
+    if args.memory_limit:
+        IMPORT_SETTINGS['memory_limit_mb'] = args.memory_limit
+    if args.transactions:
+        default_strategy, table_strategies = args.transactions
+        if default_strategy:
+            IMPORT_SETTINGS['transaction_strategy'] = default_strategy
+        IMPORT_SETTINGS['transaction_strategies'] = {**IMPORT_SETTINGS.get('transaction_strategies', {}),
+                                                     **table_strategies}
+    if args.savepoint_rows:
+        IMPORT_SETTINGS['savepoint_rows'] = args.savepoint_rows
+    if args.partition_exchange:
+        IMPORT_SETTINGS['partition_exchange'] = True
+    if args.key_index:
+        IMPORT_SETTINGS['key_index'] = args.key_index
+    if args.key_conflicts:
+        IMPORT_SETTINGS['key_conflicts'] = args.key_conflicts
+    
     # Data folder path
     data_folder = os.path.join(os.path.dirname(__file__), 'data', 'tickets')
     
@@ -844,8 +986,15 @@ def main():
         print(f"Error: Data folder not found: {data_folder}")
         sys.exit(1)
     
+    if args.dry_run:
+        from import_dry_run import print_report, run_dry_run, save_report
+        report = run_dry_run({'ticket': data_folder})
+        print_report(report)
+        print(f"Dry-run report saved to: {save_report(report)}")
+        sys.exit(0 if report['ok'] else 1)
+    
     # Create importer instance
-    importer = EnhancedTicketDataImporter()
+    importer = EnhancedTicketDataImporter(async_writers=args.async_writers, shard_writers=args.shard_writers)
     
     # Run import
     print("Starting Enhanced JanssenCRM Ticket Data import process...")